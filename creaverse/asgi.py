@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'creaverse.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; caps upload bodies before Django spools them
+from uploads.asgi import BodyLimitMiddleware  # noqa: E402
+
+application = BodyLimitMiddleware(django_application)
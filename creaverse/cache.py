@@ -0,0 +1,81 @@
+"""Namespaced, versioned cache keys and a stampede-safe get-or-compute.
+
+Keys are built as ``<namespace>:v<version>:<parts>``. Each namespace has a
+version counter in the cache, so :func:`bump` invalidates every key in it at
+once without knowing what they are.
+
+:func:`get_or_compute` lets a single caller rebuild an expired value while
+concurrent callers wait briefly for it instead of all hitting the database.
+TTLs are jittered so keys written together don't expire together.
+
+The lock and version counters use ``cache.add``/``cache.incr``, which are
+only atomic across processes on Redis (see ``CACHE_BACKEND``). On the file
+cache two workers can both take the lock, so a value may be computed twice.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+_MISSING = object()
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def version(namespace):
+    current = cache.get(_version_key(namespace))
+    if current is None:
+        # No expiry: losing the counter would resurrect stale keys
+        cache.add(_version_key(namespace), 1, None)
+        current = cache.get(_version_key(namespace), 1)
+    return current
+
+
+def make_key(namespace, *parts):
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:v{version(namespace)}:{suffix}'
+
+
+def bump(namespace):
+    """Invalidate every key in ``namespace``."""
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), 2, None)
+
+
+def jittered(ttl):
+    return int(ttl * (1 + random.uniform(0, settings.CACHE_TTL_JITTER)))
+
+
+def get_or_compute(key, compute, ttl):
+    """Cached value for ``key``, calling ``compute()`` at most once per expiry.
+
+    The first caller to miss takes a short lock and recomputes; others poll
+    for up to ``CACHE_LOCK_WAIT`` seconds and then compute without caching.
+    ``None`` results are not cached.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, jittered(ttl))
+            return value
+        finally:
+            cache.delete(lock)
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return compute()
@@ -0,0 +1,120 @@
+"""Publish/subscribe for server-sent events.
+
+Views publish small JSON events to named channels (``feed`` for post
+activity, ``user:<id>`` for a user's private messages) and the ASGI
+``event_stream`` view relays them to connected browsers.
+
+The default :class:`InProcessBroker` only reaches subscribers connected to the
+same process. Deployments running several workers point ``EVENTS_BROKER`` at
+a shared implementation exposing the same ``publish``/``subscribe`` API.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    name: str
+    data: dict
+
+    def encode(self):
+        """Serialize in the ``text/event-stream`` wire format."""
+        return f"id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """A subscriber's bounded queue, fed from any thread."""
+
+    def __init__(self, broker, channels, maxsize=100):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop already closed; the stream is going away
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            # Slow consumer: drop the oldest event rather than block publishers
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or ``None`` if ``timeout`` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan events out to subscriptions living in this process."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, channel, name, data):
+        event = Event(next(self._ids), name, data)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        return event
+
+    def subscribe(self, channels):
+        """Must be called from the event loop that will consume the events."""
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+
+broker = SimpleLazyObject(lambda: import_string(settings.EVENTS_BROKER)())
+
+
+def publish(channel, name, data):
+    """Publish once the current transaction commits, so listeners never see rollbacks."""
+    def send():
+        try:
+            broker.publish(channel, name, data)
+        except Exception:
+            logger.exception("Failed to publish %s event on %s", name, channel)
+
+    transaction.on_commit(send)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
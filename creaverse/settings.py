@@ -44,6 +44,9 @@ INSTALLED_APPS = [
     # Local apps
     'users.apps.UsersConfig',
     'feed.apps.FeedConfig',
+    'search.apps.SearchConfig',
+    'uploads.apps.UploadsConfig',
+    'jobs.apps.JobsConfig',
     
     # Third-party
     'django_cleanup.apps.CleanupConfig',  # Auto-delete old files
@@ -63,7 +66,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.PresenceMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'django_htmx.middleware.HtmxMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -78,6 +83,35 @@ DATABASES = {
     )
 }
 
+# Cache
+# Redis (or any Redis-compatible server) when REDIS_URL is set, otherwise a
+# file-based cache on local disk. Only Redis makes cache.add()/incr() atomic
+# across processes, which the stampede lock (creaverse.cache), the presence
+# throttle, the unread counters and the follow-graph change log rely on. The
+# file cache is for development and single-process deployments: with several
+# workers those can double-compute, drop increments or miss graph edits.
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if REDIS_URL else 'file')
+CACHE_BACKENDS = {
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+CACHES = {
+    'default': {**CACHE_BACKENDS[CACHE_BACKEND], 'KEY_PREFIX': 'creaverse', 'TIMEOUT': 300},
+}
+# Tests always get the locmem cache, whatever CACHE_BACKEND says
+TEST_RUNNER = 'creaverse.test_runner.TestRunner'
+
 ROOT_URLCONF = 'creaverse.urls'
 
 # Templates
@@ -126,11 +160,23 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 FILE_UPLOAD_PERMISSIONS = 0o644
+STORAGES = {
+    # Media is stored once per distinct content (uploads.storage)
+    'default': {'BACKEND': 'uploads.storage.ContentAddressedStorage'},
+    # Hashed, compressed copies served by WhiteNoise; needs collectstatic
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# Each file is size-checked and sniffed before it is stored; under ASGI the body
+# as a whole is capped first by uploads.asgi.BodyLimitMiddleware (creaverse/asgi.py)
+FILE_UPLOAD_HANDLERS = [
+    'uploads.handlers.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 # Email Configuration 
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
@@ -153,7 +199,91 @@ if DEBUG:
 
 # Custom Settings 
 USER_PROFILE_DEFAULT_IMAGE = 'profile_pics/default_profile.webp'
-MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # Default per-file upload limit (uploads.handlers)
+AVATAR_UPLOAD_SIZE = 2 * 1024 * 1024  # Profile picture limit at registration
+UPLOAD_IMAGE_FORMATS = ('jpeg', 'png', 'webp')  # Formats accepted by magic-byte sniffing
+IMAGE_VARIANT_QUALITY = 80  # WebP/AVIF quality of generated image variants
+IMAGE_BLURHASH_COMPONENTS = (4, 3)  # Horizontal/vertical blurhash components
+MEDIA_BLOB_DIR = 'blobs'  # Media subdirectory of content-addressed files
+MEDIA_BLOB_MAX_AGE = 365 * 24 * 60 * 60  # Seconds blob URLs may be cached (immutable)
+# Serve blobs from Django (uploads.views.serve_blob). Off in production by default:
+# have the web server or CDN origin serve MEDIA_ROOT/MEDIA_BLOB_DIR (see README)
+MEDIA_BLOB_SERVE = os.getenv('MEDIA_BLOB_SERVE', str(DEBUG)).lower() == 'true'
+MEDIA_BLOB_GRACE = 60 * 60  # Seconds before a new blob's count is reconciled, or its file swept if it has no row
+UNREAD_COUNT_TTL = 300  # Seconds before a cached unread count is recomputed
+MESSAGES_PAGE_SIZE = 50  # Messages per thread page
+MESSAGES_INBOX_SIZE = 50  # Conversations listed in the inbox
+FOLLOW_LIST_PAGE_SIZE = 30  # Users per followers/following page
+PRESENCE_ONLINE_WINDOW = 15 * 60  # Seconds since last activity a user counts as online
+PRESENCE_FLUSH_INTERVAL = 60  # Min seconds between last_seen writes per user
+FOLLOW_GRAPH_MAX_AGE = 60 * 60  # Seconds before a process reloads its follow graph from the database
+FOLLOW_GRAPH_MAX_REPLAY = 1000  # Follow edits replayed from the cache log before a full reload instead
+FOLLOW_GRAPH_SUGGESTIONS = 10  # Friends-of-friends suggested on your own profile
+ENGAGEMENT_WINDOW_DAYS = 30  # Window for the activity rate stored by recompute_engagement
+
+# Feed
+FEED_PAGE_SIZE = int(os.getenv('FEED_PAGE_SIZE', 20))
+FEED_TRENDING_DAYS = 7  # Trending only ranks posts from this window
+FEED_TRENDING_HALF_LIFE = 12 * 60 * 60  # Seconds for a like/comment's trending weight to halve
+FEED_TRENDING_WEIGHTS = {'post': 1.0, 'like': 2.0, 'comment': 1.0}
+FEED_KEYWORD_SAMPLE = 50  # Recent interactions used to seed recommendations
+FEED_KEYWORDS_PER_POST = 10  # Terms kept in the keyword index per post
+FEED_KEYWORDS_BATCH = 1000  # Unindexed posts picked up per index_missing_keywords run
+FEED_RECOMMEND_LIMIT = 50  # Top-k posts in a user's recommended source
+FEED_RECOMMEND_CANDIDATES = 5000  # Max posts scored per recommendation run
+FEED_RECOMMEND_CHUNK = 1000  # Candidates scored per query/matrix
+FEED_RECOMMEND_BUDGET = 0.2  # Seconds of scoring before returning the best so far
+FEED_RECOMMEND_TTL = 300  # Seconds a user's recommendations are cached
+FEED_CF_NEIGHBORS = 50  # Similar posts kept per post by build_recommendations
+FEED_CF_DAYS = 90  # Interaction window for build_recommendations (0 = all time)
+FEED_TIMELINE_ENABLED = os.getenv('FEED_TIMELINE_ENABLED', 'False').lower() == 'true'
+FEED_TIMELINE_LENGTH = 800  # Entries kept per user by rebuild_timelines
+FEED_FANOUT_LIMIT = 1000  # Authors above this follower count are merged on read
+FEED_FOLLOW_BACKFILL = 20  # Posts copied into a timeline on follow
+FEED_COMMENT_PREVIEW = 3  # Comments shown per card before "View all"
+FEED_UPDATES_LIMIT = 20  # Max posts/comments returned by one feed_updates poll
+FEED_UPDATES_LAG = 5  # Seconds a poll looks back for rows that committed after they were stamped
+FEED_FRAGMENT_TTL = 24 * 60 * 60  # Seconds a rendered post/comment fragment is cached
+
+# Cache helpers (creaverse.cache)
+CACHE_TTL_JITTER = 0.1  # Fraction of a TTL added at random so keys don't expire together
+CACHE_LOCK_TIMEOUT = 10  # Seconds a recompute lock is held at most
+CACHE_LOCK_WAIT = 2  # Seconds other requests wait for a recompute before computing themselves
+FEATURED_CREATORS_LIMIT = 5  # Creators shown on the home page
+FEATURED_CREATORS_TTL = 300
+
+# Search (search.backends, picked by database vendor)
+SEARCH_BACKENDS = {
+    'sqlite': 'search.backends.SQLiteBackend',
+    'postgresql': 'search.backends.PostgresBackend',
+}
+SEARCH_DEFAULT_BACKEND = 'search.backends.SimpleBackend'
+SEARCH_PAGE_SIZE = 20  # Results per search page
+SEARCH_ADMIN_LIMIT = 1000  # Max matches an admin changelist search returns
+
+# Background jobs (jobs app, run by manage.py run_jobs)
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False').lower() == 'true'  # Run jobs in-process after commit, no worker
+JOBS_BATCH_SIZE = 10  # Jobs a worker claims per poll
+JOBS_POLL_INTERVAL = 1  # Seconds an idle worker waits before polling again
+JOBS_MAX_ATTEMPTS = 5  # Default attempts per job before it is marked failed
+JOBS_BACKOFF_BASE = 10  # Seconds before the first retry, doubling per attempt
+JOBS_BACKOFF_MAX = 60 * 60  # Longest wait between retries
+JOBS_LOCK_TIMEOUT = 15 * 60  # Seconds before a running job is assumed lost and requeued (runs again)
+JOBS_KEEP_DONE = 7 * 24 * 60 * 60  # Seconds finished jobs are kept for inspection
+JOBS_PERIODIC = {  # Task -> seconds between runs
+    'users.tasks.reconcile_counters': 60 * 60,
+    'feed.tasks.reconcile_counters': 60 * 60,
+    'uploads.tasks.reconcile_blobs': 24 * 60 * 60,
+    'feed.tasks.build_recommendations': 60 * 60,
+    'feed.tasks.update_trending': 60 * 60,
+    'feed.tasks.index_missing_keywords': 60 * 60,
+    'feed.tasks.recount_keywords': 24 * 60 * 60,
+}
+
+# Server-Sent Events
+EVENTS_BROKER = os.getenv('EVENTS_BROKER', 'creaverse.events.InProcessBroker')
+EVENTS_HEARTBEAT = 15  # Seconds between keep-alive comments
+EVENTS_RETRY_MS = 5000  # Client reconnect delay
 
 
 
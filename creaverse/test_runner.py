@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the tests against an in-memory cache and unhashed static files.
+
+    The configured cache (the file cache at ``.cache`` by default, or Redis)
+    would carry fragments, unread counts, graph edits and locks across runs
+    and share them with a local dev server. The manifest storage would need
+    a fresh collectstatic before every run.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._settings_override = override_settings(
+            CACHES={
+                'default': {**settings.CACHE_BACKENDS['locmem'], 'KEY_PREFIX': 'creaverse-test'},
+            },
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        self._settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,113 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from creaverse import events
+from creaverse.events import Event, InProcessBroker
+from users.models import CustomUser
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    async def test_subscribers_get_their_channels_only(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(['feed', 'user:1'])
+        first = broker.publish('feed', 'like', {'post_id': 1})
+        broker.publish('user:2', 'message', {'id': 1})
+        second = broker.publish('user:1', 'message', {'id': 2})
+
+        self.assertEqual(await subscription.get(timeout=1), first)
+        self.assertEqual(await subscription.get(timeout=1), second)
+        self.assertLess(first.id, second.id)
+        self.assertIsNone(await subscription.get(timeout=0.01))
+
+    async def test_publishing_from_another_thread(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(['feed'])
+        event = await asyncio.to_thread(broker.publish, 'feed', 'like', {'post_id': 1})
+        self.assertEqual(await subscription.get(timeout=1), event)
+
+    async def test_slow_subscribers_lose_the_oldest_events(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(['feed'])
+        subscription.queue = asyncio.Queue(maxsize=2)
+        published = [broker.publish('feed', 'like', {'n': n}) for n in range(3)]
+        await asyncio.sleep(0)  # Let the queued puts run
+
+        self.assertEqual([await subscription.get(timeout=1) for _ in range(2)], published[1:])
+
+    async def test_close_unsubscribes(self):
+        broker = InProcessBroker()
+        kept = broker.subscribe(['feed'])
+        closed = broker.subscribe(['feed', 'user:1'])
+        closed.close()
+        self.assertEqual(dict(broker._subscriptions), {'feed': {kept}})
+
+        broker.publish('feed', 'like', {})
+        self.assertIsNone(await closed.get(timeout=0.01))
+
+    def test_wire_format(self):
+        self.assertEqual(
+            Event(7, 'like', {'post_id': 1}).encode(),
+            'id: 7\nevent: like\ndata: {"post_id": 1}\n\n',
+        )
+
+
+class PublishTests(TestCase):
+    def test_events_wait_for_the_commit(self):
+        broker = mock.Mock()
+        with mock.patch.object(events, 'broker', broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                events.publish('feed', 'like', {'post_id': 1})
+                broker.publish.assert_not_called()
+        broker.publish.assert_called_once_with('feed', 'like', {'post_id': 1})
+
+    def test_broker_failures_are_logged(self):
+        broker = mock.Mock(**{'publish.side_effect': ConnectionError})
+        with mock.patch.object(events, 'broker', broker), self.assertLogs('creaverse.events', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                events.publish('feed', 'like', {})
+
+
+@override_settings(EVENTS_HEARTBEAT=0.05, EVENTS_RETRY_MS=1000)
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+
+    def setUp(self):
+        self.broker = InProcessBroker()
+        patcher = mock.patch.object(events, 'broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def open(self, **params):
+        await self.async_client.aforce_login(self.alice)
+        return await self.async_client.get(reverse('event_stream'), params, HTTP_HOST='localhost', secure=True)
+
+    async def test_anonymous_users_are_refused(self):
+        response = await self.async_client.get(reverse('event_stream'), HTTP_HOST='localhost', secure=True)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_events_and_keep_alives(self):
+        response = await self.open()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        frames = response.streaming_content
+
+        self.assertEqual(await anext(frames), b'retry: 1000\n\n')
+        self.assertEqual(await anext(frames), b': keep-alive\n\n')
+        self.assertEqual(set(self.broker._subscriptions), {'feed', events.user_channel(self.alice.id)})
+
+        event = self.broker.publish(events.user_channel(self.alice.id), 'message', {'id': 1})
+        self.assertEqual(await anext(frames), event.encode().encode())
+
+        await frames.aclose()
+
+    async def test_topics(self):
+        response = await self.open(topics='messages')
+        frames = response.streaming_content
+        await anext(frames)
+        self.assertEqual(set(self.broker._subscriptions), {events.user_channel(self.alice.id)})
+        await frames.aclose()
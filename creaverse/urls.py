@@ -7,6 +7,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from users.views import home_view
+from creaverse.views import event_stream
+from uploads.views import serve_blob
 
 
 urlpatterns = [
@@ -21,8 +23,21 @@ urlpatterns = [
 
     # Feed App 
     path('feed/', include('feed.urls')),
+
+    # Search App 
+    path('search/', include('search.urls')),
+
+    # Server-Sent Events 
+    path('events/', event_stream, name='event_stream'),
 ]
 
+# Content-addressed media, with immutable cache headers. In production the web
+# server or CDN origin should serve these instead of the Python workers
+if settings.MEDIA_BLOB_SERVE:
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.strip('/')}/{settings.MEDIA_BLOB_DIR}/<path:path>", serve_blob, name='media_blob'),
+    ]
+
 # Media files in development 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,4 +1,38 @@
+from django.conf import settings
+from django.http import HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render
 
+from creaverse import events
+
 def home(request):
     return render(request, 'home.html')  
+
+# Server-Sent Events
+async def event_stream(request):
+    """Streams feed activity and the user's messages (ASGI only)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+
+    topics = set(request.GET.get('topics', 'feed,messages').split(','))
+    channels = []
+    if 'feed' in topics:
+        channels.append('feed')
+    if 'messages' in topics:
+        channels.append(events.user_channel(user.id))
+
+    async def stream():
+        subscription = events.broker.subscribe(channels)
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+            while True:
+                event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+                # Comment lines keep proxies from closing an idle connection
+                yield event.encode() if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
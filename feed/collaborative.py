@@ -0,0 +1,183 @@
+"""Offline item-item collaborative filtering.
+
+:func:`build` turns likes, comments and ``UserInteraction`` rows into a sparse
+user×post matrix, computes cosine similarity between post columns, keeps
+the strongest ``neighbors`` per post, and scores every user's unseen posts
+as ``interactions @ similarity``. It runs hourly as the ``build_recommendations``
+job (``JOBS_PERIODIC``) or by hand with the command of the same name;
+requests only read the stored :class:`~feed.models.RecommendationList`.
+Lists of users who have dropped out of the interaction window are deleted,
+so they get the content-based fallback again (:mod:`feed.recommend`).
+"""
+import datetime
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+from django.utils.timezone import now
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from feed.models import Comment, Like, Post, RecommendationList
+from users.models import UserInteraction
+
+# Relative strength of each signal in the interaction matrix
+INTERACTION_WEIGHTS = {
+    'LIKE': 1.0,
+    'COMMENT': 2.0,
+    'VIEW': 0.25,
+    'SHARE': 2.0,
+    'BOOKMARK': 1.5,
+}
+
+
+@dataclass
+class BuildStats:
+    users: int = 0
+    posts: int = 0
+    interactions: int = 0
+    users_covered: int = 0
+    posts_recommended: int = 0
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def user_coverage(self):
+        return self.users_covered / self.users if self.users else 0.0
+
+    @property
+    def catalog_coverage(self):
+        return self.posts_recommended / self.posts if self.posts else 0.0
+
+
+def interaction_matrix(since=None):
+    """``(user_ids, post_ids, matrix)`` with summed interaction weights."""
+    signals = []
+    likes = Like.objects.filter(post__is_draft=False)
+    comments = Comment.objects.filter(post__is_draft=False)
+    interactions = UserInteraction.objects.filter(
+        post__isnull=False, post__is_draft=False, interaction_type__in=INTERACTION_WEIGHTS
+    )
+    if since is not None:
+        likes = likes.filter(created_at__gte=since)
+        comments = comments.filter(created_at__gte=since)
+        interactions = interactions.filter(timestamp__gte=since)
+
+    for user_id, post_id in likes.values_list('user_id', 'post_id').iterator():
+        signals.append((user_id, post_id, INTERACTION_WEIGHTS['LIKE']))
+    for user_id, post_id in comments.values_list('user_id', 'post_id').iterator():
+        signals.append((user_id, post_id, INTERACTION_WEIGHTS['COMMENT']))
+    rows = interactions.values_list('user_id', 'post_id', 'interaction_type').iterator()
+    for user_id, post_id, kind in rows:
+        signals.append((user_id, post_id, INTERACTION_WEIGHTS[kind]))
+
+    if not signals:
+        return [], [], sparse.csr_matrix((0, 0))
+    user_col, post_col, weights = (np.asarray(column) for column in zip(*signals))
+    user_ids, user_pos = np.unique(user_col, return_inverse=True)
+    post_ids, post_pos = np.unique(post_col, return_inverse=True)
+    # Duplicate (user, post) pairs are summed by the COO -> CSR conversion
+    matrix = sparse.coo_matrix(
+        (weights.astype(np.float32), (user_pos, post_pos)),
+        shape=(len(user_ids), len(post_ids)),
+    ).tocsr()
+    return user_ids.tolist(), post_ids.tolist(), matrix
+
+
+def item_similarity(matrix, neighbors):
+    """Post×post cosine similarity, pruned to the top ``neighbors`` per row."""
+    columns = normalize(matrix.tocsc(), axis=0)
+    similarity = (columns.T @ columns).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    for i in range(similarity.shape[0]):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        if end - start > neighbors:
+            row = similarity.data[start:end]
+            row[np.argpartition(row, -neighbors)[:-neighbors]] = 0
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def top_posts(matrix, similarity, post_ids, excluded, top_n, chunk=1000):
+    """Yield ``(row, [post ids])`` with each user's best unseen posts."""
+    post_ids = np.asarray(post_ids)
+    for start in range(0, matrix.shape[0], chunk):
+        scores = (matrix[start:start + chunk] @ similarity).tocsr()
+        for offset in range(scores.shape[0]):
+            row = start + offset
+            begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+            candidates = scores.indices[begin:end]
+            values = scores.data[begin:end]
+            keep = ~np.isin(candidates, excluded[row]) & (values > 0)
+            candidates, values = candidates[keep], values[keep]
+            if len(values) > top_n:
+                best = np.argpartition(-values, top_n - 1)[:top_n]
+                candidates, values = candidates[best], values[best]
+            order = np.argsort(-values, kind='stable')
+            yield row, post_ids[candidates[order]].tolist()
+
+
+def _prune(computed_at):
+    # Lists of users this build didn't write, computed before it started
+    RecommendationList.objects.filter(computed_at__lt=computed_at).delete()
+
+
+def build(top_n=None, neighbors=None, days=None, dry_run=False):
+    """Recompute and store every interacting user's recommendations."""
+    top_n = top_n or settings.FEED_RECOMMEND_LIMIT
+    neighbors = neighbors or settings.FEED_CF_NEIGHBORS
+    days = settings.FEED_CF_DAYS if days is None else days
+    computed_at = now()
+    since = computed_at - datetime.timedelta(days=days) if days else None
+    stats = BuildStats()
+
+    started = time.monotonic()
+    user_ids, post_ids, matrix = interaction_matrix(since)
+    stats.users, stats.posts, stats.interactions = len(user_ids), len(post_ids), matrix.nnz
+    stats.timings['load'] = time.monotonic() - started
+    if not stats.users:
+        if not dry_run:
+            _prune(computed_at)
+        return stats
+
+    started = time.monotonic()
+    similarity = item_similarity(matrix, neighbors)
+    stats.timings['similarity'] = time.monotonic() - started
+
+    started = time.monotonic()
+    position = {post_id: i for i, post_id in enumerate(post_ids)}
+    excluded = [matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]] for i in range(stats.users)]
+    # Users are never recommended their own posts
+    authored = Post.objects.filter(id__in=post_ids).values_list('user_id', 'id')
+    user_row = {user_id: i for i, user_id in enumerate(user_ids)}
+    own = {}
+    for user_id, post_id in authored:
+        if user_id in user_row:
+            own.setdefault(user_row[user_id], []).append(position[post_id])
+    for row, positions in own.items():
+        excluded[row] = np.concatenate([excluded[row], positions])
+
+    lists = []
+    recommended = set()
+    for row, ids in top_posts(matrix, similarity, post_ids, excluded, top_n):
+        if ids:
+            stats.users_covered += 1
+            recommended.update(ids)
+        lists.append(RecommendationList(user_id=user_ids[row], post_ids=ids, computed_at=computed_at))
+    stats.posts_recommended = len(recommended)
+    stats.timings['score'] = time.monotonic() - started
+
+    started = time.monotonic()
+    if not dry_run:
+        RecommendationList.objects.bulk_create(
+            lists,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['post_ids', 'computed_at'],
+        )
+        _prune(computed_at)
+    stats.timings['store'] = time.monotonic() - started
+    return stats
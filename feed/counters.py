@@ -0,0 +1,45 @@
+"""Denormalized engagement counters on ``Post``.
+
+``like_count`` and ``comment_count`` are maintained with ``F()`` updates so
+concurrent requests never lose increments; :func:`reconcile` repairs any drift
+against the ``Like`` and ``Comment`` tables.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from feed.models import Comment, Like, Post
+
+
+def adjust(post_id, likes=0, comments=0):
+    """Atomically add ``likes``/``comments`` (may be negative) to a post."""
+    changes = {}
+    if likes:
+        changes['like_count'] = Greatest(F('like_count') + likes, 0)
+    if comments:
+        changes['comment_count'] = Greatest(F('comment_count') + comments, 0)
+    if changes:
+        # Bump updated_at so polling clients see the new counts
+        Post.objects.filter(pk=post_id).update(updated_at=Now(), **changes)
+
+
+def _actual(model):
+    counts = (
+        model.objects.filter(post=OuterRef('pk'))
+        .values('post').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile(queryset=None, dry_run=False):
+    """Reset drifted counters to the true totals; returns the number of posts fixed."""
+    queryset = Post.objects.all() if queryset is None else queryset
+    drifted = (
+        queryset.alias(actual_likes=_actual(Like), actual_comments=_actual(Comment))
+        .filter(~Q(like_count=F('actual_likes')) | ~Q(comment_count=F('actual_comments')))
+    )
+    if dry_run:
+        return drifted.count()
+    return Post.objects.filter(pk__in=list(drifted.values_list('pk', flat=True))).update(
+        like_count=_actual(Like),
+        comment_count=_actual(Comment),
+    )
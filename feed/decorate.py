@@ -0,0 +1,55 @@
+"""Batched per-viewer decoration of post pages.
+
+Templates must not touch ``post.likes`` or ``post.comments`` directly: every
+such lookup is a query per card. :func:`decorate_posts` attaches everything a
+card needs using a fixed number of queries regardless of page size.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from feed import fragments
+from feed.models import Comment, Like
+
+
+def decorate_posts(posts, viewer, comment_limit=None):
+    """Attach ``liked_by_me`` and ``top_comments`` to each post in ``posts``.
+
+    Counts come from the stored ``like_count``/``comment_count`` columns, so a
+    page costs two queries: one for the viewer's likes, one for the comments.
+    Cached card and comment fragments are attached with one cache lookup.
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+    comment_limit = settings.FEED_COMMENT_PREVIEW if comment_limit is None else comment_limit
+    post_ids = [post.id for post in posts]
+
+    liked = set()
+    if viewer.is_authenticated:
+        liked = set(
+            Like.objects.filter(user=viewer, post_id__in=post_ids).values_list('post_id', flat=True)
+        )
+
+    comments_by_post = {post_id: [] for post_id in post_ids}
+    if comment_limit:
+        ranked = (
+            Comment.objects.filter(post_id__in=post_ids)
+            .select_related('user')
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=[F('post_id')],
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(rank__lte=comment_limit)
+            .order_by('post_id', '-created_at', '-id')
+        )
+        for comment in ranked:
+            comments_by_post[comment.post_id].append(comment)
+
+    for post in posts:
+        post.liked_by_me = post.id in liked
+        post.top_comments = comments_by_post[post.id]
+    fragments.attach(posts, [comment for post in posts for comment in post.top_comments])
+    return posts
+
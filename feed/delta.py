@@ -0,0 +1,141 @@
+"""Incremental feed updates for polling clients.
+
+Clients hold an opaque ``since`` token from their last response and receive
+only the posts and comments created or changed after it, instead of
+re-rendering the whole feed.
+
+The token keeps a :class:`Position` per list (new posts, changed posts, new
+comments): a time, and the rows at or after it that were already delivered.
+Rows are stamped when they are saved but may commit a little later, so a
+position never moves closer than ``FEED_UPDATES_LAG`` seconds to the present;
+rows in that window are re-read on the next poll and skipped if they were
+delivered. A row that commits more than ``FEED_UPDATES_LAG`` after its stamp
+can still be missed. A list cut at ``FEED_UPDATES_LIMIT`` resumes after its
+last delivered row, so the overflow comes with the next poll.
+"""
+import base64
+import binascii
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from feed.models import Comment, Post
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+LISTS = ('new_posts', 'changed_posts', 'new_comments')
+
+
+class InvalidSince(ValueError):
+    """Raised when a ``since`` token cannot be decoded."""
+
+
+def _micros(moment):
+    # Exact, unlike timestamp(), so delivered keys compare equal when read back
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _moment(micros):
+    return _EPOCH + micros * _MICROSECOND
+
+
+@dataclass(frozen=True)
+class Position:
+    """Where one list of a poll left off"""
+    at: datetime.datetime
+    # (id, key in microseconds) of rows at or after ``at`` already delivered
+    seen: frozenset = frozenset()
+
+
+def make_since(moment=None):
+    """Token for a page rendered at ``moment``: every list starts there."""
+    return str(_micros(moment or now()))
+
+
+def parse_since(token):
+    """Decode a token into ``{list name: Position}``."""
+    if token and token.isdigit():
+        at = _moment(int(token))
+        return {name: Position(at) for name in LISTS}
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return {
+            name: Position(_moment(int(at)), frozenset((int(pk), int(key)) for pk, key in seen))
+            for name, (at, seen) in ((name, payload[name]) for name in LISTS)
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError, UnicodeDecodeError):
+        raise InvalidSince(token)
+
+
+def encode_since(positions):
+    payload = {
+        name: [_micros(position.at), sorted(position.seen)]
+        for name, position in positions.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+@dataclass
+class FeedDelta:
+    since: str
+    new_posts: list = field(default_factory=list)
+    changed_posts: list = field(default_factory=list)
+    new_comments: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.new_posts or self.changed_posts or self.new_comments)
+
+
+def _page(queryset, key, position, limit, horizon):
+    """Up to ``limit`` undelivered rows from ``position`` in ``key`` order, and the position after them."""
+    rows = queryset.filter(**{f'{key}__gte': position.at}).order_by(key, 'id')
+    rows = [
+        row for row in rows[:limit + len(position.seen) + 1]
+        if (row.id, _micros(getattr(row, key))) not in position.seen
+    ]
+    delivered = rows[:limit]
+    at = max(position.at, horizon)
+    if len(rows) > limit:
+        # Cut short: resume from the last delivered row rather than skip the rest
+        at = min(at, getattr(delivered[-1], key))
+    seen = position.seen | {(row.id, _micros(getattr(row, key))) for row in delivered}
+    cutoff = _micros(at)
+    return delivered, Position(at, frozenset(pair for pair in seen if pair[1] >= cutoff))
+
+
+def collect_updates(positions, post_id=None, limit=None):
+    """Posts and comments created or changed since ``positions`` (see :func:`parse_since`).
+
+    With ``post_id`` only that post's counters and comments are considered,
+    which is what the post detail page polls for.
+    """
+    limit = limit or settings.FEED_UPDATES_LIMIT
+    horizon = now() - datetime.timedelta(seconds=settings.FEED_UPDATES_LAG)
+    positions = dict(positions)
+    delta = FeedDelta(since='')
+
+    posts = Post.objects.filter(is_draft=False).select_related('user')
+    comments = Comment.objects.select_related('user', 'post')
+    if post_id is not None:
+        posts = posts.filter(id=post_id)
+        comments = comments.filter(post_id=post_id)
+    else:
+        new_posts, positions['new_posts'] = _page(posts, 'created_at', positions['new_posts'], limit, horizon)
+        delta.new_posts = new_posts[::-1]  # Newest first, as they go on top of the feed
+
+    changed_posts, positions['changed_posts'] = _page(
+        posts, 'updated_at', positions['changed_posts'], limit, horizon,
+    )
+    new_comments, positions['new_comments'] = _page(
+        comments, 'created_at', positions['new_comments'], limit, horizon,
+    )
+    # New post cards already show their counters and comments
+    new_ids = {post.id for post in delta.new_posts}
+    delta.changed_posts = [post for post in changed_posts if post.id not in new_ids]
+    delta.new_comments = [comment for comment in new_comments if comment.post_id not in new_ids]
+    delta.since = encode_since(positions)
+    return delta
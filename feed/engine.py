@@ -0,0 +1,222 @@
+"""Cursor-paginated feed engine.
+
+The feed is built from an ordered list of sources (the optional home timeline,
+recommended, personalized, trending, latest). Each source is a bounded queryset with a keyset ordering;
+the engine drains them in priority order and stops querying as soon as the
+page is full. A source excludes everything matched by the sources before it,
+so a post is only ever served once without keeping a ``seen`` set.
+"""
+import base64
+import binascii
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from feed import recommend, timeline
+from feed.models import Post, TimelineEntry
+
+
+class InvalidCursor(ValueError):
+    """Raised when a ``next`` token cannot be decoded."""
+
+
+@dataclass
+class Source:
+    """A single feed source ordered by a descending keyset."""
+    name: str
+    queryset: object
+    predicate: Q = field(default_factory=Q)
+    ordering: tuple = ('created_at', 'id')
+
+    def page(self, exclude, after, limit):
+        """Return up to ``limit`` posts strictly after the ``after`` key."""
+        qs = self.queryset
+        for predicate in exclude:
+            qs = qs.exclude(predicate)
+        if after is not None:
+            qs = qs.filter(_keyset_filter(self.ordering, after))
+        order = [f'-{name}' for name in self.ordering]
+        return list(qs.order_by(*order)[:limit])
+
+    def key(self, post):
+        return [getattr(post, name) for name in self.ordering]
+
+
+class TimelineSource(Source):
+    """Reads the materialized timeline, merging in followed celebrities on read.
+
+    Posts are keyed by their entry's time (see :mod:`feed.timeline`), pulled
+    celebrity posts by their own. Must be the first source: earlier
+    exclusions would under-fill its pages.
+    """
+
+    def __init__(self, user, queryset):
+        self.user = user
+        self.celebrity_ids = timeline.followed_celebrity_ids(user)
+        predicate = Q(timeline_entries__user=user)
+        if self.celebrity_ids:
+            predicate |= Q(user__in=self.celebrity_ids)
+        super().__init__('timeline', queryset, predicate)
+
+    def page(self, exclude, after, limit):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if after is not None:
+            entries = entries.filter(_keyset_filter(('created_at', 'post_id'), after))
+        added_at = dict(
+            entries.order_by('-created_at', '-post_id').values_list('post_id', 'created_at')[:limit]
+        )
+        posts = {post.id: post for post in self.queryset.filter(id__in=added_at)}
+        for post in posts.values():
+            post.timeline_at = added_at[post.id]
+        if self.celebrity_ids:
+            # Ones in the timeline (liked by someone followed) are read from there
+            pulled = self.queryset.filter(user__in=self.celebrity_ids).exclude(timeline_entries__user=self.user)
+            if after is not None:
+                pulled = pulled.filter(_keyset_filter(self.ordering, after))
+            for post in pulled.order_by('-created_at', '-id')[:limit]:
+                post.timeline_at = post.created_at
+                posts.setdefault(post.id, post)
+        return sorted(posts.values(), key=self.key, reverse=True)[:limit]
+
+    def key(self, post):
+        return [post.timeline_at, post.id]
+
+
+@dataclass
+class FeedPage:
+    posts: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _keyset_filter(ordering, values):
+    """Build ``(a, b, c) < (va, vb, vc)`` for a descending keyset."""
+    condition = Q()
+    for i, name in enumerate(ordering):
+        step = Q(**{f'{name}__lt': values[i]})
+        for prev, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev: value})
+        condition |= step
+    return condition
+
+
+def encode_cursor(source_name, key):
+    # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate
+    payload = json.dumps([source_name, key], default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a ``next`` token into ``(source_name, key)``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        source_name, key = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if not isinstance(source_name, str) or not (key is None or isinstance(key, list)):
+        raise InvalidCursor(token)
+    if key is not None:
+        key = [_decode_value(value) for value in key]
+    return source_name, key
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {type(value).__name__} in a feed cursor')
+
+
+def _decode_value(value):
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return parsed
+    return value
+
+
+def build_sources(user):
+    """Feed sources for ``user`` in priority order."""
+    base = Post.objects.filter(is_draft=False).select_related('user')
+    sources = []
+
+    # Home timeline: followed authors, precomputed on write
+    if timeline.is_enabled():
+        sources.append(TimelineSource(user, base))
+
+    # Recommended: precomputed lists (see feed.recommend), best first
+    recommended_ids = recommend.get_recommendations(user)
+    recommended = Q(id__in=recommended_ids)
+    ranks = [When(id=post_id, then=Value(len(recommended_ids) - i)) for i, post_id in enumerate(recommended_ids)]
+    recommended_qs = base.filter(recommended).annotate(
+        recommendation_rank=Case(*ranks, default=Value(0), output_field=IntegerField())
+    )
+    sources.append(Source('recommended', recommended_qs, recommended, ('recommendation_rank', 'created_at', 'id')))
+
+    # Personalized: posts the user has already engaged with
+    personalized = Q(likes__user=user) | Q(comments__user=user)
+    sources.append(Source('personalized', base.filter(personalized).distinct(), personalized))
+
+    # Trending: recent engaged posts by time-decayed score (see feed.trending)
+    window = now() - datetime.timedelta(days=settings.FEED_TRENDING_DAYS)
+    trending = (
+        Q(created_at__gte=window, trending_score__isnull=False)
+        & (Q(like_count__gt=0) | Q(comment_count__gt=0))
+    )
+    sources.append(Source('trending', base.filter(trending), trending, ('trending_score', 'id')))
+
+    # Latest: everything else, newest first
+    sources.append(Source('latest', base))
+    return sources
+
+
+def _valid_key(source, key):
+    """Whether ``key`` fits ``source``'s ordering, so a forged cursor can't break the query."""
+    if len(key) != len(source.ordering):
+        return False
+    try:
+        # Builds (and so type-checks) the lookups without running the query
+        source.queryset.filter(_keyset_filter(source.ordering, key))
+    except (TypeError, ValueError, ValidationError):
+        return False
+    return True
+
+
+def get_feed_page(user, cursor=None, page_size=None, sources=None):
+    """Return one :class:`FeedPage` for ``user`` starting at ``cursor``."""
+    page_size = page_size or settings.FEED_PAGE_SIZE
+    sources = sources if sources is not None else build_sources(user)
+    start, after = 0, None
+    if cursor:
+        name, after = decode_cursor(cursor)
+        names = [source.name for source in sources]
+        if name not in names:
+            raise InvalidCursor(cursor)
+        start = names.index(name)
+        if after is not None and not _valid_key(sources[start], after):
+            raise InvalidCursor(cursor)
+
+    posts = []
+    for index in range(start, len(sources)):
+        source = sources[index]
+        exclude = [s.predicate for s in sources[:index]]
+        remaining = page_size - len(posts)
+        # Fetch one extra row to know whether this source has more to give
+        batch = source.page(exclude, after if index == start else None, remaining + 1)
+        posts.extend(batch[:remaining])
+        if len(batch) > remaining:
+            return FeedPage(posts, encode_cursor(source.name, source.key(posts[-1])))
+        if len(posts) == page_size:
+            # Page filled exactly at the end of this source; resume at the next one
+            if index + 1 < len(sources):
+                return FeedPage(posts, encode_cursor(sources[index + 1].name, None))
+            return FeedPage(posts)
+    return FeedPage(posts)
@@ -0,0 +1,65 @@
+"""Cached HTML fragments for post cards and comments.
+
+The viewer-independent parts of a card (author header and content) and of a
+comment (author link and text) are rendered once and cached. Keys carry a
+version, so any write that changes what a fragment shows also changes its
+key and stale entries are simply never read again:
+
+* posts and comments are versioned by a digest of the fields the fragment
+  renders (text, and a post's date), not ``updated_at``: that also moves on
+  every like and comment (:func:`feed.counters.adjust`), which the cached
+  HTML doesn't show;
+* both include the author's username and avatar (and whether its resized
+  variants exist yet), which live on the user.
+
+Viewer-specific bits (like state, delete buttons, CSRF tokens) stay in the
+surrounding templates and are rendered per request.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+def _digest(*parts):
+    return hashlib.md5('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _author(user):
+    return (user.username, user.profile_image.name or '', user.profile_image_variants.get('source', ''))
+
+
+def post_key(post):
+    version = _digest(post.content, post.created_at.isoformat(), *_author(post.user))
+    return f'fragment:post:{post.id}:{version}'
+
+
+def comment_key(comment):
+    version = _digest(comment.content, *_author(comment.user))
+    return f'fragment:comment:{comment.id}:{version}'
+
+
+def attach(posts=(), comments=()):
+    """Set ``post.header_html`` and ``comment.body_html`` with one cache round trip.
+
+    Misses are rendered and written back with a single ``set_many``.
+    """
+    wanted = {}
+    for post in posts:
+        wanted[post_key(post)] = (post, 'header_html', 'feed/partials/post_header.html', {'post': post})
+    for comment in comments:
+        wanted[comment_key(comment)] = (comment, 'body_html', 'feed/partials/comment_body.html', {'comment': comment})
+    if not wanted:
+        return
+
+    cached = cache.get_many(list(wanted))
+    rendered = {}
+    for key, (obj, attr, template, context) in wanted.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(template, context)
+        setattr(obj, attr, mark_safe(html))
+    if rendered:
+        cache.set_many(rendered, settings.FEED_FRAGMENT_TTL)
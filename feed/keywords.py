@@ -0,0 +1,99 @@
+"""Keyword extraction and the post keyword index.
+
+Post content is tokenized with NLTK, stop words (scikit-learn's English list)
+are dropped and the remaining words are Porter-stemmed, so "painting" and
+"paintings" share one :class:`~feed.models.Keyword`. Each post keeps its top
+``FEED_KEYWORDS_PER_POST`` terms as :class:`~feed.models.PostKeyword` rows
+weighted by term frequency; ``Post.keywords`` holds a readable copy, and
+stays NULL until the post has been indexed.
+
+Posts are indexed by the ``index_post_keywords`` job queued on create; the
+hourly ``index_missing_keywords`` job picks up any post still NULL. Deleting
+a post takes it out of the document frequencies (``feed.signals``).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from nltk.stem import PorterStemmer
+from nltk.tokenize import RegexpTokenizer
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from feed.models import Keyword, Post, PostKeyword
+from search import documents as search_documents
+
+# Words of two or more letters; a leading '#' is dropped so hashtags index as words
+_tokenizer = RegexpTokenizer(r"[^\W\d_]{2,}")
+_stemmer = PorterStemmer()
+
+
+def extract(text, limit=None):
+    """Top ``(term, word, count)`` triples for ``text``, most frequent first.
+
+    ``term`` is the stem stored in the index, ``word`` the first surface
+    form it was seen as.
+    """
+    limit = limit or settings.FEED_KEYWORDS_PER_POST
+    counts = Counter()
+    words = {}
+    for token in _tokenizer.tokenize((text or '').lower()):
+        if token in ENGLISH_STOP_WORDS:
+            continue
+        term = _stemmer.stem(token)[:64]
+        counts[term] += 1
+        words.setdefault(term, token)
+    return [(term, words[term], count) for term, count in counts.most_common(limit)]
+
+
+def index_post(post):
+    """Replace ``post``'s keyword rows with those extracted from its content."""
+    extracted = [] if post.is_draft else extract(post.content)
+    terms = [term for term, _word, _count in extracted]
+
+    with transaction.atomic():
+        unindex_post(post)
+        post.keyword_entries.all().delete()
+
+        Keyword.objects.bulk_create([Keyword(term=term) for term in terms], ignore_conflicts=True)
+        keyword_ids = dict(Keyword.objects.filter(term__in=terms).values_list('term', 'id'))
+        PostKeyword.objects.bulk_create([
+            PostKeyword(post=post, keyword_id=keyword_ids[term], weight=min(count, 32767))
+            for term, _word, count in extracted
+        ])
+        Keyword.objects.filter(id__in=keyword_ids.values()).update(post_count=F('post_count') + 1)
+
+        post.keywords = ', '.join(word for _term, word, _count in extracted)[:255]
+        Post.objects.filter(pk=post.pk).update(keywords=post.keywords)
+        # update() sends no post_save, so the search document is refreshed here
+        search_documents.update(post, update_fields=['keywords'])
+
+
+def unindex_post(post):
+    """Take ``post``'s terms out of the document frequencies (its rows are left to the caller)."""
+    keyword_ids = list(post.keyword_entries.values_list('keyword_id', flat=True))
+    Keyword.objects.filter(id__in=keyword_ids).update(post_count=Greatest(F('post_count') - 1, 0))
+
+
+def index_missing(limit=None):
+    """Index up to ``limit`` posts that have never been indexed; returns how many."""
+    posts = Post.objects.filter(keywords__isnull=True).order_by('id')[:limit or settings.FEED_KEYWORDS_BATCH]
+    indexed = 0
+    for post in posts:
+        index_post(post)
+        indexed += 1
+    return indexed
+
+
+def recount():
+    """Recompute every ``Keyword.post_count`` from the index."""
+    counts = dict(
+        PostKeyword.objects.values('keyword').annotate(n=Count('post')).values_list('keyword', 'n')
+    )
+    keywords = list(Keyword.objects.only('id', 'post_count'))
+    for keyword in keywords:
+        keyword.post_count = counts.get(keyword.id, 0)
+    Keyword.objects.bulk_update(keywords, ['post_count'], batch_size=500)
+    # Terms no longer used by any post
+    Keyword.objects.filter(post_count=0).delete()
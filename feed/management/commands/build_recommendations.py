@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from feed import collaborative
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute per-user recommendations with item-item collaborative "
+        "filtering. The job worker runs this hourly (JOBS_PERIODIC)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, help="Posts stored per user (default FEED_RECOMMEND_LIMIT)")
+        parser.add_argument('--neighbors', type=int, help="Similar posts kept per post (default FEED_CF_NEIGHBORS)")
+        parser.add_argument('--days', type=int, help="Interaction window in days, 0 for all (default FEED_CF_DAYS)")
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Compute and report without writing the lists",
+        )
+
+    def handle(self, *args, **options):
+        stats = collaborative.build(
+            top_n=options['top'],
+            neighbors=options['neighbors'],
+            days=options['days'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(
+            f"{stats.users} user(s) x {stats.posts} post(s), {stats.interactions} interaction(s)"
+        )
+        for phase, seconds in stats.timings.items():
+            self.stdout.write(f"  {phase}: {seconds:.2f}s")
+        self.stdout.write(
+            f"User coverage: {stats.users_covered}/{stats.users} ({stats.user_coverage:.1%}), "
+            f"catalog coverage: {stats.posts_recommended}/{stats.posts} ({stats.catalog_coverage:.1%})"
+        )
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Stored recommendations for {stats.users} user(s)"))
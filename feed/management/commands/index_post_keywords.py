@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from feed import keywords
+from feed.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the keyword index from post content"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help="Only index posts that have no keyword rows yet",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('id')
+        if options['missing']:
+            posts = posts.filter(keyword_entries__isnull=True)
+        indexed = 0
+        for post in posts.iterator(chunk_size=500):
+            keywords.index_post(post)
+            indexed += 1
+        keywords.recount()
+        self.stdout.write(self.style.SUCCESS(f"Indexed keywords for {indexed} post(s)"))
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feed import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized home timelines from posts and follows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help="Only rebuild this user's timeline (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                timeline.rebuild(user)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} timeline(s)"))
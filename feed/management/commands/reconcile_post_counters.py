@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from feed import counters
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalized Post like/comment counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many posts have drifted",
+        )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{fixed} post(s) have drifted counters")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired counters on {fixed} post(s)"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from feed import trending
+
+
+class Command(BaseCommand):
+    help = "Drop aged-out posts from the trending index (the job worker does this hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Also recompute scores in the trending window from likes and comments",
+        )
+
+    def handle(self, *args, **options):
+        demoted = trending.sweep()
+        self.stdout.write(f"Removed {demoted} post(s) older than the trending window")
+        if options['rebuild']:
+            rebuilt = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt trending scores for {rebuilt} post(s)"))
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_comment_like_alter_post_options_remove_post_likes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Post created at')),
+                ('reason', models.CharField(choices=[('own', 'Own post'), ('follow', 'Followed author'), ('like', 'Liked by someone you follow')], default='follow', max_length=10)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='feed.post', verbose_name='Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL, verbose_name='Timeline owner')),
+            ],
+            options={
+                'verbose_name': 'Timeline entry',
+                'verbose_name_plural': 'Timeline entries',
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='feed_timeli_user_id_6a8d22_idx')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+    ]
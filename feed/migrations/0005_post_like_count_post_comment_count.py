@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('feed', 'Post')
+    Like = apps.get_model('feed', 'Like')
+    Comment = apps.get_model('feed', 'Comment')
+
+    def count_of(model):
+        counts = (
+            model.objects.filter(post=OuterRef('pk'))
+            .values('post').annotate(total=Count('id')).values('total')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    Post.objects.update(like_count=count_of(Like), comment_count=count_of(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comments'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Likes'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0006_post_updated_at_comment_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True, verbose_name='Term')),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Posts')),
+            ],
+            options={
+                'verbose_name': 'Keyword',
+                'verbose_name_plural': 'Keywords',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.PositiveSmallIntegerField(default=1, verbose_name='Term frequency')),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_entries', to='feed.keyword')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keyword_entries', to='feed.post')),
+            ],
+            options={
+                'verbose_name': 'Post keyword',
+                'verbose_name_plural': 'Post keywords',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='posts', through='feed.PostKeyword', to='feed.keyword', verbose_name='Tags'),
+        ),
+        migrations.AddIndex(
+            model_name='postkeyword',
+            index=models.Index(fields=['keyword', '-post'], name='feed_postke_keyword_91aca3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='postkeyword',
+            unique_together={('post', 'keyword')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0007_keyword_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_ids', models.JSONField(blank=True, default=list, verbose_name='Recommended posts')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Computed at')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_list', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Recommendation list',
+                'verbose_name_plural': 'Recommendation lists',
+            },
+        ),
+    ]
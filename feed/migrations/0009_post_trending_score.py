@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0008_recommendationlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Trending score'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['trending_score', 'id'], name='feed_post_trendin_867390_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from feed import trending
+
+
+def backfill_trending(apps, schema_editor):
+    trending.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_trending, migrations.RunPython.noop),
+    ]
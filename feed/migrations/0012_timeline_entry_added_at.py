@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0011_backfill_trending_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='created_at',
+            field=models.DateTimeField(verbose_name='Added at'),
+        ),
+    ]
@@ -23,6 +23,13 @@ class Post(models.Model):
         null=True,
         verbose_name=_("Image")
     )
+    # Resized copies and placeholder, written by uploads.images
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_("Image variants")
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_("Created at")
@@ -41,6 +48,32 @@ class Post(models.Model):
         null=True,
         verbose_name=_("Keywords")
     )
+    # Normalized keyword index, filled by feed.keywords.index_post
+    tags = models.ManyToManyField(
+        "Keyword",
+        through="PostKeyword",
+        related_name="posts",
+        blank=True,
+        verbose_name=_("Tags")
+    )
+    # Denormalized counters, kept in sync with F() updates in the views
+    like_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Likes")
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Comments")
+    )
+    # Log-space decayed engagement, see feed.trending; null once out of the window
+    trending_score = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("Trending score")
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -49,21 +82,13 @@ class Post(models.Model):
         indexes = [
             models.Index(fields=['created_at']),
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['trending_score', 'id']),
         ]
 
     def __str__(self):
         return f"Post #{self.id} by {self.user.username}"
 
-    @property
-    def like_count(self):
-        """Optimized like count using cached relation"""
-        return self.likes.count()
-
-    @property
-    def comment_count(self):
-        """Optimized comment count"""
-        return self.comments.count()
-
     def recent_comments(self, limit=3):
         """Get recent comments with prefetch"""
         return self.comments.select_related('user').order_by('-created_at')[:limit]
@@ -155,6 +180,7 @@ class Comment(models.Model):
         verbose_name_plural = _("Comments")
         indexes = [
             models.Index(fields=['post', 'created_at']),
+            models.Index(fields=['created_at']),
             models.Index(fields=['parent']),
         ]
 
@@ -168,5 +194,122 @@ class Comment(models.Model):
         super().save(*args, **kwargs)
 
 
-    
- 
\ No newline at end of file
+class TimelineEntry(models.Model):
+    """Materialized home timeline row, written on fan-out"""
+    REASON_CHOICES = [
+        ('own', _('Own post')),
+        ('follow', _('Followed author')),
+        ('like', _('Liked by someone you follow')),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name=_("Timeline owner")
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name=_("Post")
+    )
+    # When the post entered the timeline (post.created_at, or the like's time
+    # for reason='like') so the timeline can be read from its own index
+    created_at = models.DateTimeField(
+        verbose_name=_("Added at")
+    )
+    reason = models.CharField(
+        max_length=10,
+        default='follow',
+        choices=REASON_CHOICES
+    )
+
+    class Meta:
+        unique_together = ('user', 'post')
+        verbose_name = _("Timeline entry")
+        verbose_name_plural = _("Timeline entries")
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post']),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in {self.user}'s timeline"
+
+
+class Keyword(models.Model):
+    """A normalized (stemmed) term extracted from post content"""
+    term = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_("Term")
+    )
+    # Document frequency, used as the IDF input by the recommender
+    post_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Posts")
+    )
+
+    class Meta:
+        verbose_name = _("Keyword")
+        verbose_name_plural = _("Keywords")
+
+    def __str__(self):
+        return self.term
+
+
+class PostKeyword(models.Model):
+    """Inverted index row: ``keyword`` occurs ``weight`` times in ``post``"""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="keyword_entries"
+    )
+    keyword = models.ForeignKey(
+        Keyword,
+        on_delete=models.CASCADE,
+        related_name="post_entries"
+    )
+    weight = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name=_("Term frequency")
+    )
+
+    class Meta:
+        unique_together = ('post', 'keyword')
+        verbose_name = _("Post keyword")
+        verbose_name_plural = _("Post keywords")
+        indexes = [
+            models.Index(fields=['keyword', '-post']),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} in post #{self.post_id}"
+
+
+class RecommendationList(models.Model):
+    """Precomputed recommendations for one user, written by build_recommendations"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="recommendation_list",
+        verbose_name=_("User")
+    )
+    # Post ids, best first
+    post_ids = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Recommended posts")
+    )
+    computed_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Computed at")
+    )
+
+    class Meta:
+        verbose_name = _("Recommendation list")
+        verbose_name_plural = _("Recommendation lists")
+
+    def __str__(self):
+        return f"Recommendations for {self.user}"
@@ -0,0 +1,140 @@
+"""Content-based recommendations over the keyword index.
+
+Posts are TF-IDF vectors over :class:`~feed.models.Keyword` ids, built as
+sparse matrices straight from :class:`~feed.models.PostKeyword` rows. A
+user's profile is the normalized sum of the posts they recently liked or
+commented on, and candidates are scored by cosine similarity against it.
+
+Candidates come from the inverted index (posts sharing at least one profile
+term, newest first) and are scored in chunks; scoring stops once
+``FEED_RECOMMEND_BUDGET`` seconds have passed, keeping the best ``k`` so far.
+Results are cached per user so paging through the feed sees a stable list.
+This is the fallback for users without a precomputed collaborative list
+(see :mod:`feed.collaborative`); it runs in a background job
+(``recommend_for_user``), never in the request.
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import now
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from feed.models import Post, PostKeyword, RecommendationList
+
+
+def _key(user_id):
+    return f'recommendations:{user_id}'
+
+
+def _tfidf(rows, total_posts):
+    """Row-normalized TF-IDF matrix for ``(post_id, keyword_id, weight, df)`` rows."""
+    post_ids = sorted({row[0] for row in rows})
+    positions = {post_id: i for i, post_id in enumerate(post_ids)}
+    if not rows:
+        return post_ids, sparse.csr_matrix((0, 1))
+
+    post_col, keyword_col, tf, df = (np.asarray(column) for column in zip(*rows))
+    # Same smoothing and sublinear tf as sklearn's TfidfTransformer
+    idf = np.log((1 + total_posts) / (1 + df.astype(float))) + 1
+    values = (1 + np.log(tf.astype(float))) * idf
+    matrix = sparse.csr_matrix(
+        (values, (np.array([positions[p] for p in post_col]), keyword_col)),
+        shape=(len(post_ids), int(keyword_col.max()) + 1),
+    )
+    return post_ids, normalize(matrix)
+
+
+def _rows(post_ids):
+    return list(
+        PostKeyword.objects.filter(post_id__in=post_ids)
+        .values_list('post_id', 'keyword_id', 'weight', 'keyword__post_count')
+    )
+
+
+def _seed_ids(user):
+    """Posts the user recently engaged with, which define their profile."""
+    return list(
+        Post.objects.filter(Q(likes__user=user) | Q(comments__user=user))
+        .order_by('-created_at')
+        .values_list('id', flat=True)
+        .distinct()[:settings.FEED_KEYWORD_SAMPLE]
+    )
+
+
+def recommend(user, k=None, budget=None):
+    """Ids of up to ``k`` posts most similar to ``user``'s interests, best first."""
+    k = k or settings.FEED_RECOMMEND_LIMIT
+    budget = settings.FEED_RECOMMEND_BUDGET if budget is None else budget
+    deadline = time.monotonic() + budget
+
+    seed_ids = _seed_ids(user)
+    seed_rows = _rows(seed_ids)
+    if not seed_rows:
+        return []
+    total_posts = Post.objects.filter(is_draft=False).count()
+    _ids, seed_matrix = _tfidf(seed_rows, total_posts)
+    profile = normalize(sparse.csr_matrix(seed_matrix.sum(axis=0)))
+    profile_terms = np.unique(seed_matrix.indices).tolist()
+
+    candidate_ids = list(
+        PostKeyword.objects.filter(keyword_id__in=profile_terms, post__is_draft=False)
+        .exclude(post__user=user)
+        .exclude(post_id__in=seed_ids)
+        .order_by('-post_id')
+        .values_list('post_id', flat=True)
+        .distinct()[:settings.FEED_RECOMMEND_CANDIDATES]
+    )
+
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0)
+    chunk = settings.FEED_RECOMMEND_CHUNK
+    for start in range(0, len(candidate_ids), chunk):
+        post_ids, matrix = _tfidf(_rows(candidate_ids[start:start + chunk]), total_posts)
+        # Align column counts before the sparse dot product
+        width = max(matrix.shape[1], profile.shape[1])
+        matrix.resize(matrix.shape[0], width)
+        query = profile.copy()
+        query.resize(1, width)
+        scores = (matrix @ query.T).toarray().ravel()
+
+        best_ids = np.concatenate([best_ids, np.asarray(post_ids, dtype=np.int64)])
+        best_scores = np.concatenate([best_scores, scores])
+        if len(best_scores) > k:
+            top = np.argpartition(-best_scores, k - 1)[:k]
+            best_ids, best_scores = best_ids[top], best_scores[top]
+        if time.monotonic() > deadline:
+            break
+
+    order = np.lexsort((-best_ids, -best_scores))
+    return [int(post_id) for post_id, score in zip(best_ids[order], best_scores[order]) if score > 0]
+
+
+def store(user):
+    """Save and cache :func:`recommend`'s list for ``user``."""
+    post_ids = recommend(user)
+    RecommendationList.objects.update_or_create(user=user, defaults={'post_ids': post_ids, 'computed_at': now()})
+    cache.set(_key(user.id), post_ids, settings.FEED_RECOMMEND_TTL)
+    return post_ids
+
+
+def get_recommendations(user):
+    """Recommended post ids for ``user``, best first.
+
+    Reads the list precomputed by ``build_recommendations``, which may be
+    empty. Users it has nothing for get an empty list while
+    ``recommend_for_user`` computes the content-based one in the background.
+    """
+    post_ids = cache.get(_key(user.id))
+    if post_ids is None:
+        post_ids = RecommendationList.objects.filter(user=user).values_list('post_ids', flat=True).first()
+        if post_ids is None:
+            from feed import tasks  # tasks imports this module
+
+            tasks.recommend_for_user.delay(user.id, dedupe_key=f'recommend_for_user:{user.id}')
+            post_ids = []
+        cache.set(_key(user.id), post_ids, settings.FEED_RECOMMEND_TTL)
+    return post_ids
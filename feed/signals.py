@@ -0,0 +1,14 @@
+"""Keep the keyword document frequencies in step with post deletes."""
+from django.db.models.signals import pre_delete
+
+from feed import keywords
+from feed.models import Post
+
+
+def _deleting(sender, instance, **kwargs):
+    # Before the PostKeyword rows cascade away with the post
+    keywords.unindex_post(instance)
+
+
+def connect():
+    pre_delete.connect(_deleting, sender=Post, dispatch_uid='keyword_unindex_post')
@@ -0,0 +1,106 @@
+"""Background tasks for the feed app (see :mod:`jobs.queue`).
+
+Timeline fan-out runs here rather than in the request; the tasks take ids and
+quietly do nothing if the rows have been deleted in the meantime. Jobs can
+run out of order (several workers, retries with backoff), so ``follow``,
+``unfollow``, ``fan_out_like`` and ``unlike`` act on the current follow or
+like state rather than the event.
+"""
+from django.contrib.auth import get_user_model
+
+from feed import collaborative, counters, keywords, recommend, timeline, trending
+from feed.models import Like, Post
+from jobs.queue import task
+
+User = get_user_model()
+Follow = User.following.through
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.select_related('user').filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@task
+def fan_out_like(user_id, post_id):
+    # Gone if it was unliked in the meantime; that unlike's job cleans up
+    like = Like.objects.select_related('user', 'post').filter(user_id=user_id, post_id=post_id).first()
+    if like is not None:
+        timeline.fan_out_like(like)
+
+
+@task
+def unlike(user_id, post_id):
+    # Liked again since: keep the entries that like's fan-out wrote
+    if Like.objects.filter(user_id=user_id, post_id=post_id).exists():
+        return
+    user = User.objects.filter(pk=user_id).first()
+    post = Post.objects.filter(pk=post_id).first()
+    if user is not None and post is not None:
+        timeline.on_unlike(user, post)
+
+
+def _follows(follower_id, followee_id):
+    return Follow.objects.filter(from_customuser_id=follower_id, to_customuser_id=followee_id).exists()
+
+
+@task
+def follow(follower_id, followee_id):
+    # Jobs aren't ordered: skip if an unfollow already ran (or will run) after this
+    if not _follows(follower_id, followee_id):
+        return
+    users = User.objects.in_bulk([follower_id, followee_id])
+    if len(users) == 2:
+        timeline.on_follow(users[follower_id], users[followee_id])
+
+
+@task
+def unfollow(follower_id, followee_id):
+    # Followed again since: keep the entries that follow's backfill wrote
+    if _follows(follower_id, followee_id):
+        return
+    users = User.objects.in_bulk([follower_id, followee_id])
+    if len(users) == 2:
+        timeline.on_unfollow(users[follower_id], users[followee_id])
+
+
+@task
+def reconcile_counters():
+    counters.reconcile()
+
+
+@task(max_attempts=3)
+def index_post_keywords(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        keywords.index_post(post)
+
+
+@task
+def index_missing_keywords():
+    keywords.index_missing()
+
+
+@task
+def recount_keywords():
+    keywords.recount()
+
+
+@task
+def update_trending():
+    trending.sweep()
+
+
+@task
+def build_recommendations():
+    collaborative.build()
+
+
+@task(max_attempts=2)
+def recommend_for_user(user_id):
+    """Content-based list for a user ``build_recommendations`` had nothing for."""
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        recommend.store(user)
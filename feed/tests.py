@@ -1,3 +1,733 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from scipy import sparse
+
+from feed import collaborative, counters, fragments, keywords, recommend, tasks as feed_tasks, timeline, trending
+from feed.decorate import decorate_posts
+from feed.delta import InvalidSince, Position, collect_updates, encode_since, make_since, parse_since
+from feed.engine import InvalidCursor, Source, TimelineSource, decode_cursor, encode_cursor, get_feed_page
+from feed.models import Comment, Keyword, Like, Post, PostKeyword, RecommendationList, TimelineEntry
+from jobs.models import Job
+from users.models import CustomUser, UserInteraction
+
+
+def _token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class CursorEncodingTests(SimpleTestCase):
+    def test_round_trip_keeps_microseconds_and_timezone(self):
+        moment = datetime.datetime(2025, 3, 1, 12, 30, 45, 123456, tzinfo=datetime.timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor('latest', [moment, 42])), ('latest', [moment, 42]))
+
+    def test_round_trip_without_key(self):
+        self.assertEqual(decode_cursor(encode_cursor('trending', None)), ('trending', None))
+
+    def test_round_trip_float_key(self):
+        self.assertEqual(decode_cursor(encode_cursor('trending', [12.5, 7])), ('trending', [12.5, 7]))
+
+    def test_token_is_url_safe(self):
+        token = encode_cursor('latest', [timezone.now(), 10 ** 12])
+        self.assertNotIn('=', token)
+        self.assertTrue(set(token) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'))
+
+    def test_unencodable_key_raises(self):
+        with self.assertRaises(TypeError):
+            encode_cursor('latest', [object()])
+
+    def test_malformed_tokens_are_rejected(self):
+        for token in ['%%%', 'a', _token('latest'), _token({'a': 1}), _token([1, None]),
+                      _token(['latest', 'x']), base64.urlsafe_b64encode(b'\xff\xfe').decode()]:
+            with self.subTest(token=token), self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+
+class CursorPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        Post.objects.bulk_create([Post(user=author, content=f'post {i}') for i in range(5)])
+
+    def get_page(self, cursor=None):
+        sources = [Source('latest', Post.objects.all())]
+        return get_feed_page(self.user, cursor=cursor, page_size=2, sources=sources)
+
+    def test_pages_follow_cursor_without_repeats(self):
+        seen, cursor = [], None
+        while True:
+            page = self.get_page(cursor)
+            seen.extend(post.id for post in page.posts)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_tampered_cursors_are_rejected(self):
+        moment = timezone.now()
+        for token in [
+            encode_cursor('recommended', None),        # not one of the sources
+            encode_cursor('latest', [moment]),         # key too short
+            encode_cursor('latest', [moment, 1, 2]),   # key too long
+            encode_cursor('latest', [moment, 'abc']),  # id isn't a number
+            encode_cursor('latest', ['yesterday', 1]),  # not a datetime
+            encode_cursor('latest', [[1], 1]),
+        ]:
+            with self.subTest(cursor=decode_cursor(token)), self.assertRaises(InvalidCursor):
+                self.get_page(token)
+
+    def test_feed_view_redirects_on_bad_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/feed/', {'cursor': '%%%'}, HTTP_HOST='localhost', secure=True)
+        self.assertRedirects(response, '/feed/', fetch_redirect_response=False)
+
+
+class PostCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        cls.fan = CustomUser.objects.create_user('fan', email='fan@example.com', password='x')
+
+    def setUp(self):
+        self.post = Post.objects.create(user=self.author, content='hello')
+
+    def counts(self):
+        self.post.refresh_from_db(fields=['like_count', 'comment_count'])
+        return self.post.like_count, self.post.comment_count
+
+    def test_adjust_adds_and_never_goes_negative(self):
+        counters.adjust(self.post.id, likes=2, comments=1)
+        self.assertEqual(self.counts(), (2, 1))
+        counters.adjust(self.post.id, likes=-5, comments=-1)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_adjust_bumps_updated_at(self):
+        before = self.post.updated_at
+        counters.adjust(self.post.id, likes=1)
+        self.post.refresh_from_db(fields=['updated_at'])
+        self.assertGreater(self.post.updated_at, before)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Comment.objects.create(user=self.fan, post=self.post, content='nice')
+        Comment.objects.create(user=self.author, post=self.post, content='thanks')
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=0)
+        untouched = Post.objects.create(user=self.author, content='quiet')
+
+        self.assertEqual(counters.reconcile(dry_run=True), 1)
+        self.assertEqual(self.counts(), (7, 0))
+        self.assertEqual(counters.reconcile(), 1)
+        self.assertEqual(self.counts(), (1, 2))
+        self.assertEqual(counters.reconcile(), 0)
+        untouched.refresh_from_db()
+        self.assertEqual((untouched.like_count, untouched.comment_count), (0, 0))
+
+    def test_like_toggle_keeps_count_in_step(self):
+        self.client.force_login(self.fan)
+        url = reverse('like_post', args=[self.post.id])
+        self.assertEqual(self.client.post(url, HTTP_HOST='localhost', secure=True).json()['new_like_count'], 1)
+        self.assertEqual(self.client.post(url, HTTP_HOST='localhost', secure=True).json()['new_like_count'], 0)
+        self.assertEqual(counters.reconcile(dry_run=True), 0)
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        cls.fan = CustomUser.objects.create_user('fan', email='fan@example.com', password='x')
+
+    def score(self, post):
+        post.refresh_from_db(fields=['trending_score'])
+        return post.trending_score
+
+    def comment_count(self, post):
+        post.refresh_from_db(fields=['comment_count'])
+        return post.comment_count
+
+    def test_remove_several_events_at_once(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        trending.add(post.id, 'post', post.created_at)
+        alone = self.score(post)
+        moments = [timezone.now() - datetime.timedelta(minutes=m) for m in (1, 5, 30)]
+        for moment in moments:
+            trending.add(post.id, 'comment', moment)
+        trending.remove(post.id, 'comment', *moments)
+        self.assertAlmostEqual(self.score(post), alone, places=6)
+
+    def test_rebuild_matches_incremental_scores(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        old = Post.objects.create(user=self.author, content='old')
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=30))
+        like = Like.objects.create(user=self.fan, post=post)
+        trending.add(post.id, 'post', post.created_at)
+        trending.add(post.id, 'like', like.created_at)
+        incremental = self.score(post)
+        Post.objects.update(trending_score=None)
+
+        self.assertEqual(trending.rebuild(), 1)
+        self.assertAlmostEqual(self.score(post), incremental, places=6)
+        self.assertIsNone(self.score(old))
+
+    def test_sweep_drops_aged_out_posts(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        trending.add(post.id, 'post', post.created_at)
+        self.assertEqual(trending.sweep(), 0)
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - datetime.timedelta(days=30))
+        feed_tasks.update_trending()
+        self.assertIsNone(self.score(post))
+
+    def test_deleting_a_comment_takes_back_its_replies(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        trending.add(post.id, 'post', post.created_at)
+        alone = self.score(post)
+        comment = Comment.objects.create(user=self.fan, post=post, content='first')
+        reply = Comment.objects.create(user=self.author, post=post, parent=comment, content='reply')
+        nested = Comment.objects.create(user=self.fan, post=post, parent=reply, content='nested')
+        for c in (comment, reply, nested):
+            trending.add(post.id, 'comment', c.created_at)
+        counters.adjust(post.id, comments=3)
+
+        self.client.force_login(self.fan)
+        self.client.post(reverse('delete_comment', args=[comment.id]), HTTP_HOST='localhost', secure=True)
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        self.assertEqual(self.comment_count(post), 0)
+        self.assertAlmostEqual(self.score(post), alone, places=6)
+
+
+class FragmentKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+
+    def fresh(self, post):
+        return Post.objects.select_related('user').get(pk=post.pk)
+
+    def test_likes_and_comments_keep_the_post_key(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        key = fragments.post_key(self.fresh(post))
+        counters.adjust(post.id, likes=1, comments=1)
+        self.assertEqual(fragments.post_key(self.fresh(post)), key)
+
+    def test_edits_change_the_post_key(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        key = fragments.post_key(self.fresh(post))
+        Post.objects.filter(pk=post.pk).update(content='hello, edited')
+        self.assertNotEqual(fragments.post_key(self.fresh(post)), key)
+        edited = fragments.post_key(self.fresh(post))
+        CustomUser.objects.filter(pk=self.author.pk).update(username='renamed')
+        self.assertNotEqual(fragments.post_key(self.fresh(post)), edited)
+
+
+@override_settings(FEED_COMMENT_PREVIEW=3)
+class DecoratePostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def make_page(self, posts, comments):
+        page = [Post.objects.create(user=self.author, content=f'post {i}') for i in range(posts)]
+        for post in page:
+            for i in range(comments):
+                Comment.objects.create(user=self.reader if i % 2 else self.author, post=post, content=f'comment {i}')
+        Like.objects.create(user=self.reader, post=page[0])
+        return list(Post.objects.filter(id__in=[post.id for post in page]).select_related('user'))
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for posts, comments in [(1, 0), (5, 2), (20, 10)]:
+            with self.subTest(posts=posts, comments=comments):
+                page = self.make_page(posts, comments)
+                with self.assertNumQueries(2):
+                    decorate_posts(page, self.reader)
+                # Reading what the cards use costs nothing more
+                with self.assertNumQueries(0):
+                    for post in page:
+                        [comment.user.username for comment in post.top_comments]
+                        post.liked_by_me
+
+    def test_anonymous_viewers_and_no_previews_skip_queries(self):
+        page = self.make_page(3, 2)
+        with self.assertNumQueries(1):
+            decorate_posts(page, AnonymousUser())
+        with self.assertNumQueries(1):
+            decorate_posts(page, self.reader, comment_limit=0)
+        with self.assertNumQueries(0):
+            self.assertEqual(decorate_posts([], self.reader), [])
+
+    def test_decorations(self):
+        first, second = sorted(self.make_page(2, 5), key=lambda post: post.id)
+        decorate_posts([first, second], self.reader)
+        self.assertEqual((first.liked_by_me, second.liked_by_me), (True, False))
+        newest = list(Comment.objects.filter(post=second).order_by('-created_at', '-id')[:3])
+        self.assertEqual(second.top_comments, newest)
+
+    def test_feed_page_cost_is_flat(self):
+        self.client.force_login(self.reader)
+
+        def queries(page_size):
+            with override_settings(FEED_PAGE_SIZE=page_size), CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse('feed'), HTTP_HOST='localhost', secure=True)
+            return len(captured)
+
+        self.make_page(20, 4)
+        queries(2)  # Warm up sessions, recommendations and caches
+        self.assertEqual(queries(2), queries(20))
+
+
+@override_settings(FEED_TIMELINE_ENABLED=True)
+class FollowTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        cls.post = Post.objects.create(user=cls.author, content='hello')
+
+    def entries(self):
+        return TimelineEntry.objects.filter(user=self.reader, post=self.post).count()
+
+    def test_follow_after_its_unfollow_does_nothing(self):
+        # follow and unfollow were both queued; unfollow ran first
+        feed_tasks.unfollow(self.reader.id, self.author.id)
+        feed_tasks.follow(self.reader.id, self.author.id)
+        self.assertEqual(self.entries(), 0)
+
+    def test_unfollow_after_a_refollow_does_nothing(self):
+        self.reader.following.add(self.author)
+        feed_tasks.follow(self.reader.id, self.author.id)
+        feed_tasks.unfollow(self.reader.id, self.author.id)
+        self.assertEqual(self.entries(), 1)
+
+    def test_in_order_events_apply(self):
+        self.reader.following.add(self.author)
+        feed_tasks.follow(self.reader.id, self.author.id)
+        self.assertEqual(self.entries(), 1)
+        self.reader.following.remove(self.author)
+        feed_tasks.unfollow(self.reader.id, self.author.id)
+        self.assertEqual(self.entries(), 0)
+
+
+@override_settings(FEED_TIMELINE_ENABLED=True, FEED_FANOUT_LIMIT=1, JOBS_EAGER=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        cls.friend = CustomUser.objects.create_user('friend', email='friend@example.com', password='x')
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        cls.star = CustomUser.objects.create_user('star', email='star@example.com', password='x')
+        cls.reader.following.add(cls.friend, cls.star)
+        # Over FEED_FANOUT_LIMIT
+        CustomUser.objects.filter(pk=cls.star.pk).update(follower_count=2)
+        cls.star.refresh_from_db()
+
+    def entry(self, user, post):
+        return TimelineEntry.objects.filter(user=user, post=post).values_list('reason', 'created_at').first()
+
+    def post(self, user, minutes_ago, **kwargs):
+        post = Post.objects.create(user=user, content='hello', **kwargs)
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - datetime.timedelta(minutes=minutes_ago))
+        post.refresh_from_db()
+        return post
+
+    def like(self, user, post):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('like_post', args=[post.id]), HTTP_HOST='localhost', secure=True)
+        return response.json()['liked']
+
+    def page(self, page_size=10, cursor=None):
+        source = TimelineSource(self.reader, Post.objects.filter(is_draft=False))
+        return get_feed_page(self.reader, cursor, page_size=page_size, sources=[source])
+
+    def test_posts_fan_out_to_followers_except_for_celebrities(self):
+        post = self.post(self.friend, 0)
+        timeline.fan_out_post(post)
+        self.assertEqual(self.entry(self.reader, post), ('follow', post.created_at))
+        self.assertEqual(self.entry(self.friend, post), ('own', post.created_at))
+
+        starred = self.post(self.star, 0)
+        timeline.fan_out_post(starred)
+        self.assertIsNone(self.entry(self.reader, starred))
+        self.assertEqual(self.entry(self.star, starred)[0], 'own')
+
+        draft = self.post(self.friend, 0, is_draft=True)
+        timeline.fan_out_post(draft)
+        self.assertFalse(TimelineEntry.objects.filter(post=draft).exists())
+
+    def test_liked_post_is_surfaced_at_the_like(self):
+        old = self.post(self.author, 60 * 24)
+        newer = self.post(self.friend, 60)
+        timeline.fan_out_post(newer)
+
+        self.assertTrue(self.like(self.friend, old))
+        like = Like.objects.get(user=self.friend, post=old)
+        self.assertEqual(self.entry(self.reader, old), ('like', like.created_at))
+        self.assertEqual(self.page().posts, [old, newer])
+
+    def test_unlike_takes_the_entry_back(self):
+        post = self.post(self.author, 60)
+        self.like(self.friend, post)
+        self.assertFalse(self.like(self.friend, post))
+        self.assertIsNone(self.entry(self.reader, post))
+
+    def test_unlike_keeps_posts_another_followee_likes(self):
+        other = CustomUser.objects.create_user('other', email='other@example.com', password='x')
+        self.reader.following.add(other)
+        post = self.post(self.author, 60)
+        self.like(self.friend, post)
+        self.like(other, post)
+        self.like(self.friend, post)
+        self.assertEqual(self.entry(self.reader, post)[0], 'like')
+
+    def test_like_jobs_act_on_the_current_like(self):
+        post = self.post(self.author, 60)
+        # fan_out_like queued, then the like was undone before it ran
+        feed_tasks.fan_out_like(self.friend.id, post.id)
+        self.assertIsNone(self.entry(self.reader, post))
+        # unlike queued, then the post was liked again before it ran
+        Like.objects.create(user=self.friend, post=post)
+        feed_tasks.fan_out_like(self.friend.id, post.id)
+        feed_tasks.unlike(self.friend.id, post.id)
+        self.assertEqual(self.entry(self.reader, post)[0], 'like')
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        posts = [self.post(user, minutes) for user, minutes in [
+            (self.star, 10), (self.friend, 20), (self.star, 30), (self.friend, 40), (self.author, 50),
+        ]]
+        for post in posts:
+            timeline.fan_out_post(post)
+
+        first = self.page(page_size=2)
+        second = self.page(page_size=2, cursor=first.next_cursor)
+        self.assertEqual(first.posts, posts[:2])
+        self.assertEqual(second.posts, posts[2:4])
+        self.assertFalse(second.has_next)
+
+    def test_liked_celebrity_post_is_served_once(self):
+        post = self.post(self.star, 60 * 24)
+        recent = self.post(self.friend, 60)
+        timeline.fan_out_post(recent)
+        self.like(self.friend, post)
+
+        first = self.page(page_size=1)
+        rest = self.page(cursor=first.next_cursor)
+        self.assertEqual(first.posts + rest.posts, [post, recent])
+
+    @override_settings(FEED_TIMELINE_LENGTH=3)
+    def test_rebuild_timelines(self):
+        own = self.post(self.reader, 10)
+        followed = [self.post(self.friend, minutes) for minutes in (20, 30, 40)]
+        self.post(self.star, 5)
+        self.post(self.friend, 1, is_draft=True)
+        TimelineEntry.objects.create(user=self.reader, post=self.post(self.author, 0), created_at=timezone.now())
+
+        call_command('rebuild_timelines', usernames=['reader'], stdout=StringIO())
+        entries = TimelineEntry.objects.filter(user=self.reader).order_by('-created_at')
+        self.assertEqual(
+            [(entry.post, entry.reason) for entry in entries],
+            [(own, 'own'), (followed[0], 'follow'), (followed[1], 'follow')],
+        )
+        self.assertFalse(TimelineEntry.objects.exclude(user=self.reader).exists())
+
+
+class SinceTokenTests(SimpleTestCase):
+    def test_round_trip(self):
+        moment = datetime.datetime(2025, 3, 1, 12, 30, 45, 123457, tzinfo=datetime.timezone.utc)
+        positions = {
+            'new_posts': Position(moment, frozenset({(3, 1740832245123457)})),
+            'changed_posts': Position(moment),
+            'new_comments': Position(moment, frozenset({(1, 1740832245123457), (2, 1740832245123458)})),
+        }
+        self.assertEqual(parse_since(encode_since(positions)), positions)
+
+    def test_page_token_starts_every_list(self):
+        moment = datetime.datetime(2025, 3, 1, 12, 30, 45, 123457, tzinfo=datetime.timezone.utc)
+        positions = parse_since(make_since(moment))
+        self.assertEqual(set(positions.values()), {Position(moment)})
+
+    def test_malformed_tokens_are_rejected(self):
+        for token in [None, '', '%%%', '-5', _token({'new_posts': [1, []]}), _token([1, 2]),
+                      _token({name: [1, [[1]]] for name in ('new_posts', 'changed_posts', 'new_comments')})]:
+            with self.subTest(token=token), self.assertRaises(InvalidSince):
+                parse_since(token)
+
+
+@override_settings(FEED_UPDATES_LAG=5)
+class FeedUpdatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+
+    def setUp(self):
+        self.start = make_since(timezone.now() - datetime.timedelta(seconds=10))
+
+    def poll_all(self, since, **kwargs):
+        """Every item delivered by polling until there's nothing left."""
+        seen = {'new_posts': [], 'changed_posts': [], 'new_comments': []}
+        for _ in range(20):
+            delta = collect_updates(parse_since(since), **kwargs)
+            if not delta:
+                return seen, since
+            for name, items in seen.items():
+                items.extend(item.id for item in getattr(delta, name))
+            since = delta.since
+        self.fail("Polling never settled")
+
+    def test_nothing_is_delivered_twice(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        seen, since = self.poll_all(self.start)
+        self.assertEqual(seen, {'new_posts': [post.id], 'changed_posts': [], 'new_comments': []})
+
+        counters.adjust(post.id, likes=1)
+        seen, _ = self.poll_all(since)
+        self.assertEqual(seen['changed_posts'], [post.id])
+        self.assertEqual(seen['new_posts'], [])
+
+    def test_row_committed_after_the_poll_is_still_delivered(self):
+        first = Post.objects.create(user=self.author, content='first')
+        delta = collect_updates(parse_since(self.start))
+        self.assertEqual(delta.new_posts, [first])
+        # Stamped before that poll ran, committed after it
+        late = Post.objects.create(user=self.author, content='late')
+        Post.objects.filter(pk=late.pk).update(created_at=timezone.now() - datetime.timedelta(seconds=2))
+
+        delta = collect_updates(parse_since(delta.since))
+        self.assertEqual(delta.new_posts, [late])
+
+    @override_settings(FEED_UPDATES_LIMIT=2)
+    def test_truncated_lists_continue_next_poll(self):
+        posts = [Post.objects.create(user=self.author, content=f'post {i}') for i in range(5)]
+        old = Post.objects.create(user=self.author, content='old')
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=1))
+        comments = [Comment.objects.create(user=self.reader, post=old, content=f'c{i}') for i in range(3)]
+
+        first = collect_updates(parse_since(self.start))
+        self.assertEqual(len(first.new_posts), 2)
+        self.assertEqual([post.id for post in first.new_posts], [posts[1].id, posts[0].id])
+
+        seen, _ = self.poll_all(self.start)
+        self.assertEqual(sorted(seen['new_posts']), [post.id for post in posts])
+        self.assertEqual(seen['new_comments'], [comment.id for comment in comments])
+        self.assertEqual(seen['changed_posts'], [old.id])
+
+    def test_post_detail_only_sees_its_post(self):
+        post = Post.objects.create(user=self.author, content='hello')
+        other = Post.objects.create(user=self.author, content='other')
+        comment = Comment.objects.create(user=self.reader, post=post, content='hi')
+        Comment.objects.create(user=self.reader, post=other, content='hi')
+        seen, _ = self.poll_all(self.start, post_id=post.id)
+        self.assertEqual(seen, {'new_posts': [], 'changed_posts': [post.id], 'new_comments': [comment.id]})
+
+    def test_endpoint(self):
+        self.client.force_login(self.reader)
+        url = reverse('feed_updates')
+        get = lambda since: self.client.get(url, {'since': since}, HTTP_HOST='localhost', secure=True)
+
+        self.assertEqual(get('not a token').status_code, 400)
+        post = Post.objects.create(user=self.author, content='hello')
+        response = get(self.start)
+        data = response.json()
+        self.assertEqual(data['new_post_ids'], [post.id])
+        self.assertEqual(response['X-Feed-Since'], data['since'])
+
+        response = get(data['since'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Feed-Since'], data['since'])
+
+
+class CollaborativeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann, cls.ben, cls.cat = (
+            CustomUser.objects.create_user(name, email=f'{name}@example.com', password='x')
+            for name in ('ann', 'ben', 'cat')
+        )
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+        cls.p1, cls.p2 = (Post.objects.create(user=cls.author, content=f'post {i}') for i in (1, 2))
+        cls.own = Post.objects.create(user=cls.ann, content="ann's post")
+
+    def like(self, user, *posts):
+        Like.objects.bulk_create([Like(user=user, post=post) for post in posts])
+
+    def test_interaction_matrix_sums_weighted_signals(self):
+        self.like(self.ann, self.p1)
+        Comment.objects.create(user=self.ann, post=self.p1, content='nice')
+        UserInteraction.objects.create(user=self.ben, post=self.p2, interaction_type='VIEW')
+        draft = Post.objects.create(user=self.author, content='draft', is_draft=True)
+        self.like(self.ben, draft)
+
+        user_ids, post_ids, matrix = collaborative.interaction_matrix()
+        self.assertEqual((user_ids, post_ids), ([self.ann.id, self.ben.id], [self.p1.id, self.p2.id]))
+        np.testing.assert_allclose(matrix.toarray(), [[3.0, 0.0], [0.0, 0.25]])
+
+    def test_similarity_keeps_the_strongest_neighbors(self):
+        matrix = sparse.csr_matrix(np.array([
+            [1, 1, 1],
+            [1, 1, 0],
+            [0, 1, 1],
+        ], dtype=np.float32))
+        similarity = collaborative.item_similarity(matrix, neighbors=1)
+        self.assertTrue(all(count <= 1 for count in np.diff(similarity.indptr)))
+        self.assertEqual(similarity.diagonal().tolist(), [0, 0, 0])
+        # Post 1 shares every user with the other two and is each one's nearest
+        self.assertEqual(similarity.indices.tolist(), [1, 0, 1])
+
+    def test_build_skips_seen_and_own_posts_and_prunes(self):
+        self.like(self.ann, self.p1)
+        self.like(self.ben, self.p1, self.p2, self.own)
+        RecommendationList.objects.create(user=self.ann, post_ids=[1, 2, 3])
+        stale = RecommendationList.objects.create(
+            user=self.cat, post_ids=[self.p1.id], computed_at=timezone.now() - datetime.timedelta(days=1),
+        )
+
+        stats = collaborative.build()
+        self.assertEqual((stats.users, stats.users_covered), (2, 1))
+        lists = dict(RecommendationList.objects.values_list('user', 'post_ids'))
+        self.assertEqual(lists, {self.ann.id: [self.p2.id], self.ben.id: []})
+        self.assertFalse(RecommendationList.objects.filter(pk=stale.pk).exists())
+
+    def test_dry_run_writes_nothing(self):
+        self.like(self.ann, self.p1)
+        self.like(self.ben, self.p1, self.p2)
+        collaborative.build(dry_run=True)
+        self.assertFalse(RecommendationList.objects.exists())
+
+
+@override_settings(JOBS_EAGER=False)
+class GetRecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stored_lists_are_used_even_when_empty(self):
+        RecommendationList.objects.create(user=self.user, post_ids=[])
+        with mock.patch.object(recommend, 'recommend') as compute:
+            self.assertEqual(recommend.get_recommendations(self.user), [])
+            cache.clear()
+            self.assertEqual(recommend.get_recommendations(self.user), [])
+        compute.assert_not_called()
+        self.assertFalse(Job.objects.exists())
+
+    def test_missing_list_is_computed_in_the_background(self):
+        with mock.patch.object(recommend, 'recommend', return_value=[7, 3]) as compute:
+            self.assertEqual(recommend.get_recommendations(self.user), [])
+            cache.clear()
+            recommend.get_recommendations(self.user)
+            compute.assert_not_called()
+            job = Job.objects.get()
+            self.assertEqual((job.task, job.args), ('feed.tasks.recommend_for_user', [self.user.id]))
+
+            feed_tasks.recommend_for_user(self.user.id)
+        self.assertEqual(recommend.get_recommendations(self.user), [7, 3])
+        self.assertEqual(RecommendationList.objects.get(user=self.user).post_ids, [7, 3])
+
+
+class KeywordTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+
+    def post(self, content, **kwargs):
+        return Post.objects.create(user=self.author, content=content, **kwargs)
+
+    def df(self):
+        return dict(Keyword.objects.values_list('term', 'post_count'))
+
+    def test_extract_stems_and_drops_stop_words(self):
+        self.assertEqual(
+            keywords.extract('The painting and #paintings of the painter, 2024!'),
+            [('paint', 'painting', 2), ('painter', 'painter', 1)],
+        )
+        self.assertEqual(keywords.extract('a b c the and', limit=5), [])
+        self.assertEqual(len(keywords.extract('harbour boats lights gulls', limit=2)), 2)
+
+    def test_index_post_counts_documents_once(self):
+        first = self.post('harbour boats')
+        second = self.post('harbour lights')
+        keywords.index_post(first)
+        keywords.index_post(second)
+        keywords.index_post(second)  # reindexing replaces, doesn't add
+        self.assertEqual(self.df(), {'harbour': 2, 'boat': 1, 'light': 1})
+        self.assertEqual(first.keywords, 'harbour, boats')
+        self.assertEqual(PostKeyword.objects.filter(post=second).count(), 2)
+
+    def test_drafts_get_no_keywords(self):
+        draft = self.post('harbour boats', is_draft=True)
+        keywords.index_post(draft)
+        draft.refresh_from_db()
+        self.assertEqual((draft.keywords, self.df()), ('', {}))
+
+    def test_deleting_a_post_lowers_document_frequency(self):
+        first = self.post('harbour boats')
+        second = self.post('harbour lights')
+        keywords.index_post(first)
+        keywords.index_post(second)
+        first.delete()
+        self.assertEqual(self.df(), {'harbour': 1, 'boat': 0, 'light': 1})
+        keywords.recount()
+        self.assertEqual(self.df(), {'harbour': 1, 'light': 1})
+
+    @override_settings(JOBS_EAGER=False)
+    def test_create_post_queues_indexing(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('new_post'), {'content': 'harbour boats'}, HTTP_HOST='localhost', secure=True)
+        post = Post.objects.get()
+        self.assertIsNone(post.keywords)
+        self.assertTrue(Job.objects.filter(task='feed.tasks.index_post_keywords', args=[post.id]).exists())
+
+        feed_tasks.index_post_keywords(post.id)
+        post.refresh_from_db()
+        self.assertEqual(post.keywords, 'harbour, boats')
+
+    def test_index_missing_picks_up_unindexed_posts(self):
+        posts = [self.post(f'harbour {word}') for word in ('boats', 'lights', 'gulls')]
+        keywords.index_post(posts[0])
+        self.assertEqual(keywords.index_missing(limit=1), 1)
+        self.assertEqual(keywords.index_missing(), 1)
+        self.assertEqual(keywords.index_missing(), 0)
+        self.assertEqual(self.df()['harbour'], 3)
+
+
+class ContentRecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user('reader', email='reader@example.com', password='x')
+        cls.author = CustomUser.objects.create_user('author', email='author@example.com', password='x')
+
+    def post(self, content, user=None):
+        post = Post.objects.create(user=user or self.author, content=content)
+        keywords.index_post(post)
+        return post
+
+    def test_similar_posts_rank_first(self):
+        liked = self.post('harbour boats at dawn')
+        Like.objects.create(user=self.reader, post=liked)
+        close = self.post('boats in the harbour')
+        loose = self.post('harbour cafe menu')
+        self.post('mountain snow')
+        self.post('harbour boats', user=self.reader)  # own posts are skipped
+
+        self.assertEqual(recommend.recommend(self.reader), [close.id, loose.id])
+
+    def test_no_engagement_means_no_recommendations(self):
+        self.post('harbour boats')
+        self.assertEqual(recommend.recommend(self.reader), [])
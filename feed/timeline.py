@@ -0,0 +1,122 @@
+"""Precomputed per-user home timelines (fan-out-on-write).
+
+Writes push post ids into the ``TimelineEntry`` rows of the users who should
+see them, so reading a home timeline is a range scan over
+``(user, created_at, post)``. An entry's time is when the post entered the
+timeline: the post's own time, or for a post surfaced by the like of someone
+the user follows, the like's time, so it shows up on top rather than buried
+at the day it was posted. Authors with more than ``FEED_FANOUT_LIMIT``
+followers are not fanned out; their posts are merged in at read time instead.
+Everything here is a no-op unless ``FEED_TIMELINE_ENABLED`` is set.
+"""
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from feed.models import Like, Post, TimelineEntry
+
+
+def is_enabled():
+    return settings.FEED_TIMELINE_ENABLED
+
+
+def is_celebrity(user):
+    """Authors whose posts are pulled on read instead of pushed on write."""
+    return user.follower_count > settings.FEED_FANOUT_LIMIT
+
+
+def followed_celebrity_ids(user):
+    return list(
+        user.following.filter(follower_count__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('id', flat=True)
+    )
+
+
+def push(post, user_ids, reason='follow', at=None):
+    """Insert ``post`` into the timelines of ``user_ids`` at ``at`` (default: when it was posted).
+
+    Users who already have the post keep their entry.
+    """
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, created_at=at or post.created_at, reason=reason)
+            for user_id in user_ids
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    """Deliver a new post to its author and, for regular authors, their followers."""
+    if not is_enabled() or post.is_draft:
+        return
+    push(post, [post.user_id], reason='own')
+    if not is_celebrity(post.user):
+        push(post, post.user.followers.values_list('id', flat=True))
+
+
+def fan_out_like(like):
+    """Surface a liked post in the timelines of the liker's followers, at the time of the like."""
+    user, post = like.user, like.post
+    if not is_enabled() or post.is_draft or is_celebrity(user):
+        return
+    follower_ids = user.followers.exclude(id=post.user_id).values_list('id', flat=True)
+    push(post, follower_ids, reason='like', at=like.created_at)
+
+
+def on_unlike(user, post):
+    """Take back what :func:`fan_out_like` surfaced, unless another followed user still likes it."""
+    if not is_enabled():
+        return
+    liked_by_followee = Like.objects.filter(
+        post=post,
+        user__followers=OuterRef('user'),
+        user__follower_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).exclude(user=user)
+    TimelineEntry.objects.filter(
+        user__in=user.followers.all(), post=post, reason='like'
+    ).exclude(Exists(liked_by_followee)).delete()
+
+
+def on_follow(follower, followee):
+    """Backfill the followee's recent posts into the follower's timeline."""
+    if not is_enabled() or is_celebrity(followee):
+        return
+    recent = Post.objects.filter(user=followee, is_draft=False).order_by('-created_at')
+    for post in recent[:settings.FEED_FOLLOW_BACKFILL]:
+        push(post, [follower.id])
+
+
+def on_unfollow(follower, followee):
+    if not is_enabled():
+        return
+    TimelineEntry.objects.filter(
+        user=follower, post__user=followee, reason='follow'
+    ).delete()
+
+
+def rebuild(user):
+    """Recompute ``user``'s timeline from scratch, capped at ``FEED_TIMELINE_LENGTH``.
+
+    Posts surfaced by likes are not restored; only new likes fan out again.
+    """
+    celebrity_ids = followed_celebrity_ids(user)
+    authors = Q(user=user) | Q(user__in=user.following.exclude(id__in=celebrity_ids))
+    posts = (
+        Post.objects.filter(authors, is_draft=False)
+        .order_by('-created_at')
+        .only('id', 'user_id', 'created_at')[:settings.FEED_TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.filter(user=user).delete()
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user=user,
+                post=post,
+                created_at=post.created_at,
+                reason='own' if post.user_id == user.id else 'follow',
+            )
+            for post in posts
+        ],
+        batch_size=500,
+    )
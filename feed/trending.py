@@ -0,0 +1,96 @@
+"""Time-decayed trending scores stored on ``Post.trending_score``.
+
+Every event (the post itself, a like, a comment) contributes its weight,
+halving every ``FEED_TRENDING_HALF_LIFE`` seconds. Rather than decaying all
+rows over time, the score is kept in log space relative to a fixed epoch::
+
+    trending_score = log(sum(weight * 2 ** ((event_time - EPOCH) / half_life)))
+
+All posts decay at the same rate, so ordering by the stored column at any
+moment equals ordering by the decayed score, and an event is a single
+``UPDATE`` (a log-sum-exp with its contribution). :func:`sweep` drops posts
+older than ``FEED_TRENDING_DAYS`` out of the index and runs hourly as the
+``update_trending`` job; :func:`rebuild` recomputes scores from the ``Like``
+and ``Comment`` tables (migration 0011 ran it for existing posts).
+"""
+import datetime
+import math
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils.timezone import now
+
+from feed.models import Comment, Like, Post
+
+EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Guards Ln() against a zero argument when removing the largest contribution
+_TINY = 1e-12
+
+
+def contribution(weight, moment=None):
+    """Log-space value of an event of ``weight`` happening at ``moment``."""
+    moment = moment or now()
+    rate = math.log(2) / settings.FEED_TRENDING_HALF_LIFE
+    return math.log(weight) + (moment - EPOCH).total_seconds() * rate
+
+
+def add(post_id, kind, moment=None):
+    """Add one ``kind`` event ('post', 'like' or 'comment') to a post's score."""
+    x = Value(contribution(settings.FEED_TRENDING_WEIGHTS[kind], moment), output_field=FloatField())
+    score = F('trending_score')
+    Post.objects.filter(pk=post_id).update(trending_score=Case(
+        When(trending_score__isnull=True, then=x),
+        default=Greatest(score, x) + Ln(1 + Exp(-Abs(score - x))),
+        output_field=FloatField(),
+    ))
+
+
+def remove(post_id, kind, *moments):
+    """Take back events previously added at ``moments`` (e.g. an unlike) in one UPDATE."""
+    if not moments:
+        return
+    values = [contribution(settings.FEED_TRENDING_WEIGHTS[kind], moment) for moment in moments]
+    peak = max(values)
+    total = peak + math.log(sum(math.exp(v - peak) for v in values))
+    x = Value(total, output_field=FloatField())
+    score = F('trending_score')
+    Post.objects.filter(pk=post_id, trending_score__isnull=False).update(
+        trending_score=score + Ln(Greatest(1 - Exp(x - score), Value(_TINY)))
+    )
+
+
+def _window_start():
+    return now() - datetime.timedelta(days=settings.FEED_TRENDING_DAYS)
+
+
+def sweep():
+    """Drop posts that have aged out of the trending window; returns how many."""
+    return Post.objects.filter(
+        trending_score__isnull=False, created_at__lt=_window_start()
+    ).update(trending_score=None)
+
+
+def rebuild(queryset=None, apps=global_apps):
+    """Recompute scores for posts in the trending window from their events.
+
+    ``apps`` lets migration 0011 run it with historical models.
+    """
+    weights = settings.FEED_TRENDING_WEIGHTS
+    Post, Like, Comment = (apps.get_model('feed', name) for name in ('Post', 'Like', 'Comment'))
+    posts = Post.objects.all() if queryset is None else queryset
+    posts = list(posts.filter(is_draft=False, created_at__gte=_window_start()).only('id', 'created_at'))
+    events = {post.id: [contribution(weights['post'], post.created_at)] for post in posts}
+    for model, kind in ((Like, 'like'), (Comment, 'comment')):
+        rows = model.objects.filter(post_id__in=list(events)).values_list('post_id', 'created_at')
+        for post_id, created_at in rows.iterator():
+            events[post_id].append(contribution(weights[kind], created_at))
+
+    for post in posts:
+        values = events[post.id]
+        peak = max(values)
+        post.trending_score = peak + math.log(sum(math.exp(v - peak) for v in values))
+    Post.objects.bulk_update(posts, ['trending_score'], batch_size=500)
+    return len(posts)
@@ -1,11 +1,12 @@
 from django.urls import path
 from .views import (
-    feed_view, post_detail_view, create_post, delete_post, like_post, add_comment, delete_comment,
+    feed_view, feed_updates, post_detail_view, create_post, delete_post, like_post, add_comment, delete_comment,
 )
 
 urlpatterns = [
     # Feed & Posts Routes
     path('', feed_view, name='feed'),
+    path('updates/', feed_updates, name='feed_updates'),
     path('post/new/', create_post, name='new_post'),
     path('post/<int:post_id>/', post_detail_view, name='post_detail'),
     path('post/<int:post_id>/delete/', delete_post, name='delete_post'),
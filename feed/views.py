@@ -1,70 +1,80 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.db.models import Count, Q, F, Value, IntegerField, Case, When
-from django.utils.timezone import now
-from django.views.decorators.http import require_POST
-import datetime
+from django.db import transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from creaverse import events
+from users import counters as user_counters, leaderboard
 from feed.models import Post, Like
+from . import counters, fragments, tasks, timeline, trending
+from .decorate import decorate_posts
+from .delta import InvalidSince, collect_updates, make_since, parse_since
+from .engine import InvalidCursor, get_feed_page
 from .models import Comment   
 
 # AI-Powered Feed View
 @login_required
 def feed_view(request):
-    """Fetches posts with AI-powered recommendations, trending posts, and latest posts."""
-
-    # Fetch user interactions (posts they liked or commented on)
-    user_interactions = Post.objects.filter(
-        Q(likes__user=request.user) | Q(comments__user=request.user)  
-    ).distinct()
-
-    # Extract keywords from interacted posts
-    interacted_keywords = set()
-    for post in user_interactions:
-        if hasattr(post, 'keywords') and post.keywords:  
-            interacted_keywords.update(post.keywords.split(', '))
-
-    # Convert set to list for filtering
-    interacted_keywords = list(interacted_keywords)
-
-    # Get posts matching those keywords (excluding the user's own posts)
-    recommended_posts = Post.objects.filter(
-        Q(keywords__in=interacted_keywords)
-    ).exclude(user=request.user).distinct() if interacted_keywords else Post.objects.none()
-
-    # Add ranking based on likes & comments
-    trending_posts = Post.objects.annotate(
-        num_likes=Count('likes'),
-        num_comments=Count('comments'),
-        relevance_score=F('num_likes') * 2 + F('num_comments')  # Weighted ranking
-    ).order_by('-relevance_score', '-created_at')
-
-    # Get latest posts but make sure they are not too old
-    time_threshold = now() - datetime.timedelta(days=7)
-    latest_posts = Post.objects.filter(created_at__gte=time_threshold).order_by('-created_at')
-
-    # Personalization: Boost posts that user has interacted with
-    personalized_posts = Post.objects.annotate(
-        interacted=Case(
-            When(likes__user=request.user, then=Value(1)),  # Fixed: Changed likes= to likes__user=
-            When(comments__user=request.user, then=Value(1)),
-            default=Value(0),
-            output_field=IntegerField(),
-        )
-    ).order_by('-interacted', '-created_at')
-
-    # Combine: Prioritize recommended -> personalized -> trending -> latest
-    all_posts = list(recommended_posts) + list(personalized_posts) + list(trending_posts) + list(latest_posts)
-
-    # Remove duplicate posts
-    seen = set()
-    unique_posts = []
-    for post in all_posts:
-        if post.id not in seen:
-            seen.add(post.id)
-            unique_posts.append(post)
-
-    return render(request, 'feed/feed.html', {'posts': unique_posts})
+    """Serves one page of the merged recommended/personalized/trending/latest feed."""
+    since = make_since()
+    try:
+        page = get_feed_page(request.user, cursor=request.GET.get('cursor'))
+    except InvalidCursor:
+        return redirect('feed')
+
+    return render(request, 'feed/feed.html', {
+        'posts': decorate_posts(page.posts, request.user),
+        'next_cursor': page.next_cursor,
+        'since': since,
+    })
+
+
+# Feed Updates (polling)
+@login_required
+@require_GET
+def feed_updates(request):
+    """Returns posts and comments changed since the client's last poll, or 304."""
+    try:
+        since = parse_since(request.GET.get('since'))
+        post_id = int(request.GET['post']) if request.GET.get('post') else None
+    except (InvalidSince, ValueError):
+        return HttpResponseBadRequest('Invalid since or post parameter')
+
+    delta = collect_updates(since, post_id=post_id)
+    if not delta:
+        response = HttpResponseNotModified()
+        response['X-Feed-Since'] = request.GET['since']
+        return response
+
+    decorate_posts(delta.new_posts, request.user)
+    fragments.attach(comments=delta.new_comments)
+    if request.htmx:
+        response = render(request, 'feed/partials/feed_updates.html', {
+            'delta': delta,
+            'post_id': post_id,
+        })
+    else:
+        response = JsonResponse({
+            'since': delta.since,
+            'new_post_ids': [post.id for post in delta.new_posts],
+            'posts': [
+                {'id': post.id, 'like_count': post.like_count, 'comment_count': post.comment_count}
+                for post in delta.changed_posts
+            ],
+            'comments': [
+                {
+                    'id': comment.id,
+                    'post_id': comment.post_id,
+                    'username': comment.user.username,
+                    'comment_text': comment.content,
+                    'timestamp': comment.created_at.strftime('%b %d, %Y, %I:%M %p'),
+                }
+                for comment in delta.new_comments
+            ],
+        })
+    response['X-Feed-Since'] = delta.since
+    return response
 
 
 # Create Post
@@ -74,7 +84,16 @@ def create_post(request):
     if request.method == "POST":
         content = request.POST.get("content")
         if content.strip():
-            Post.objects.create(user=request.user, content=content)
+            with transaction.atomic():
+                post = Post.objects.create(user=request.user, content=content)
+                user_counters.adjust(request.user.id, posts=1)
+            tasks.index_post_keywords.delay(post.id, dedupe_key=f'index_post_keywords:{post.id}')
+            trending.add(post.id, 'post', post.created_at)
+            if leaderboard.affects(request.user):
+                leaderboard.invalidate()
+            if timeline.is_enabled():
+                tasks.fan_out_post.delay(post.id)
+            events.publish('feed', 'post', {'post_id': post.id})
     return redirect("feed")
 
 
@@ -82,9 +101,12 @@ def create_post(request):
 @login_required
 def post_detail_view(request, post_id):
     """Displays the details of a single post along with comments."""
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all().order_by('created_at')
-    return render(request, 'feed/post_detail.html', {'post': post, 'comments': comments})
+    post = get_object_or_404(Post.objects.select_related('user'), id=post_id)
+    decorate_posts([post], request.user, comment_limit=0)
+    since = make_since()
+    comments = list(post.comments.select_related('user').order_by('created_at'))
+    fragments.attach(comments=comments)
+    return render(request, 'feed/post_detail.html', {'post': post, 'comments': comments, 'since': since})
 
 
 # Like Post
@@ -92,18 +114,29 @@ def post_detail_view(request, post_id):
 @require_POST
 def like_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
-
-    if not created:
-        like.delete()
-        liked = False
-    else:
-        liked = True
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=request.user, post=post)
+
+        if not created:
+            like.delete()
+            counters.adjust(post.id, likes=-1)
+            trending.remove(post.id, 'like', like.created_at)
+            liked = False
+        else:
+            counters.adjust(post.id, likes=1)
+            trending.add(post.id, 'like', like.created_at)
+            liked = True
+    post.refresh_from_db(fields=['like_count'])
+    events.publish('feed', 'like', {'post_id': post.id, 'like_count': post.like_count})
+
+    if timeline.is_enabled():
+        task = tasks.fan_out_like if liked else tasks.unlike
+        task.delay(request.user.id, post.id)
 
     return JsonResponse({
         'success': True,
         'liked': liked,
-        'new_like_count': post.likes.count()
+        'new_like_count': post.like_count
     })
 
 
@@ -115,15 +148,21 @@ def add_comment(request, post_id):
     content = request.POST.get("content")
 
     if content.strip():
-        comment = Comment.objects.create(
-            post=post,
-            user=request.user,
-            content=content
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                user=request.user,
+                content=content
+            )
+            counters.adjust(post.id, comments=1)
+            trending.add(post.id, 'comment', comment.created_at)
+            events.publish('feed', 'comment', {'post_id': post.id, 'comment_id': comment.id})
         return JsonResponse({
             'success': True,
+            'comment_id': comment.id,
             'comment_text': comment.content,
             'username': comment.user.username,
+            'profile_url': reverse('profile', kwargs={'username': comment.user.username}),
             'timestamp': comment.created_at.strftime('%b %d, %Y, %I:%M %p')
         })
 
@@ -137,10 +176,24 @@ def delete_post(request, post_id):
     """Allows the post owner to delete their post."""
     post = get_object_or_404(Post, id=post_id)
     if post.user == request.user:
-        post.delete()
+        with transaction.atomic():
+            post.delete()
+            user_counters.adjust(request.user.id, posts=-1)
+        if leaderboard.affects(request.user):
+            leaderboard.invalidate()
     return redirect('feed')
 
 
+def _thread_created_at(comment):
+    """Creation times of ``comment`` and every reply below it, at any depth."""
+    moments, parents = [comment.created_at], [comment.id]
+    while parents:
+        replies = list(Comment.objects.filter(parent_id__in=parents).values_list('id', 'created_at'))
+        parents = [reply_id for reply_id, _ in replies]
+        moments.extend(created_at for _, created_at in replies)
+    return moments
+
+
 # Delete Comment
 @login_required
 @require_POST
@@ -148,6 +201,11 @@ def delete_comment(request, comment_id):
     """Allows the comment owner or post owner to delete a comment."""
     comment = get_object_or_404(Comment, id=comment_id)
     if comment.user == request.user or comment.post.user == request.user:
-        comment.delete()
+        with transaction.atomic():
+            # Replies cascade with their parent, so count everything removed
+            moments = _thread_created_at(comment)
+            _, deleted = comment.delete()
+            counters.adjust(comment.post_id, comments=-deleted.get('feed.Comment', 0))
+            trending.remove(comment.post_id, 'comment', *moments)
     return redirect('post_detail', post_id=comment.post.id)
 
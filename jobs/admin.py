@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'dedupe_key')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error')
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs']
+
+    @admin.action(description="Retry selected failed jobs now")
+    def retry_jobs(self, request, queryset):
+        # Skip jobs whose dedupe_key already has a queued job doing the same work
+        queued_keys = Job.objects.filter(status=Job.QUEUED, dedupe_key__isnull=False).values('dedupe_key')
+        retried = queryset.filter(status=Job.FAILED).exclude(dedupe_key__in=queued_keys).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f"Requeued {retried} job(s).")
@@ -0,0 +1,62 @@
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import worker
+
+# Seconds between stale-lock, periodic and purge housekeeping passes
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (emails, image variants, feed fan-out, "
+        "maintenance). Run one or more alongside the web process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due jobs and exit")
+        parser.add_argument('--batch', type=int, help="Jobs claimed per poll (default JOBS_BATCH_SIZE)")
+        parser.add_argument('--sleep', type=float, help="Idle poll interval (default JOBS_POLL_INTERVAL)")
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        batch = options['batch'] or settings.JOBS_BATCH_SIZE
+        sleep = options['sleep'] or settings.JOBS_POLL_INTERVAL
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        done = failed = 0
+        next_housekeeping = 0
+        self.stdout.write(f"Worker {worker_id} started")
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() >= next_housekeeping:
+                worker.requeue_stale()
+                worker.enqueue_periodic()
+                worker.purge()
+                next_housekeeping = time.monotonic() + HOUSEKEEPING_INTERVAL
+
+            jobs = worker.claim(worker_id, batch)
+            for job in jobs:
+                if worker.run(job):
+                    done += 1
+                else:
+                    failed += 1
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id} stopped: {done} done, {failed} failed"))
+
+    def _stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self.stopping = True
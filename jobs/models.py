@@ -0,0 +1,98 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """One call of a registered task, run by the ``run_jobs`` worker"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+
+    task = models.CharField(
+        max_length=200,
+        verbose_name=_("Task")
+    )
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Arguments")
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("Keyword arguments")
+    )
+    status = models.CharField(
+        max_length=8,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name=_("Status")
+    )
+    # At most one queued job per key; enqueueing a duplicate is a no-op
+    dedupe_key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name=_("Dedupe key")
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Attempts")
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name=_("Max attempts")
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Run at")
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_("Locked by")
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Locked at")
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name=_("Last error")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Created at")
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Finished at")
+    )
+
+    class Meta:
+        verbose_name = _("Job")
+        verbose_name_plural = _("Jobs")
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='queued'),
+                name='unique_queued_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
@@ -0,0 +1,84 @@
+"""Database-backed background jobs.
+
+Functions decorated with :func:`task` in an app's ``tasks.py`` can be queued
+with ``.delay(*args, **kwargs)``; arguments must be JSON-serializable (pass
+ids, not instances). The job row is written in the caller's transaction, so
+work queued inside ``transaction.atomic()`` only becomes visible to workers
+once it commits, and is dropped if it rolls back.
+
+``dedupe_key`` collapses repeated requests for the same work: while a job
+with that key is still queued, further ones are ignored. Only use it for
+tasks that bring something in line with the current state (regenerating
+variants, periodic maintenance), never for ordered events.
+
+With ``JOBS_EAGER`` set, tasks run in-process after commit instead, which is
+handy for development without a worker.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, dedupe_key=None, run_at=None, **kwargs):
+        enqueue(self.name, args, kwargs, dedupe_key=dedupe_key, run_at=run_at)
+
+
+def task(func=None, *, max_attempts=None):
+    """Register ``func`` as a background task.
+
+    Usage: ``@task`` or ``@task(max_attempts=3)``.
+    """
+    def register(func):
+        registered = Task(func, max_attempts or settings.JOBS_MAX_ATTEMPTS)
+        _registry[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def _run_eagerly(name, args, kwargs):
+    try:
+        _registry[name](*args, **kwargs)
+    except Exception:
+        logger.exception("Eager job %s failed", name)
+
+
+def enqueue(name, args=(), kwargs=None, dedupe_key=None, run_at=None):
+    """Queue a call of the task registered as ``name``."""
+    if name not in _registry:
+        raise LookupError(f"Unknown task {name!r}")
+    args, kwargs = list(args), kwargs or {}
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: _run_eagerly(name, args, kwargs))
+        return
+    job = Job(
+        task=name,
+        args=args,
+        kwargs=kwargs,
+        dedupe_key=dedupe_key,
+        max_attempts=_registry[name].max_attempts,
+        run_at=run_at or now(),
+    )
+    # A conflict can only come from the queued-dedupe_key constraint
+    Job.objects.bulk_create([job], ignore_conflicts=dedupe_key is not None)
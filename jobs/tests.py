@@ -0,0 +1,129 @@
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import worker
+from jobs.models import Job
+from jobs.queue import enqueue, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOBS_EAGER=False)
+class QueueTests(TestCase):
+    def test_delay_writes_a_job(self):
+        record.delay('a')
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.args, job.status, job.max_attempts), (record.name, ['a'], Job.QUEUED, 2))
+
+    def test_unknown_task_is_refused(self):
+        with self.assertRaises(LookupError):
+            enqueue('jobs.tests.missing')
+
+    def test_dedupe_key_collapses_queued_jobs_only(self):
+        record.delay('a', dedupe_key='k')
+        record.delay('b', dedupe_key='k')
+        self.assertEqual(Job.objects.count(), 1)
+
+        worker.claim('w1', 10)
+        # Once the first one is running, the work is needed again
+        record.delay('c', dedupe_key='k')
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+
+@override_settings(JOBS_EAGER=False, JOBS_BACKOFF_BASE=10, JOBS_LOCK_TIMEOUT=60)
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_takes_due_jobs_once(self):
+        record.delay('now')
+        record.delay('later', run_at=timezone.now() + datetime.timedelta(hours=1))
+
+        [job] = worker.claim('w1', 10)
+        self.assertEqual((job.args, job.status, job.locked_by, job.attempts), (['now'], Job.RUNNING, 'w1', 1))
+        self.assertEqual(worker.claim('w2', 10), [])
+
+    def test_claim_respects_limit_and_order(self):
+        for value in range(3):
+            record.delay(value)
+        self.assertEqual([job.args for job in worker.claim('w1', 2)], [[0], [1]])
+        self.assertEqual([job.args for job in worker.claim('w2', 2)], [[2]])
+
+    def test_successful_run(self):
+        record.delay('x')
+        [job] = worker.claim('w1', 1)
+        self.assertTrue(worker.run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, ['x'])
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        explode.delay()
+        [job] = worker.claim('w1', 1)
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            self.assertFalse(worker.run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreaterEqual(job.run_at, timezone.now() + datetime.timedelta(seconds=9))
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [job] = worker.claim('w1', 1)
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertFalse(worker.run(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_task_fails_without_retry(self):
+        Job.objects.create(task='jobs.tests.missing')
+        [job] = worker.claim('w1', 1)
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertFalse(worker.run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_backoff_doubles_and_is_capped(self):
+        with self.settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=100):
+            self.assertTrue(10 <= worker.backoff(1) <= 12.5)
+            self.assertTrue(40 <= worker.backoff(3) <= 50)
+            self.assertTrue(100 <= worker.backoff(10) <= 125)
+
+    def lose(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - datetime.timedelta(minutes=5))
+
+    def test_lost_jobs_are_requeued(self):
+        record.delay('x')
+        [job] = worker.claim('w1', 1)
+        self.lose(job)
+        self.assertEqual(worker.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.QUEUED, '', 1))
+
+    def test_job_lost_on_its_last_attempt_fails(self):
+        record.delay('x')
+        [job] = worker.claim('w1', 1)
+        Job.objects.filter(pk=job.pk).update(attempts=2)
+        self.lose(job)
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertEqual(worker.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(worker.claim('w2', 1), [])
+
+    def test_recent_running_jobs_are_left_alone(self):
+        record.delay('x')
+        worker.claim('w1', 1)
+        self.assertEqual(worker.requeue_stale(), 0)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
@@ -0,0 +1,119 @@
+"""The ``run_jobs`` worker loop: claim, run, retry with backoff.
+
+Workers claim due jobs with a conditional ``UPDATE ... WHERE status='queued'``,
+so several workers (or hosts) can poll the same table without running a job
+twice. A failed job is requeued with exponential backoff until it runs out of
+attempts. Jobs left ``running`` by a worker that died are requeued after
+``JOBS_LOCK_TIMEOUT``, or marked failed if that was their last attempt (a
+job that crashes its worker, e.g. by running out of memory, would otherwise
+loop forever).
+
+Delivery is at least once: a job still running after ``JOBS_LOCK_TIMEOUT``
+is assumed lost and runs a second time alongside the first. Tasks must be
+safe to repeat, and ones that may run longer need a higher timeout.
+"""
+import datetime
+import logging
+import random
+import traceback
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from jobs.models import Job
+from jobs.queue import enqueue, get_task
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(attempts):
+    """Seconds before retry number ``attempts``: doubling, capped and jittered."""
+    delay = min(settings.JOBS_BACKOFF_MAX, settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(1, 1.25)
+
+
+def claim(worker_id, limit):
+    """Lock up to ``limit`` due jobs for ``worker_id`` and return them."""
+    moment = now()
+    due = list(
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=moment)
+        .order_by('run_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    if not due:
+        return []
+    Job.objects.filter(id__in=due, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker_id, locked_at=moment, attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(id__in=due, status=Job.RUNNING, locked_by=worker_id, locked_at=moment))
+
+
+def run(job):
+    """Run one claimed job and record the outcome; returns whether it succeeded."""
+    task = get_task(job.task)
+    try:
+        if task is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        task(*job.args, **job.kwargs)
+    except Exception:
+        _failed(job, traceback.format_exc(), retry=task is not None)
+        return False
+    job.status, job.finished_at, job.last_error = Job.DONE, now(), ''
+    job.save(update_fields=['status', 'finished_at', 'last_error'])
+    return True
+
+
+def _failed(job, error, retry):
+    job.last_error = error[-5000:]
+    if retry and job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_at = now() + datetime.timedelta(seconds=backoff(job.attempts))
+        logger.warning("Job %s #%s failed (attempt %s/%s), retrying", job.task, job.id, job.attempts, job.max_attempts)
+    else:
+        job.status = Job.FAILED
+        job.finished_at = now()
+        logger.error("Job %s #%s failed permanently:\n%s", job.task, job.id, error)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'run_at', 'last_error', 'finished_at'])
+    except IntegrityError:
+        # An identical job was queued meanwhile; it will do the work
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now(), last_error=job.last_error)
+
+
+def requeue_stale():
+    """Return jobs whose worker vanished to the queue; returns how many."""
+    cutoff = now() - datetime.timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    # Lost on its last attempt: likely the job itself took its worker down
+    exhausted = list(stale.filter(attempts__gte=F('max_attempts')))
+    for job in exhausted:
+        logger.error("Job %s #%s was lost on its last attempt, giving up", job.task, job.id)
+    stale.filter(pk__in=[job.pk for job in exhausted]).update(
+        status=Job.FAILED, finished_at=now(), last_error="Worker lost during the last attempt",
+    )
+    requeued = 0
+    for job in stale.filter(attempts__lt=F('max_attempts')):
+        job.status, job.locked_by, job.locked_at = Job.QUEUED, '', None
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'locked_by', 'locked_at'])
+            requeued += 1
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now())
+    return requeued
+
+
+def enqueue_periodic():
+    """Queue ``JOBS_PERIODIC`` tasks that are due; the cache keeps workers from doubling up."""
+    for name, interval in settings.JOBS_PERIODIC.items():
+        if cache.add(f'jobs:periodic:{name}', True, interval):
+            enqueue(name, dedupe_key=f'periodic:{name}')
+
+
+def purge():
+    """Delete finished jobs older than ``JOBS_KEEP_DONE``."""
+    cutoff = now() - datetime.timedelta(seconds=settings.JOBS_KEEP_DONE)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
@@ -0,0 +1,47 @@
+import copy
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Q
+
+from search.backends import search
+from search.documents import KINDS
+
+
+class IndexedSearchMixin:
+    """Admin search that matches indexed text through the full-text index
+
+    The ``search_fields`` the index covers for ``search_kind`` (``content``,
+    ``keywords``) are matched by the backend; the others (``user__username``,
+    ``post__id``) still go through the admin's usual lookups, and so does the
+    text of objects the index leaves out, such as drafts. Rows matching
+    either are listed.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        kind = KINDS[self.search_kind]
+        search_fields = self.get_search_fields(request)
+        indexed = [name for name in search_fields if name in kind.fields]
+        others = [name for name in search_fields if name not in kind.fields]
+
+        limit = settings.SEARCH_ADMIN_LIMIT
+        ids = search(search_term, self.search_kind, limit=limit + 1)
+        if len(ids) > limit:
+            messages.warning(request, f"Only the best {limit} text matches are listed; narrow the search to see others.")
+        matches = Q(pk__in=ids[:limit])
+        if others:
+            matches |= Q(pk__in=self._search(request, queryset, search_term, others).values('pk'))
+        if indexed and kind.indexed:
+            unindexed = queryset.exclude(kind.indexed)
+            matches |= Q(pk__in=self._search(request, unindexed, search_term, indexed).values('pk'))
+        return queryset.filter(matches), False
+
+    def _search(self, request, queryset, search_term, search_fields):
+        """The admin's own lookups over ``search_fields`` only."""
+        admin = copy.copy(self)
+        admin.search_fields = search_fields
+        results, _ = super(IndexedSearchMixin, admin).get_search_results(request, queryset, search_term)
+        return results
@@ -0,0 +1,103 @@
+"""Ranked full-text queries over ``SearchDocument``, one backend per database.
+
+``SEARCH_BACKENDS`` maps ``connection.vendor`` to a backend class:
+
+* :class:`SQLiteBackend` matches against the FTS5 table ``search_fts`` and
+  ranks with BM25, treating the last word as a prefix.
+* :class:`PostgresBackend` matches the generated ``search_vector`` column
+  (GIN-indexed) with ``websearch_to_tsquery`` and ranks with ``ts_rank``.
+* :class:`SimpleBackend` is the fallback for other databases: ``icontains``
+  per word, newest first.
+
+All of them return object ids, best match first.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from search.models import SearchDocument
+
+MAX_TERMS = 8
+
+_WORD = re.compile(r'\w+')
+
+
+def terms(query):
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    def search(self, query, kind, limit, offset=0):
+        raise NotImplementedError
+
+
+class SQLiteBackend(SearchBackend):
+    # Title matches count five times as much as body matches
+    sql = f"""
+        SELECT d.object_id FROM search_fts
+        JOIN {SearchDocument._meta.db_table} d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH %s AND d.kind = %s
+        ORDER BY bm25(search_fts, 5.0, 1.0), d.object_id DESC
+        LIMIT %s OFFSET %s
+    """
+
+    @staticmethod
+    def match(query):
+        words = terms(query)
+        if not words:
+            return None
+        # Quoted so user input can't use FTS5 query syntax
+        return ' '.join(f'"{word}"' for word in words) + '*'
+
+    def search(self, query, kind, limit, offset=0):
+        match = self.match(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(self.sql, [match, kind, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend(SearchBackend):
+    sql = f"""
+        SELECT object_id FROM {SearchDocument._meta.db_table}, websearch_to_tsquery('english', %s) query
+        WHERE kind = %s AND search_vector @@ query
+        ORDER BY ts_rank(search_vector, query) DESC, object_id DESC
+        LIMIT %s OFFSET %s
+    """
+
+    def search(self, query, kind, limit, offset=0):
+        if not terms(query):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(self.sql, [query, kind, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SimpleBackend(SearchBackend):
+    def search(self, query, kind, limit, offset=0):
+        words = terms(query)
+        if not words:
+            return []
+        documents = SearchDocument.objects.filter(kind=kind)
+        for word in words:
+            documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+        return list(documents.order_by('-object_id').values_list('object_id', flat=True)[offset:offset + limit])
+
+
+@functools.cache
+def _backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _backend(settings.SEARCH_BACKENDS.get(connection.vendor, settings.SEARCH_DEFAULT_BACKEND))
+
+
+def search(query, kind, limit=None, offset=0):
+    """Ids of ``kind`` objects matching ``query``, best first."""
+    return get_backend().search(query, kind, limit or settings.SEARCH_PAGE_SIZE, offset)
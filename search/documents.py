@@ -0,0 +1,136 @@
+"""What gets indexed for each searchable model.
+
+Every kind maps a model to the fields its document is built from, a function
+returning ``(title, body)`` and a filter for the objects that are searchable
+at all: drafts aren't, and neither are comments on them. :func:`update` runs
+on save and skips saves whose ``update_fields`` don't touch an indexed field,
+such as ``last_login``; when a post is published or goes back to draft, its
+comments follow.
+
+The functions taking ``apps`` also run from migrations with historical models.
+"""
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.apps import apps as global_apps
+from django.db.models import Q
+
+BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Kind:
+    name: str
+    model: str
+    fields: frozenset
+    build: Callable
+    # Objects that get a document; the rest are dropped from the index
+    indexed: Q = field(default_factory=Q)
+    # (kind, foreign key to this kind) whose searchability follows this one's
+    dependents: tuple = ()
+
+    def get_model(self, apps=global_apps):
+        return apps.get_model(self.model)
+
+
+def _post(post):
+    return '', ' '.join(filter(None, [post.content, post.keywords]))
+
+
+def _comment(comment):
+    return '', comment.content
+
+
+def _user(user):
+    return ' '.join(filter(None, [user.username, user.first_name, user.last_name])), user.bio or ''
+
+
+def _message(message):
+    return '', message.content
+
+
+KINDS = {
+    kind.name: kind
+    for kind in (
+        Kind(
+            'post', 'feed.Post', frozenset({'content', 'keywords', 'is_draft'}), _post,
+            indexed=Q(is_draft=False), dependents=(('comment', 'post'),),
+        ),
+        Kind('comment', 'feed.Comment', frozenset({'content'}), _comment, indexed=Q(post__is_draft=False)),
+        Kind('user', 'users.CustomUser', frozenset({'username', 'first_name', 'last_name', 'bio'}), _user),
+        Kind('message', 'users.Message', frozenset({'content'}), _message),
+    )
+}
+_BY_MODEL = {kind.model: kind for kind in KINDS.values()}
+
+
+def kind_for(model):
+    return _BY_MODEL.get(model._meta.label)
+
+
+def _documents(apps=global_apps):
+    return apps.get_model('search', 'SearchDocument')._default_manager
+
+
+def index(kind, queryset, apps=global_apps):
+    """Index the searchable objects of ``queryset`` and drop the others; returns how many were written."""
+    documents = _documents(apps)
+    model = documents.model
+    searchable = queryset.filter(kind.indexed)
+    written = 0
+    batch = []
+
+    def flush():
+        documents.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'body', 'updated_at'],
+        )
+        return len(batch)
+
+    for obj in searchable.only('pk', *kind.fields).order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        title, body = kind.build(obj)
+        batch.append(model(kind=kind.name, object_id=obj.pk, title=title[:255], body=body))
+        if len(batch) >= BATCH_SIZE:
+            written += flush()
+            batch = []
+    if batch:
+        written += flush()
+
+    hidden = queryset.exclude(pk__in=searchable.values('pk')).values('pk')
+    documents.filter(kind=kind.name, object_id__in=hidden).delete()
+    return written
+
+
+def update(obj, update_fields=None):
+    """Index ``obj`` as it is in the database (or drop it when it isn't searchable)."""
+    kind = kind_for(type(obj))
+    if kind is None or (update_fields is not None and not kind.fields.intersection(update_fields)):
+        return
+    if kind.dependents:
+        was_indexed = _documents().filter(kind=kind.name, object_id=obj.pk).exists()
+    is_indexed = bool(index(kind, type(obj)._base_manager.filter(pk=obj.pk)))
+    if kind.dependents and is_indexed != was_indexed:
+        for name, foreign_key in kind.dependents:
+            dependent = KINDS[name]
+            index(dependent, dependent.get_model()._base_manager.filter(**{foreign_key: obj.pk}))
+
+
+def remove(obj):
+    kind = kind_for(type(obj))
+    if kind is not None:
+        _documents().filter(kind=kind.name, object_id=obj.pk).delete()
+
+
+def rebuild(kinds=None, apps=global_apps):
+    """Reindex every object of ``kinds`` (default: all) and prune stale rows."""
+    written = 0
+    for name in kinds or KINDS:
+        kind = KINDS[name]
+        model = kind.get_model(apps)
+        written += index(kind, model._base_manager.all(), apps)
+        # Documents of deleted objects
+        documents = _documents(apps).filter(kind=name)
+        documents.exclude(object_id__in=model._base_manager.values('pk')).delete()
+    return written
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search import documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index from posts, comments, users and "
+        "messages. Saves keep it up to date and migrations fill it; run this "
+        "after loaddata or bulk imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            dest='kinds',
+            choices=sorted(documents.KINDS),
+            help="Only this kind (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = documents.rebuild(options['kinds'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {written} document(s) in {time.monotonic() - started:.2f}s"
+        ))
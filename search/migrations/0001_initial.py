@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16, verbose_name='Kind')),
+                ('object_id', models.BigIntegerField(verbose_name='Object ID')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Title')),
+                ('body', models.TextField(blank=True, verbose_name='Body')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last updated')),
+            ],
+            options={
+                'verbose_name': 'Search document',
+                'verbose_name_plural': 'Search documents',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+SQLITE = [
+    (
+        """
+        CREATE VIRTUAL TABLE search_fts USING fts5(
+            title, body,
+            content='search_searchdocument', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """,
+        "DROP TABLE IF EXISTS search_fts",
+    ),
+    (
+        """
+        CREATE TRIGGER search_fts_insert AFTER INSERT ON search_searchdocument BEGIN
+            INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS search_fts_insert",
+    ),
+    (
+        """
+        CREATE TRIGGER search_fts_delete AFTER DELETE ON search_searchdocument BEGIN
+            INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS search_fts_delete",
+    ),
+    (
+        """
+        CREATE TRIGGER search_fts_update AFTER UPDATE ON search_searchdocument BEGIN
+            INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+            INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS search_fts_update",
+    ),
+]
+
+POSTGRES = [
+    (
+        """
+        ALTER TABLE search_searchdocument ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(body, '')), 'B')
+        ) STORED
+        """,
+        "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector",
+    ),
+    (
+        "CREATE INDEX search_document_vector_idx ON search_searchdocument USING GIN (search_vector)",
+        "DROP INDEX IF EXISTS search_document_vector_idx",
+    ),
+]
+
+STATEMENTS = {'sqlite': SQLITE, 'postgresql': POSTGRES}
+
+
+def create_index(apps, schema_editor):
+    for forward, _ in STATEMENTS.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(forward)
+
+
+def drop_index(apps, schema_editor):
+    for _, backward in reversed(STATEMENTS.get(schema_editor.connection.vendor, [])):
+        schema_editor.execute(backward)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
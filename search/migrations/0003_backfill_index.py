@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from search import documents
+
+
+def backfill_index(apps, schema_editor):
+    documents.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+        ('feed', '0010_image_variants'),
+        ('users', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_index, migrations.RunPython.noop),
+    ]
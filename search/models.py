@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one post, comment, user or message
+
+    Rows are written by :mod:`search.documents`; the full-text index on top
+    of this table is created per database in migration 0002 (an FTS5 table
+    on SQLite, a generated tsvector column with a GIN index on PostgreSQL).
+    """
+    kind = models.CharField(
+        max_length=16,
+        verbose_name=_("Kind")
+    )
+    object_id = models.BigIntegerField(
+        verbose_name=_("Object ID")
+    )
+    # Weighted above the body when ranking
+    title = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Title")
+    )
+    body = models.TextField(
+        blank=True,
+        verbose_name=_("Body")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Last updated")
+    )
+
+    class Meta:
+        verbose_name = _("Search document")
+        verbose_name_plural = _("Search documents")
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
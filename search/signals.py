@@ -0,0 +1,21 @@
+"""Keep the search index in step with saves and deletes of indexed models."""
+from django.db.models.signals import post_delete, post_save
+
+from search import documents
+
+
+def _saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Fixture loading (raw) is followed by rebuild_search_index instead
+    if not raw:
+        documents.update(instance, update_fields)
+
+
+def _deleted(sender, instance, **kwargs):
+    documents.remove(instance)
+
+
+def connect():
+    for kind in documents.KINDS.values():
+        model = kind.get_model()
+        post_save.connect(_saved, sender=model, dispatch_uid=f'search_index_{kind.name}')
+        post_delete.connect(_deleted, sender=model, dispatch_uid=f'search_unindex_{kind.name}')
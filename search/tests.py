@@ -0,0 +1,166 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from feed import keywords
+from feed.models import Comment, Post
+from search.backends import SQLiteBackend, search
+from search.models import SearchDocument
+from users.models import CustomUser, Message
+
+
+def indexed(kind):
+    return set(SearchDocument.objects.filter(kind=kind).values_list('object_id', flat=True))
+
+
+class IndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+
+    def test_title_matches_rank_first_and_last_word_is_a_prefix(self):
+        painter = CustomUser.objects.create_user('painter', email='p@example.com', password='x')
+        fan = CustomUser.objects.create_user('fan', email='f@example.com', password='x', bio='I love a good painter')
+        self.assertEqual(search('painter', 'user'), [painter.id, fan.id])
+        self.assertEqual(search('pain', 'user'), [painter.id, fan.id])
+        self.assertEqual(search('love pain', 'user'), [fan.id])
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(SQLiteBackend.match('a" OR b* NEAR(c'), '"a" "or" "b" "near" "c"*')
+        self.assertIsNone(SQLiteBackend.match('*** ""'))
+        self.assertEqual(search('***', 'post'), [])
+
+    def test_updates_replace_the_indexed_text(self):
+        post = Post.objects.create(user=self.alice, content='morning light')
+        self.assertEqual(search('morning', 'post'), [post.id])
+        post.content = 'evening light'
+        post.save()
+        self.assertEqual(search('morning', 'post'), [])
+        self.assertEqual(search('evening', 'post'), [post.id])
+
+    def test_saves_of_other_fields_are_skipped(self):
+        CustomUser.objects.filter(pk=self.alice.pk).update(bio='ceramics')
+        self.alice.save(update_fields=['last_login'])
+        self.assertEqual(search('ceramics', 'user'), [])
+        self.alice.bio = 'ceramics'
+        self.alice.save(update_fields=['bio'])
+        self.assertEqual(search('ceramics', 'user'), [self.alice.id])
+
+    def test_drafts_and_their_comments_follow_publishing(self):
+        post = Post.objects.create(user=self.alice, content='secret sketch', is_draft=True)
+        comment = Comment.objects.create(user=self.alice, post=post, content='secret note')
+        self.assertEqual((indexed('post'), indexed('comment')), (set(), set()))
+
+        post.is_draft = False
+        post.save(update_fields=['is_draft'])
+        self.assertEqual((indexed('post'), indexed('comment')), ({post.id}, {comment.id}))
+
+        post.is_draft = True
+        post.save()
+        self.assertEqual((indexed('post'), indexed('comment')), (set(), set()))
+
+    def test_deletes_drop_documents(self):
+        post = Post.objects.create(user=self.alice, content='hello')
+        comment = Comment.objects.create(user=self.alice, post=post, content='hello back')
+        message = Message.objects.create(sender=self.alice, receiver=self.alice, content='note to self')
+        post.delete()
+        message.delete()
+        self.assertFalse(SearchDocument.objects.filter(object_id__in=[post.id, comment.id, message.id]).exclude(kind='user').exists())
+
+    def test_keywords_from_index_post_reach_the_index(self):
+        post = Post.objects.create(user=self.alice, content='Painting paintings of painted harbours')
+        keywords.index_post(post)
+        document = SearchDocument.objects.get(kind='post', object_id=post.id)
+        self.assertTrue(post.keywords)
+        self.assertTrue(document.body.endswith(post.keywords))
+
+    def test_rebuild_restores_and_prunes(self):
+        post = Post.objects.create(user=self.alice, content='hello')
+        draft = Post.objects.create(user=self.alice, content='draft', is_draft=True)
+        SearchDocument.objects.all().delete()
+        SearchDocument.objects.create(kind='post', object_id=draft.id + 100, body='gone')
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(indexed('post'), {post.id})
+        self.assertEqual(indexed('user'), {self.alice.id})
+        self.assertEqual(search('hello', 'post'), [post.id])
+
+        call_command('rebuild_search_index', kind=['post'], stdout=StringIO())
+        self.assertEqual(indexed('post'), {post.id})
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.post = Post.objects.create(user=cls.alice, content='harbour at dawn')
+        cls.draft = Post.objects.create(user=cls.alice, content='harbour draft', is_draft=True)
+        cls.comment = Comment.objects.create(user=cls.alice, post=cls.post, content='lovely harbour')
+        cls.hidden = Comment.objects.create(user=cls.alice, post=cls.draft, content='harbour feedback')
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def get(self, **params):
+        return self.client.get(reverse('search'), params, HTTP_HOST='localhost', secure=True)
+
+    def test_results_by_kind(self):
+        self.assertEqual(self.get(q='harbour').context['results'], [self.post])
+        self.assertEqual(self.get(q='harbour', type='comment').context['results'], [self.comment])
+        self.assertEqual(self.get(q='alice', type='user').context['results'], [self.alice])
+
+    def test_unknown_kind_and_bad_page_fall_back(self):
+        response = self.get(q='harbour', type='message', page='x')
+        self.assertEqual((response.context['kind'], response.context['page']), ('post', 1))
+
+    def test_comments_of_drafts_stay_hidden_even_if_indexed(self):
+        SearchDocument.objects.create(kind='comment', object_id=self.hidden.id, body=self.hidden.content)
+        self.assertEqual(self.get(q='feedback', type='comment').context['results'], [])
+
+    @override_settings(SEARCH_PAGE_SIZE=1)
+    def test_paging(self):
+        other = Post.objects.create(user=self.alice, content='harbour')
+        first = self.get(q='harbour')
+        second = self.get(q='harbour', page=2)
+        self.assertTrue(first.context['has_next'])
+        self.assertFalse(second.context['has_next'])
+        self.assertEqual({*first.context['results'], *second.context['results']}, {self.post, other})
+
+
+class AdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', email='admin@example.com', password='x')
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+        cls.post = Post.objects.create(user=cls.alice, content='harbour at dawn')
+        cls.draft = Post.objects.create(user=cls.bob, content='harbour draft', is_draft=True)
+        cls.other = Post.objects.create(user=cls.bob, content='mountains')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def results(self, name, q):
+        response = self.client.get(reverse(name), {'q': q}, HTTP_HOST='localhost', secure=True)
+        return set(response.context['cl'].result_list)
+
+    def test_text_matches_include_drafts(self):
+        self.assertEqual(self.results('admin:feed_post_changelist', 'harbour'), {self.post, self.draft})
+
+    def test_other_search_fields_still_match(self):
+        self.assertEqual(self.results('admin:feed_post_changelist', 'bob'), {self.draft, self.other})
+        comment = Comment.objects.create(user=self.alice, post=self.other, content='nice')
+        self.assertEqual(self.results('admin:feed_comment_changelist', 'alice'), {comment})
+        message = Message.objects.create(sender=self.bob, receiver=self.alice, content='hi')
+        self.assertEqual(self.results('admin:users_message_changelist', 'bob'), {message})
+
+    @override_settings(SEARCH_ADMIN_LIMIT=1)
+    def test_capped_matches_are_announced(self):
+        Post.objects.create(user=self.alice, content='harbour again')
+        response = self.client.get(
+            reverse('admin:feed_post_changelist'), {'q': 'harbour'}, HTTP_HOST='localhost', secure=True,
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 2)  # best index match and the draft
+        self.assertContains(response, 'Only the best 1 text matches')
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from feed.models import Comment, Post
+from search.backends import search
+
+User = get_user_model()
+
+# User-facing kinds; messages are only searchable from the admin
+SEARCHABLE = {
+    'post': lambda: Post.objects.filter(is_draft=False).select_related('user'),
+    'comment': lambda: Comment.objects.filter(post__is_draft=False).select_related('user', 'post'),
+    'user': lambda: User.objects.filter(is_active=True),
+}
+
+
+@login_required
+@require_GET
+def search_view(request):
+    """Ranked full-text search over posts, comments and people"""
+    query = request.GET.get('q', '').strip()[:200]
+    kind = request.GET.get('type', 'post')
+    if kind not in SEARCHABLE:
+        kind = 'post'
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    page_size = settings.SEARCH_PAGE_SIZE
+    results, has_next = [], False
+    if query:
+        ids = search(query, kind, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        # The index can briefly lag a delete; keep rank order and drop misses
+        by_id = SEARCHABLE[kind]().in_bulk(ids)
+        results = [by_id[pk] for pk in ids if pk in by_id]
+
+    return render(request, 'search/results.html', {
+        'query': query,
+        'kind': kind,
+        'kinds': list(SEARCHABLE),
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+    })
@@ -5,10 +5,10 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize all messaging components
     initMessageSearch();
-    setupMessagePolling();
+    setupConnectionMonitoring();
+    setupMessageStream();
     setupMessageForms();
     setupMobileComposeButton();
-    setupConnectionMonitoring();
 });
 
 // ========================
@@ -31,52 +31,66 @@ function initMessageSearch() {
 // REAL-TIME MESSAGING
 
 
-var messagePollInterval;
 let currentThreadId = null;
+let currentUserId = null;
+let messageStream = null;
 
-function setupMessagePolling() {
-    // Only activate on message threads
+function setupMessageStream() {
+    // Threads append pushed messages; the inbox only shows connection state
     const threadContainer = document.querySelector('.message-thread-container');
-    if (!threadContainer) return;
+    const inboxContainer = document.querySelector('.inbox-container');
+    if (!threadContainer && !inboxContainer) return;
+    if (!window.EventSource) return;
 
-    currentThreadId = threadContainer.dataset.threadId;
-    if (!currentThreadId) return;
+    if (threadContainer) {
+        currentThreadId = threadContainer.dataset.threadId;
+        currentUserId = threadContainer.dataset.userId;
+    }
 
-    // Start polling immediately
-    checkForNewMessages();
-    
-    // Then check every 5 seconds
-    messagePollInterval = setInterval(checkForNewMessages, 5000);
+    messageStream = new EventSource('/events/?topics=messages');
+    messageStream.onopen = () => updateConnectionStatus('connected');
+    messageStream.onerror = () => updateConnectionStatus('disconnected');
+
+    messageStream.addEventListener('new_message', event => {
+        const msg = JSON.parse(event.data);
+        if (!currentThreadId) return;
 
-    // Cleanup when leaving page
-    document.addEventListener('turbo:before-cache', () => {
-        clearInterval(messagePollInterval);
+        // Only messages belonging to the open conversation
+        const partnerId = String(msg.sender_id) === currentUserId ? msg.receiver_id : msg.sender_id;
+        if (String(partnerId) !== currentThreadId) return;
+
+        msg.is_sender = String(msg.sender_id) === currentUserId;
+        appendNewMessages([msg]);
+        if (!msg.is_sender) markThreadRead(msg.id);
     });
+
+    messageStream.addEventListener('messages_read', event => {
+        const receipt = JSON.parse(event.data);
+        if (String(receipt.reader_id) !== currentThreadId) return;
+        showReadUpTo(receipt.last_read_id);
+    });
+
+    window.addEventListener('beforeunload', () => messageStream.close());
 }
 
-function checkForNewMessages() {
-    const lastMessage = document.querySelector('.message-bubble:last-child');
-    const lastMessageId = lastMessage ? lastMessage.dataset.messageId : null;
+function markThreadRead(upToId) {
+    // One request acknowledges everything up to the newest message seen
+    const body = new URLSearchParams({ up_to: upToId });
+    const container = document.querySelector('.message-thread-container');
+    fetch(container.dataset.readUrl, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCSRFToken() },
+        body: body
+    }).catch(console.error);
+}
 
-    fetch(`/messages/api/thread/${currentThreadId}/updates/?last_id=${lastMessageId || ''}`)
-        .then(response => response.json())
-        .then(data => {
-            if (data.new_messages && data.new_messages.length > 0) {
-                appendNewMessages(data.new_messages);
-            }
-            
-            if (data.is_typing) {
-                showTypingIndicator(data.user_id);
-            } else {
-                hideTypingIndicator();
-            }
-            
-            updateConnectionStatus(data.connection_status);
-        })
-        .catch(error => {
-            console.error('Message polling error:', error);
-            updateConnectionStatus('disconnected');
-        });
+function showReadUpTo(lastReadId) {
+    document.querySelectorAll('.message-bubble.sent').forEach(bubble => {
+        const status = bubble.querySelector('.read-status');
+        if (status && Number(bubble.dataset.messageId) <= lastReadId) {
+            status.textContent = '✓✓';
+        }
+    });
 }
 
 function appendNewMessages(messages) {
@@ -99,13 +113,15 @@ function createMessageBubble(message) {
     bubble.innerHTML = `
         ${message.is_sender ? '' : `<img src="${message.sender_avatar}" class="message-avatar" alt="${message.sender_name}">`}
         <div class="message-content">
-            <p>${message.content}</p>
+            <p></p>
             <div class="message-meta">
                 <span class="timestamp">${formatMessageTime(message.created_at)}</span>
                 ${message.is_sender ? `<span class="read-status">${message.is_read ? '✓✓' : '✓'}</span>` : ''}
             </div>
         </div>
     `;
+    // Pushed content is untrusted: insert it as text, never as markup
+    bubble.querySelector('.message-content p').textContent = message.content;
     
     return bubble;
 }
@@ -225,9 +241,7 @@ function setupConnectionMonitoring() {
         `;
         document.body.appendChild(statusEl);
     }
-    
-    
-    setInterval(checkConnection, 10000);
+    // Status is driven by the event stream's open/error callbacks
 }
 
 function updateConnectionStatus(status) {
@@ -249,24 +263,6 @@ function updateConnectionStatus(status) {
     }
 }
 
-function checkConnection() {
-   
-    const start = Date.now();
-    fetch('/messages/api/ping/')
-        .then(() => {
-            const latency = Date.now() - start;
-            if (latency > 1000) {
-                updateConnectionStatus('slow');
-            } else {
-                updateConnectionStatus('connected');
-            }
-        })
-        .catch(() => {
-            updateConnectionStatus('disconnected');
-        });
-}
-
-
 // MOBILE COMPOSE BUTTON
 
 
@@ -0,0 +1,29 @@
+// REAL-TIME FEED UPDATES
+//
+// Listens on the server-sent event stream and asks the feed poller to fetch
+// a delta only when something actually changed. The poller's slow interval
+// remains as a fallback while the stream is disconnected.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const poller = document.getElementById('feed-poller');
+    if (!poller || !window.EventSource) return;
+
+    const source = new EventSource(poller.dataset.eventsUrl);
+
+    function onFeedEvent(event) {
+        // Look the poller up each time: polled responses swap it out
+        const current = document.getElementById('feed-poller');
+        if (!current) return;
+
+        const data = JSON.parse(event.data);
+        const postId = current.dataset.postId;
+        if (postId && event.type === 'post') return;
+        if (postId && String(data.post_id) !== postId) return;
+
+        htmx.trigger(current, 'feed-update');
+    }
+
+    ['post', 'like', 'comment'].forEach(name => source.addEventListener(name, onFeedEvent));
+
+    window.addEventListener('beforeunload', () => source.close());
+});
@@ -24,63 +24,6 @@ document.addEventListener("DOMContentLoaded", function() {
 // MESSAGING SYSTEM
 
 
-let messagePollInterval;
-
-function setupMessagePolling() {
-    if (document.querySelector('.message-thread-container')) {
-        // Check for new messages every 5 seconds
-        messagePollInterval = setInterval(checkNewMessages, 5000);
-        scrollToLatestMessage();
-    }
-}
-
-function checkNewMessages() {
-    const lastMessage = document.querySelector('.message-bubble:last-child');
-    if (!lastMessage) return;
-
-    fetch(`/messages/check_new/?last_id=${lastMessage.dataset.messageId}`)
-        .then(response => {
-            if (!response.ok) throw new Error('Network response was not ok');
-            return response.json();
-        })
-        .then(data => {
-            if (data.new_messages?.length > 0) {
-                appendNewMessages(data.new_messages);
-            }
-        })
-        .catch(error => {
-            console.error('Error checking messages:', error);
-            clearInterval(messagePollInterval);
-        });
-}
-
-function appendNewMessages(messages) {
-    const container = document.querySelector('.message-thread-container');
-    if (!container) return;
-
-    messages.forEach(msg => {
-        const messageElement = createMessageBubble(msg);
-        const messageForm = container.querySelector('.message-form');
-        if (messageForm) {
-            container.insertBefore(messageElement, messageForm);
-        } else {
-            container.appendChild(messageElement);
-        }
-    });
-    scrollToLatestMessage();
-}
-
-function createMessageBubble(message) {
-    const bubble = document.createElement('div');
-    bubble.className = `message-bubble ${message.is_sender ? 'sent' : 'received'}`;
-    bubble.dataset.messageId = message.id;
-    bubble.innerHTML = `
-        <p>${message.content}</p>
-        <span class="message-time">${message.timestamp}</span>
-    `;
-    return bubble;
-}
-
 function scrollToLatestMessage() {
     const messages = document.querySelectorAll('.message-bubble');
     if (messages.length > 0) {
@@ -171,20 +114,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Run when DOM is fully loaded
 document.addEventListener('DOMContentLoaded', function() {
-    // Initialize messaging system if on messaging page
-    if ($('.message-thread-container')) {
-        setupMessagePolling();
-    }
-
-   
     if ($('#message-search')) {
         setupMessageSearch();
     }
-});
-
-// Cleanup when leaving page
-window.addEventListener('beforeunload', function() {
-    if (messagePollInterval) {
-        clearInterval(messagePollInterval);
-    }
 });
\ No newline at end of file
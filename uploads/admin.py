@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import StoredBlob
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refs', 'created_at', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'refs', 'created_at', 'updated_at')
+
+    # Rows are kept in step with the files by the storage
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
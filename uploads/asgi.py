@@ -0,0 +1,93 @@
+"""ASGI middleware capping request bodies before Django buffers them.
+
+Under ASGI, Django reads the whole body into a temporary file (spilling to
+disk past ``FILE_UPLOAD_MAX_MEMORY_SIZE``) before any upload handler runs,
+so :class:`uploads.handlers.LimitedUploadHandler` alone can't keep an
+oversized upload off the server. :class:`BodyLimitMiddleware` sits in front
+of the application and answers 413 as soon as a request announces
+(``Content-Length``) or streams more than its view allows, without passing
+the excess on. The limit comes from the view's :func:`~uploads.handlers.upload_limit`
+(see :func:`~uploads.handlers.body_limit`).
+"""
+import json
+
+from django.template.defaultfilters import filesizeformat
+from django.urls import Resolver404, resolve
+
+from uploads.handlers import body_limit
+
+# Methods that carry a body worth limiting
+_METHODS = {'POST', 'PUT', 'PATCH'}
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _view(scope):
+    path = scope['path']
+    root = scope.get('root_path', '')
+    if root and path.startswith(root):
+        path = path[len(root):]
+    try:
+        return resolve(path).func
+    except Resolver404:
+        return None
+
+
+class BodyLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in _METHODS:
+            return await self.app(scope, receive, send)
+
+        limit = body_limit(_view(scope))
+        try:
+            announced = int(_header(scope, b'content-length') or 0)
+        except ValueError:
+            announced = 0
+        if announced > limit:
+            return await self._reject(scope, send, limit)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {'type': 'http.disconnect'}
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # Answer now; the application sees a client that went away
+                    rejected = True
+                    await self._reject(scope, send, limit)
+                    return {'type': 'http.disconnect'}
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, scope, send, limit):
+        message = f"Uploads must be smaller than {filesizeformat(limit)} in total"
+        if 'json' in (_header(scope, b'accept') or '') or _header(scope, b'x-requested-with'):
+            body = json.dumps({'success': False, 'error': message}).encode()
+            content_type = b'application/json'
+        else:
+            body = message.encode()
+            content_type = b'text/plain; charset=utf-8'
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [
+                (b'content-type', content_type),
+                (b'content-length', str(len(body)).encode()),
+                (b'connection', b'close'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
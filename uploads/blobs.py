@@ -0,0 +1,137 @@
+"""Bookkeeping for content-addressed media (see :mod:`uploads.storage`).
+
+:func:`reconcile` recounts blob references from the database: it fixes the
+counts, adopts referenced blobs that have no row, and deletes blobs nothing
+refers to, including files left without a row when the transaction that
+saved them rolled back. :func:`store` moves a file saved under its old ``upload_to`` name
+into content-addressed storage.
+"""
+import datetime
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils.timezone import now
+
+from uploads import images
+from uploads.models import StoredBlob
+from uploads.storage import ContentAddressedStorage, is_blob
+
+
+def file_fields():
+    """(model, field name) of every file field."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def references():
+    """How many times each blob name is referenced by a file field or a variant."""
+    counts = Counter()
+    prefix = f'{settings.MEDIA_BLOB_DIR}/'
+    for model, field_name in file_fields():
+        names = model._base_manager.filter(**{f'{field_name}__startswith': prefix})
+        counts.update(names.values_list(field_name, flat=True).iterator())
+    for model in images.models():
+        for field_name in images.fields_for(model):
+            attr = images.variants_field(field_name)
+            for data in model._base_manager.exclude(**{attr: {}}).values_list(attr, flat=True).iterator():
+                counts.update(
+                    path
+                    for name in images.VARIANTS
+                    for ext, path in (data.get(name) or {}).items()
+                    if ext in images.FORMATS and is_blob(path)
+                )
+    return counts
+
+
+def orphans(cutoff, exclude=(), batch_size=500):
+    """Names of blob files without a ``StoredBlob`` row, last written before ``cutoff``."""
+    root = default_storage.path(settings.MEDIA_BLOB_DIR)
+    before = cutoff.timestamp()
+    candidates = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, default_storage.location).replace(os.sep, '/')
+            if name not in exclude and os.path.getmtime(path) < before:
+                candidates.append(name)
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        known = set(StoredBlob.objects.filter(name__in=batch).values_list('name', flat=True))
+        yield from (name for name in batch if name not in known)
+
+
+def reconcile():
+    """Set each blob's count to its real number of references; returns (fixed, deleted).
+
+    Blobs saved within ``MEDIA_BLOB_GRACE`` are left alone: the row that will
+    reference them may not be committed yet. Older files with no row at all
+    were written by a save whose transaction rolled back, and are deleted.
+    """
+    if not isinstance(default_storage, ContentAddressedStorage):
+        return 0, 0
+    counts = references()
+    cutoff = now() - datetime.timedelta(seconds=settings.MEDIA_BLOB_GRACE)
+    fixed = 0
+    removed = set()
+
+    for blob in StoredBlob.objects.filter(updated_at__lt=cutoff).iterator():
+        refs = counts.pop(blob.name, 0)
+        if refs == blob.refs:
+            continue
+        # Skipped if it was saved or deleted since it was read
+        settled = StoredBlob.objects.filter(name=blob.name, refs=blob.refs, updated_at__lt=cutoff)
+        if refs:
+            fixed += settled.update(refs=refs)
+            continue
+        with transaction.atomic():
+            if settled.delete()[0]:
+                transaction.on_commit(lambda name=blob.name: default_storage.remove(name))
+                removed.add(blob.name)
+
+    # Referenced blobs without a row, e.g. restored from a backup
+    for name, refs in counts.items():
+        if default_storage.exists(name):
+            _, created = StoredBlob.objects.get_or_create(
+                name=name, defaults={'size': default_storage.size(name), 'refs': refs},
+            )
+            fixed += created
+
+    # Files whose save rolled back, so no row ever referred to them
+    for name in orphans(cutoff, exclude=removed | set(counts)):
+        default_storage.remove(name)
+        removed.add(name)
+    return fixed, len(removed)
+
+
+def store(instance, field_name):
+    """Move a file saved under its ``upload_to`` name into blob storage; returns whether it moved."""
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile or is_blob(fieldfile.name) or not isinstance(fieldfile.storage, ContentAddressedStorage):
+        return False
+    old_name = fieldfile.name
+    try:
+        with fieldfile.open('rb') as f:
+            new_name = fieldfile.storage.save(old_name, f)
+    except FileNotFoundError:
+        return False
+
+    changes = {field_name: new_name}
+    attr = images.variants_field(field_name)
+    data = getattr(instance, attr, None)
+    if data and data.get('source') == old_name:
+        # The variants were made from these very bytes
+        changes[attr] = {**data, 'source': new_name}
+    # update() skips the signals, so django_cleanup doesn't delete anything
+    type(instance)._base_manager.filter(pk=instance.pk).update(**changes)
+    for attr, value in changes.items():
+        setattr(instance, attr, value)
+    fieldfile.storage.delete(old_name)
+    return True
@@ -0,0 +1,66 @@
+"""BlurHash encoder (https://blurha.sh) for image placeholders.
+
+The hash is a short string a client can decode into a blurred preview; its
+first component is the average colour, which :func:`average_color` extracts
+so templates can show a plain placeholder without any JavaScript.
+"""
+import numpy as np
+
+_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _base83(value, length):
+    return ''.join(_ALPHABET[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _to_linear(srgb):
+    v = srgb / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _to_srgb(linear):
+    v = min(max(linear, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode(image, x_components=4, y_components=3):
+    """Hash a small RGB Pillow image (the caller should downscale first)."""
+    pixels = _to_linear(np.asarray(image.convert('RGB'), dtype=np.float64))
+    height, width = pixels.shape[:2]
+    xs = np.pi * np.arange(width) / width
+    ys = np.pi * np.arange(height) / height
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            basis = np.outer(np.cos(ys * j), np.cos(xs * i))
+            norm = 1.0 if i == j == 0 else 2.0
+            factors.append(norm * np.einsum('hw,hwc->c', basis, pixels) / (width * height))
+
+    dc, ac = factors[0], np.array(factors[1:])
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if len(ac):
+        quantised_max = max(0, min(82, int(np.abs(ac).max() * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+    result += _base83((_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]), 4)
+    for r, g, b in ac:
+        quantised = [
+            max(0, min(18, int(np.sign(v) * abs(v / max_value) ** 0.5 * 9 + 9.5)))
+            for v in (r, g, b)
+        ]
+        result += _base83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+
+def average_color(blurhash):
+    """``#rrggbb`` of the hash's DC component."""
+    value = 0
+    for char in blurhash[2:6]:
+        value = value * 83 + _ALPHABET.index(char)
+    return f'#{value:06x}'
@@ -0,0 +1,141 @@
+"""Per-view upload limits: size and sniffed image type.
+
+:class:`LimitedUploadHandler` runs first in ``FILE_UPLOAD_HANDLERS``. It
+watches each uploaded file as it is parsed and aborts the upload with
+``StopUpload(connection_reset=True)`` as soon as the file:
+
+* is announced (``Content-Length``) or grows larger than the view's limit, or
+* starts with bytes that aren't one of the view's allowed image formats;
+  the declared ``content_type`` is ignored.
+
+Nothing of a rejected file reaches the memory/temporary-file handlers behind
+it, so it is never stored. The reason is left on the request as
+``request.upload_rejection``; views report it via :func:`rejection`.
+
+Under ASGI the body has already been spooled by the time the handler runs;
+:class:`uploads.asgi.BodyLimitMiddleware` is what caps it, at
+:func:`body_limit`, while it streams in. Views set their limits with
+:func:`upload_limit`; everything else gets ``MAX_UPLOAD_SIZE`` (one file)
+and ``UPLOAD_IMAGE_FORMATS``.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.template.defaultfilters import filesizeformat
+
+# Leading bytes of each format
+SIGNATURES = {
+    'jpeg': [b'\xff\xd8\xff'],
+    'png': [b'\x89PNG\r\n\x1a\n'],
+    'gif': [b'GIF87a', b'GIF89a'],
+    'webp': [b'RIFF\0\0\0\0WEBP'],
+}
+# Signature positions that vary per file (the RIFF chunk size)
+_WILDCARD = {'webp': range(4, 8)}
+
+
+def sniff(header):
+    """Image format of a file starting with ``header``, or None."""
+    for fmt, signatures in SIGNATURES.items():
+        skip = _WILDCARD.get(fmt, ())
+        for signature in signatures:
+            if len(header) >= len(signature) and all(
+                i in skip or header[i] == byte for i, byte in enumerate(signature)
+            ):
+                return fmt
+    return None
+
+
+@dataclass(frozen=True)
+class UploadRejection:
+    status: int
+    message: str
+
+
+def rejection(request):
+    """Why the request's upload was refused, or None.
+
+    Parses the body first: the handler only runs once ``FILES`` is read.
+    """
+    request.FILES
+    return getattr(request, 'upload_rejection', None)
+
+
+def upload_limit(max_size=None, formats=None, max_files=1):
+    """Per-view upload limits, read by :class:`LimitedUploadHandler` and :func:`body_limit`.
+
+    ``max_size`` applies to each file; ``max_files`` is how many file fields
+    the view takes.
+
+    Usage: ``@upload_limit(max_size=5 * 1024 * 1024, formats=('jpeg', 'png'), max_files=2)``
+    """
+    def decorator(view):
+        view.upload_max_size = max_size
+        view.upload_formats = formats
+        view.upload_max_files = max_files
+        return view
+    return decorator
+
+
+def body_limit(view):
+    """Largest request body ``view`` accepts: its files plus the other form fields."""
+    max_size = getattr(view, 'upload_max_size', None) or settings.MAX_UPLOAD_SIZE
+    max_files = getattr(view, 'upload_max_files', None) or 1
+    # DATA_UPLOAD_MAX_MEMORY_SIZE covers the non-file fields and multipart framing
+    return max_size * max_files + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    # Only needs the first few bytes of each file to sniff it
+    HEADER_SIZE = 16
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        view = getattr(getattr(request, 'resolver_match', None), 'func', None)
+        self.max_size = getattr(view, 'upload_max_size', None) or settings.MAX_UPLOAD_SIZE
+        self.formats = getattr(view, 'upload_formats', None) or settings.UPLOAD_IMAGE_FORMATS
+        self.body_limit = body_limit(view)
+        self.request_too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_too_large = content_length > self.body_limit
+        return None
+
+    def _reject(self, status, message):
+        self.request.upload_rejection = UploadRejection(status, message)
+        raise StopUpload(connection_reset=True)
+
+    def _too_large(self):
+        self._reject(413, f"Files must be smaller than {filesizeformat(self.max_size)}")
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if self.request_too_large or (content_length and content_length > self.max_size):
+            self._too_large()
+        self.received = 0
+        self.header = b''
+        self.sniffed = False
+
+    def _check_format(self):
+        self.sniffed = True
+        if sniff(self.header) not in self.formats:
+            allowed = ', '.join(fmt.upper() for fmt in self.formats)
+            self._reject(415, f"Only {allowed} images are allowed")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self._too_large()
+        if not self.sniffed:
+            self.header += raw_data[:self.HEADER_SIZE - len(self.header)]
+            if len(self.header) >= self.HEADER_SIZE:
+                self._check_format()
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Files shorter than the header are checked once they end
+        if not self.sniffed:
+            self._check_format()
+        # Storage is left to the handlers after this one
+        return None
@@ -0,0 +1,182 @@
+"""Resized WebP (and AVIF, when Pillow supports it) variants of uploaded images.
+
+Each image field listed in :data:`FIELDS` has a JSON companion field named
+``<field>_variants`` holding::
+
+    {'source': <name of the original>, 'width': ..., 'height': ...,
+     'blurhash': ..., 'color': '#rrggbb',
+     'avatar_64': {'webp': <path>, 'avif': <path>}, ...}
+
+:func:`sync` regenerates it whenever the original changes and deletes the
+files of the previous set; saves queue it as a background job. Templates
+pick a variant through the ``images`` template tags and fall back to the
+original while variants are missing.
+"""
+import io
+import logging
+import os
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.templatetags.static import static
+from PIL import Image, ImageOps
+
+from uploads import blurhash
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    width: int
+    height: int
+    # Crop to exactly width x height, or fit inside it keeping the aspect ratio
+    crop: bool
+
+
+VARIANTS = {
+    'avatar_64': Variant(64, 64, crop=True),
+    'avatar_128': Variant(128, 128, crop=True),
+    'card': Variant(800, 800, crop=False),
+    'cover': Variant(1500, 500, crop=True),
+}
+
+# (model label, image field) -> variants generated for it
+FIELDS = {
+    ('users.CustomUser', 'profile_image'): ('avatar_64', 'avatar_128'),
+    ('feed.Post', 'image'): ('card',),
+    ('users.Profile', 'cover_image'): ('cover',),
+}
+
+FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+
+DEFAULT_AVATAR = 'profile_pics/default_profile.webp'
+
+
+def formats():
+    """Output formats this Pillow build can write, preferred first."""
+    Image.init()
+    return [ext for ext, name in (('avif', 'AVIF'), ('webp', 'WEBP')) if name in Image.SAVE]
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variants_of(fieldfile):
+    return getattr(fieldfile.instance, variants_field(fieldfile.field.name), None) or {}
+
+
+def variant_url(fieldfile, name, ext='webp'):
+    """URL of a variant, or of the original while the variant doesn't exist."""
+    if not fieldfile:
+        return ''
+    path = (variants_of(fieldfile).get(name) or {}).get(ext)
+    return fieldfile.storage.url(path) if path else fieldfile.url
+
+
+def avatar_url(user, size=64):
+    if not user.profile_image:
+        return static(DEFAULT_AVATAR)
+    return variant_url(user.profile_image, f'avatar_{size}')
+
+
+def fields_for(model):
+    label = model._meta.label
+    return {field: names for (model_label, field), names in FIELDS.items() if model_label == label}
+
+
+def _resize(image, variant):
+    if not variant.crop:
+        resized = image.copy()
+        resized.thumbnail((variant.width, variant.height), Image.Resampling.LANCZOS)
+        return resized
+    # Never upscale: shrink the target box to fit the original, same aspect ratio
+    scale = min(1.0, image.width / variant.width, image.height / variant.height)
+    size = (max(1, round(variant.width * scale)), max(1, round(variant.height * scale)))
+    return ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+
+def _encode(image, ext):
+    buffer = io.BytesIO()
+    image.save(buffer, FORMATS[ext], quality=settings.IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate(fieldfile, names):
+    """Write ``names`` variants of ``fieldfile`` to its storage; returns the JSON."""
+    with fieldfile.open('rb') as f:
+        image = ImageOps.exif_transpose(Image.open(f))
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    placeholder = image.convert('RGB')
+    placeholder.thumbnail((32, 32))
+    hash_ = blurhash.encode(placeholder, *settings.IMAGE_BLURHASH_COMPONENTS)
+    data = {
+        'source': fieldfile.name,
+        'width': image.width,
+        'height': image.height,
+        'blurhash': hash_,
+        'color': blurhash.average_color(hash_),
+    }
+
+    stem = os.path.splitext(fieldfile.name)[0]
+    for name in names:
+        resized = _resize(image, VARIANTS[name])
+        data[name] = {'width': resized.width, 'height': resized.height}
+        for ext in formats():
+            path = f'variants/{stem}.{name}.{ext}'
+            data[name][ext] = fieldfile.storage.save(path, ContentFile(_encode(resized, ext)))
+    return data
+
+
+def delete_files(fieldfile, data):
+    for name in VARIANTS:
+        for ext in FORMATS:
+            path = (data.get(name) or {}).get(ext)
+            if path:
+                fieldfile.storage.delete(path)
+
+
+def is_current(instance, field_name):
+    fieldfile = getattr(instance, field_name)
+    data = getattr(instance, variants_field(field_name)) or {}
+    return data.get('source', '') == (fieldfile.name or '')
+
+
+def needs_sync(instance):
+    return not all(is_current(instance, field_name) for field_name in fields_for(type(instance)))
+
+
+def sync(instance, field_name, names):
+    """Bring ``<field>_variants`` in line with the current file; returns whether it changed."""
+    if is_current(instance, field_name):
+        return False
+    fieldfile = getattr(instance, field_name)
+    attr = variants_field(field_name)
+    current = getattr(instance, attr) or {}
+
+    if current:
+        delete_files(fieldfile, current)
+    data = {}
+    if fieldfile:
+        try:
+            data = generate(fieldfile, names)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Unreadable originals keep being served as-is
+            logger.warning("Could not generate variants for %s", fieldfile.name, exc_info=True)
+            data = {'source': fieldfile.name}
+    type(instance)._base_manager.filter(pk=instance.pk).update(**{attr: data})
+    setattr(instance, attr, data)
+    return True
+
+
+def sync_all(instance):
+    for field_name, names in fields_for(type(instance)).items():
+        sync(instance, field_name, names)
+
+
+def models():
+    return [apps.get_model(label) for label in {label for label, _ in FIELDS}]
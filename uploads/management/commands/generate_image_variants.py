@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from uploads import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/AVIF variants and blurhash placeholders for "
+        "uploaded images that don't have them yet (or whose original changed)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        generated = 0
+        for model in images.models():
+            for field_name, names in images.fields_for(model).items():
+                objects = model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for instance in objects.only('pk', field_name, images.variants_field(field_name)).iterator():
+                    generated += images.sync(instance, field_name, names)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {generated} image(s) in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from uploads import blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files uploaded under their upload_to names into content-addressed "
+        "storage, merging duplicates, then recount blob references."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        moved = 0
+        for model, field_name in blobs.file_fields():
+            objects = model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in objects.iterator():
+                moved += blobs.store(instance, field_name)
+        fixed, deleted = blobs.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} file(s) into blob storage, fixed {fixed} reference count(s) "
+            f"and deleted {deleted} unused blob(s) in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Name')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Size')),
+                ('refs', models.PositiveIntegerField(default=1, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+            ],
+            options={
+                'verbose_name': 'Stored blob',
+                'verbose_name_plural': 'Stored blobs',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class StoredBlob(models.Model):
+    """A file kept by :class:`uploads.storage.ContentAddressedStorage`"""
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name=_("Name")
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name=_("Size")
+    )
+    # Saves of this content not yet matched by a delete; the file goes at zero
+    refs = models.PositiveIntegerField(
+        default=1,
+        verbose_name=_("References")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Created at")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
+    class Meta:
+        verbose_name = _("Stored blob")
+        verbose_name_plural = _("Stored blobs")
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} ref(s))"
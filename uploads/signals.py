@@ -0,0 +1,23 @@
+"""Queue image variant generation after saves and clean up after deletes."""
+from django.db.models.signals import post_delete, post_save
+
+from uploads import images, tasks
+
+
+def _saved(sender, instance, raw=False, **kwargs):
+    if not raw and images.needs_sync(instance):
+        label = sender._meta.label
+        tasks.generate_variants.delay(label, instance.pk, dedupe_key=f'variants:{label}:{instance.pk}')
+
+
+def _deleted(sender, instance, **kwargs):
+    for field_name in images.fields_for(sender):
+        data = getattr(instance, images.variants_field(field_name)) or {}
+        images.delete_files(getattr(instance, field_name), data)
+
+
+def connect():
+    for model in images.models():
+        label = model._meta.label_lower
+        post_save.connect(_saved, sender=model, dispatch_uid=f'image_variants_{label}')
+        post_delete.connect(_deleted, sender=model, dispatch_uid=f'image_variants_cleanup_{label}')
@@ -0,0 +1,100 @@
+"""Content-addressed media storage: every distinct file is stored once.
+
+:class:`ContentAddressedStorage` ignores the name it's given (``upload_to``)
+and stores each file under the SHA-256 of its bytes, sharded two levels deep
+so no directory grows too large::
+
+    blobs/3f/a9/3fa9...c1.jpg
+
+Saving bytes that are already stored writes nothing and returns the existing
+name. :class:`~uploads.models.StoredBlob` counts saves per name and
+``delete()`` only removes the file with the last reference, so django_cleanup
+and :mod:`uploads.images` keep deleting "their" file without breaking anyone
+else's. Counts only ever err high (re-uploading the file a field already
+holds, which django_cleanup doesn't delete); :func:`uploads.blobs.reconcile`
+corrects them. The file is written inside the save's transaction, so a
+rollback leaves it without a row; reconcile deletes such files once they are
+older than ``MEDIA_BLOB_GRACE``. A name only changes with its content, so blob URLs are served
+with immutable cache headers (:mod:`uploads.views`).
+
+Files saved before this storage (``profile_pics/...``) keep their names and
+are deleted as before.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from uploads.handlers import sniff
+from uploads.models import StoredBlob
+
+# Extension by sniffed format, so photo.JPG and photo.jpeg share a blob
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'gif': '.gif', 'webp': '.webp'}
+
+
+def digest(content):
+    """SHA-256 hex digest, size and first bytes of a File."""
+    sha256 = hashlib.sha256()
+    size = 0
+    header = b''
+    for chunk in content.chunks():
+        if not header:
+            header = chunk[:16]
+        sha256.update(chunk)
+        size += len(chunk)
+    return sha256.hexdigest(), size, header
+
+
+def blob_name(hexdigest, ext=''):
+    return f'{settings.MEDIA_BLOB_DIR}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{settings.MEDIA_BLOB_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Same name means same bytes, so a racing write of it is harmless
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        hexdigest, size, header = digest(content)
+        ext = EXTENSIONS.get(sniff(header)) or os.path.splitext(name)[1].lower()
+        name = blob_name(hexdigest, ext)
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={'size': size},
+            )
+            if not created:
+                blob.refs = F('refs') + 1
+                blob.save(update_fields=['refs', 'updated_at'])
+            if not self.exists(name):
+                super()._save(name, content)
+            elif created:
+                # Left behind by a rolled-back save; fresh again, so reconcile keeps off it
+                os.utime(self.path(name))
+        return name
+
+    def delete(self, name):
+        if not is_blob(name):
+            return super().delete(name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refs > 1:
+                blob.refs = F('refs') - 1
+                blob.save(update_fields=['refs', 'updated_at'])
+                return
+            if blob is not None:
+                blob.delete()
+            # Only once the row is really gone, and unless it was saved again meanwhile
+            transaction.on_commit(lambda: self.remove(name))
+
+    def remove(self, name):
+        """Delete a blob's file if no ``StoredBlob`` claims it."""
+        if not StoredBlob.objects.filter(name=name).exists():
+            super().delete(name)
@@ -0,0 +1,18 @@
+"""Background tasks for the uploads app (see :mod:`jobs.queue`)."""
+from django.apps import apps
+
+from jobs.queue import task
+from uploads import blobs, images
+
+
+@task(max_attempts=3)
+def generate_variants(model_label, pk):
+    """Bring every image field of one object in line with its current file."""
+    instance = apps.get_model(model_label)._base_manager.filter(pk=pk).first()
+    if instance is not None:
+        images.sync_all(instance)
+
+
+@task
+def reconcile_blobs():
+    blobs.reconcile()
@@ -0,0 +1,43 @@
+from django import template
+
+from uploads.images import avatar_url, variant_url, variants_of
+
+register = template.Library()
+
+
+@register.filter
+def variant(fieldfile, name):
+    """Usage: {{ post.image|variant:"card" }}"""
+    return variant_url(fieldfile, name)
+
+
+@register.filter
+def avatar(user, size=64):
+    """Usage: {{ post.user|avatar }} or {{ user|avatar:128 }}"""
+    return avatar_url(user, size)
+
+
+@register.filter
+def placeholder_color(fieldfile):
+    """Average colour of the image, for a background while it loads."""
+    return variants_of(fieldfile).get('color', '') if fieldfile else ''
+
+
+@register.inclusion_tag('uploads/picture.html')
+def picture(fieldfile, name, css_class='', alt=''):
+    """<picture> with AVIF/WebP sources, intrinsic size and a colour placeholder.
+
+    Usage: {% picture post.image "card" css_class="post-image" alt=post.content %}
+    """
+    data = variants_of(fieldfile) if fieldfile else {}
+    entry = data.get(name) or {}
+    return {
+        'src': variant_url(fieldfile, name),
+        'avif': fieldfile.storage.url(entry['avif']) if entry.get('avif') else '',
+        'width': entry.get('width', ''),
+        'height': entry.get('height', ''),
+        'blurhash': data.get('blurhash', ''),
+        'color': data.get('color', ''),
+        'css_class': css_class,
+        'alt': alt,
+    }
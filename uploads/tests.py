@@ -0,0 +1,388 @@
+import datetime
+import io
+import os
+import re
+import shutil
+import tempfile
+
+from django.contrib.messages import get_messages
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from feed.models import Post
+from uploads import blobs, blurhash, images
+from uploads.asgi import BodyLimitMiddleware
+from uploads.handlers import body_limit, sniff, upload_limit
+from uploads.models import StoredBlob
+from uploads.views import serve_blob
+from users.models import CustomUser, Profile
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 8
+# Small enough to cross in a test: 1000 bytes per file, 2000 for update_cover's body
+SMALL_LIMITS = {'MAX_UPLOAD_SIZE': 1000, 'DATA_UPLOAD_MAX_MEMORY_SIZE': 1000}
+BLOB_NAME = re.compile(r'blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.webp')
+
+
+def gradient(width=200, height=100):
+    """Fixture image: red grows left to right, green top to bottom."""
+    image = Image.new('RGB', (width, height))
+    image.putdata([
+        (x * 255 // (width - 1), y * 255 // (height - 1), 128)
+        for y in range(height) for x in range(width)
+    ])
+    return image
+
+
+def png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class TempMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = self.settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class SniffTests(SimpleTestCase):
+    def test_known_formats(self):
+        self.assertEqual(sniff(b'\xff\xd8\xff\xe0' + b'\0' * 12), 'jpeg')
+        self.assertEqual(sniff(PNG), 'png')
+        self.assertEqual(sniff(b'GIF89a' + b'\0' * 10), 'gif')
+        self.assertEqual(sniff(b'RIFF\x12\x34\x56\x78WEBPVP8 '), 'webp')
+
+    def test_unknown_or_short_headers(self):
+        for header in [b'', b'\x89PNG', b'<svg xmlns="', b'RIFF\0\0\0\0WAVE']:
+            with self.subTest(header=header):
+                self.assertIsNone(sniff(header))
+
+
+@override_settings(**SMALL_LIMITS)
+class BodyLimitTests(SimpleTestCase):
+    def test_defaults_to_one_file(self):
+        self.assertEqual(body_limit(None), 2000)
+
+    def test_counts_each_file_field(self):
+        @upload_limit(max_size=400, max_files=2)
+        def view(request):
+            pass
+        self.assertEqual(body_limit(view), 1800)
+
+
+@override_settings(**SMALL_LIMITS)
+class UploadHandlerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        Profile.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, HTTP_HOST='localhost', secure=True)
+
+    def test_unsniffable_file_is_refused(self):
+        upload = SimpleUploadedFile('cover.png', b'<svg xmlns="http://www.w3.org/2000/svg"/>', 'image/png')
+        response = self.post('update_cover', {'cover_image': upload})
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(response.json()['success'])
+
+    def test_oversized_file_is_refused(self):
+        upload = SimpleUploadedFile('cover.png', PNG + b'\0' * 1200, 'image/png')
+        response = self.post('update_cover', {'cover_image': upload})
+        self.assertEqual(response.status_code, 413)
+
+    def test_profile_edit_takes_two_files_at_the_limit(self):
+        # Together these are over one file's allowance, each is within it
+        response = self.post('profile_edit', {
+            'username': 'alice',
+            'email': 'alice@example.com',
+            'profile_image': SimpleUploadedFile('a.png', PNG + b'\0' * 900, 'image/png'),
+            'cover_image': SimpleUploadedFile('b.png', PNG + b'\0' * 900, 'image/png'),
+        })
+        # Not valid images, so the form comes back with errors instead of a rejection
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+        self.assertTrue(response.context['user_form'].has_error('profile_image'))
+
+
+@override_settings(**SMALL_LIMITS)
+class BodyLimitMiddlewareTests(SimpleTestCase):
+    async def call(self, chunks, method='POST', headers=()):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': reverse('update_cover'),
+            'headers': list(headers),
+        }
+        messages = [
+            {'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+            for i, chunk in enumerate(chunks)
+        ]
+        received, sent = [], []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def app(scope, receive, send):
+            while True:
+                message = await receive()
+                received.append(message)
+                if message['type'] != 'http.request' or not message['more_body']:
+                    break
+            if message['type'] == 'http.request':
+                await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+                await send({'type': 'http.response.body', 'body': b'ok'})
+
+        await BodyLimitMiddleware(app)(scope, receive, send)
+        return received, sent
+
+    async def test_announced_length_over_the_limit(self):
+        received, sent = await self.call([b'x' * 10], headers=[(b'content-length', b'5000')])
+        self.assertEqual(received, [])
+        self.assertEqual(sent[0]['status'], 413)
+        self.assertIn(b'2.0\xc2\xa0KB', sent[1]['body'])
+
+    async def test_streamed_body_over_the_limit(self):
+        received, sent = await self.call([b'x' * 1000, b'x' * 1000, b'x' * 1000])
+        self.assertEqual([m['type'] for m in received], ['http.request', 'http.request', 'http.disconnect'])
+        self.assertEqual([m.get('status') for m in sent], [413, None])
+
+    async def test_json_clients_get_json(self):
+        _, sent = await self.call(
+            [b'x' * 2500], headers=[(b'content-length', b'2500'), (b'accept', b'application/json')],
+        )
+        self.assertIn((b'content-type', b'application/json'), sent[0]['headers'])
+
+    async def test_body_within_the_limit_passes(self):
+        received, sent = await self.call([b'x' * 1000, b'x' * 1000])
+        self.assertEqual(b''.join(m['body'] for m in received), b'x' * 2000)
+        self.assertEqual(sent[0]['status'], 200)
+
+    async def test_other_methods_pass(self):
+        _, sent = await self.call([b'x' * 5000], method='GET')
+        self.assertEqual(sent[0]['status'], 200)
+
+
+class BlobStorageTests(TempMediaMixin, TestCase):
+    def save(self, content, name='upload.bin'):
+        return default_storage.save(name, ContentFile(content))
+
+    def refs(self, name):
+        return StoredBlob.objects.filter(name=name).values_list('refs', flat=True).first()
+
+    def age(self, name, seconds=2 * 60 * 60):
+        past = timezone.now() - datetime.timedelta(seconds=seconds)
+        StoredBlob.objects.filter(name=name).update(updated_at=past)
+        os.utime(default_storage.path(name), (past.timestamp(), past.timestamp()))
+
+    def test_same_content_is_stored_once(self):
+        first = self.save(b'hello', 'a.txt')
+        second = self.save(b'hello', 'b.txt')
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/'))
+        self.assertEqual(self.refs(first), 2)
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(first))), [os.path.basename(first)])
+        self.assertNotEqual(self.save(b'other', 'a.txt'), first)
+
+    def test_extension_follows_the_sniffed_format(self):
+        self.assertTrue(self.save(PNG, 'photo.JPG').endswith('.png'))
+
+    def test_file_goes_with_the_last_reference(self):
+        name = self.save(b'hello')
+        self.save(b'hello')
+        with self.captureOnCommitCallbacks(execute=True):
+            default_storage.delete(name)
+        self.assertEqual(self.refs(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            default_storage.delete(name)
+        self.assertIsNone(self.refs(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reconcile_fixes_counts_and_deletes_unreferenced_blobs(self):
+        user = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        kept = self.save(b'kept')
+        self.save(b'kept')
+        unused = self.save(b'unused')
+        fresh = self.save(b'fresh')
+        CustomUser.objects.filter(pk=user.pk).update(profile_image=kept)
+        self.age(kept)
+        self.age(unused)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(blobs.reconcile(), (1, 1))
+        self.assertEqual(self.refs(kept), 1)
+        self.assertFalse(default_storage.exists(unused))
+        # Still within the grace period
+        self.assertEqual(self.refs(fresh), 1)
+        self.assertTrue(default_storage.exists(fresh))
+
+    def test_reconcile_sweeps_files_of_rolled_back_saves(self):
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            name = self.save(b'rolled back')
+            raise Abort
+        self.assertIsNone(self.refs(name))
+        self.assertTrue(default_storage.exists(name))
+
+        self.assertEqual(blobs.reconcile(), (0, 0))
+        self.age(name)
+        self.assertEqual(blobs.reconcile(), (0, 1))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_saving_an_orphan_again_adopts_it(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            name = self.save(b'rolled back')
+            raise RuntimeError
+        self.age(name)
+        self.assertEqual(self.save(b'rolled back'), name)
+        self.assertEqual(blobs.reconcile(), (0, 0))
+        self.assertTrue(default_storage.exists(name))
+
+
+class ServeBlobTests(TempMediaMixin, TestCase):
+    def test_blobs_are_immutable(self):
+        name = default_storage.save('a.png', ContentFile(PNG))
+        path = name.removeprefix('blobs/')
+        response = serve_blob(RequestFactory().get(f'/media/{name}'), path)
+        self.assertEqual(b''.join(response.streaming_content), PNG)
+        self.assertIn('immutable', response['Cache-Control'])
+
+        etag = response['ETag']
+        response = serve_blob(RequestFactory().get(f'/media/{name}', HTTP_IF_NONE_MATCH=etag), path)
+        self.assertEqual(response.status_code, 304)
+
+class BlurhashTests(SimpleTestCase):
+    def test_solid_colour_is_just_the_average(self):
+        self.assertEqual(blurhash.encode(Image.new('RGB', (8, 8), (255, 0, 0)), 1, 1), '00TI:j')
+        self.assertEqual(blurhash.average_color('00TI:j'), '#ff0000')
+
+    def test_known_hash(self):
+        image = gradient()
+        image.thumbnail((32, 32))
+        hash_ = blurhash.encode(image, 4, 3)
+        self.assertEqual(hash_, 'LzHV9Z2swxX8qRWDjtagg0fjfQfj')
+        # One size flag, one max AC, four DC and two per each of the 11 AC components
+        self.assertEqual(len(hash_), 28)
+        self.assertEqual(blurhash.average_color(hash_), '#979780')
+
+
+@override_settings(JOBS_EAGER=True)
+class ImageVariantTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+
+    def upload(self, instance, field_name, image):
+        content = png(image) if isinstance(image, Image.Image) else image
+        with self.captureOnCommitCallbacks(execute=True):
+            getattr(instance, field_name).save('upload.png', ContentFile(content))
+        instance.refresh_from_db()
+        return getattr(instance, images.variants_field(field_name))
+
+    def open(self, name):
+        with default_storage.open(name) as f:
+            return Image.open(f).size
+
+    def test_variants_are_generated_on_save(self):
+        data = self.upload(self.user, 'profile_image', gradient())
+        self.assertEqual(data['source'], self.user.profile_image.name)
+        self.assertEqual((data['width'], data['height']), (200, 100))
+        self.assertEqual(data['blurhash'], 'LzHV9Z2swxX8qRWDjtagg0fjfQfj')
+        self.assertEqual(data['color'], '#979780')
+        for name, size in [('avatar_64', (64, 64)), ('avatar_128', (100, 100))]:
+            with self.subTest(name=name):
+                self.assertEqual(set(data[name]), {'width', 'height', *images.formats()})
+                self.assertRegex(data[name]['webp'], BLOB_NAME)
+                self.assertEqual((data[name]['width'], data[name]['height']), size)
+                self.assertEqual(self.open(data[name]['webp']), size)
+
+    def test_crops_fill_the_box_and_never_upscale(self):
+        profile = Profile.objects.create(user=self.user)
+        post = Post.objects.create(user=self.user, content='hello')
+        cover = self.upload(profile, 'cover_image', gradient(3000, 1200))['cover']
+        self.assertEqual((cover['width'], cover['height']), (1500, 500))
+        # Fit inside 800x800 keeping the aspect ratio
+        card = self.upload(post, 'image', gradient(1600, 400))['card']
+        self.assertEqual((card['width'], card['height']), (800, 200))
+        # Smaller than the box: same aspect ratio, original scale
+        cover = self.upload(profile, 'cover_image', gradient(300, 300))['cover']
+        self.assertEqual((cover['width'], cover['height']), (300, 100))
+
+    def test_replacing_or_deleting_removes_old_variants(self):
+        old = self.upload(self.user, 'profile_image', gradient())
+        new = self.upload(self.user, 'profile_image', gradient(100, 100))
+        self.assertNotEqual(old['avatar_64']['webp'], new['avatar_64']['webp'])
+        self.assertFalse(default_storage.exists(old['avatar_64']['webp']))
+        self.assertTrue(default_storage.exists(new['avatar_64']['webp']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        for name in ('avatar_64', 'avatar_128'):
+            self.assertFalse(default_storage.exists(new[name]['webp']))
+
+    def test_unreadable_original_is_served_as_is(self):
+        with self.assertLogs('uploads.images', 'WARNING'):
+            data = self.upload(self.user, 'profile_image', PNG)
+        self.assertEqual(data, {'source': self.user.profile_image.name})
+        self.assertEqual(images.avatar_url(self.user), self.user.profile_image.url)
+        # Not retried until the file changes
+        self.assertFalse(images.sync(self.user, 'profile_image', ('avatar_64',)))
+
+    def test_urls_fall_back_to_the_original_and_default(self):
+        self.assertEqual(images.avatar_url(self.user), static(images.DEFAULT_AVATAR))
+        self.assertEqual(images.variant_url(self.user.profile_image, 'avatar_64'), '')
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.user.profile_image.save('upload.png', ContentFile(png(gradient())))
+        # Variants not generated yet
+        self.assertEqual(images.avatar_url(self.user, 128), self.user.profile_image.url)
+
+        data = self.upload(self.user, 'profile_image', gradient())
+        self.assertEqual(images.avatar_url(self.user, 128), default_storage.url(data['avatar_128']['webp']))
+        self.assertEqual(images.variant_url(self.user.profile_image, 'card'), self.user.profile_image.url)
+
+    def render(self, source, **context):
+        return Template('{% load images %}' + source).render(Context(context))
+
+    def test_template_tags(self):
+        post = Post.objects.create(user=self.user, content='hello')
+        self.assertEqual(self.render('{% picture post.image "card" %}', post=post).strip(), '')
+
+        with self.captureOnCommitCallbacks(execute=False):
+            post.image.save('upload.png', ContentFile(png(gradient())))
+        html = self.render('{% picture post.image "card" alt="hi" %}', post=post)
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertNotIn('width=', html)
+
+        data = self.upload(post, 'image', gradient())
+        html = self.render('{% picture post.image "card" css_class="post-image" %}', post=post)
+        self.assertIn(f'src="{default_storage.url(data["card"]["webp"])}"', html)
+        self.assertIn('width="200" height="100"', html)
+        self.assertIn(f'data-blurhash="{data["blurhash"]}"', html)
+        self.assertEqual(self.render('{{ post.image|placeholder_color }}', post=post), data['color'])
+        self.assertEqual(
+            self.render('{{ user|avatar }}|{{ user|avatar:128 }}', user=self.user),
+            f'{static(images.DEFAULT_AVATAR)}|{static(images.DEFAULT_AVATAR)}',
+        )
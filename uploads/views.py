@@ -0,0 +1,38 @@
+"""Content-addressed media, served with immutable cache headers.
+
+A blob's URL changes whenever its content does, so browsers and CDNs may
+keep a response for ``MEDIA_BLOB_MAX_AGE`` without ever revalidating it.
+
+This view is only mounted with ``MEDIA_BLOB_SERVE`` (on under ``DEBUG``), as
+streaming files ties up a Python worker for each download. In production
+the web server or CDN origin serves ``MEDIA_ROOT/MEDIA_BLOB_DIR`` with the
+same headers, e.g. for nginx::
+
+    location /media/blobs/ {
+        alias /app/media/blobs/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+"""
+import os
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+from django.views.static import serve
+
+
+def _etag(request, path):
+    # The file name is the SHA-256 of its content
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+@condition(etag_func=_etag)
+def _serve(request, path):
+    return serve(request, f'{settings.MEDIA_BLOB_DIR}/{path}', document_root=settings.MEDIA_ROOT)
+
+
+@require_safe
+def serve_blob(request, path):
+    response = _serve(request, path)
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_BLOB_MAX_AGE, immutable=True)
+    return response
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser, InviteCode, Message, UserInteraction, Profile
+from search.admin import IndexedSearchMixin
 
 # Custom User Admin
 class CustomUserAdmin(UserAdmin):
@@ -39,9 +40,10 @@ class CommentAdmin(admin.ModelAdmin):
     raw_id_fields = ('user', 'post')
 
 # Message Admin
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("sender", "receiver", "truncated_content", "created_at", "is_read")
     search_fields = ("content", "sender__username", "receiver__username")
+    search_kind = 'message'
     list_filter = ("is_read", "created_at")
     date_hierarchy = 'created_at'
     raw_id_fields = ('sender', 'receiver')
@@ -1,4 +1,6 @@
-from users.models import Message
+from django.utils.functional import SimpleLazyObject
+
+from users.unread import get_unread_count
 
 
 def site_settings(request):
@@ -9,12 +11,9 @@ def site_settings(request):
     }
 
 def unread_messages(request):
+    """Unread badge count, only looked up if a template actually renders it"""
     if request.user.is_authenticated:
-        from users.models import Message
         return {
-            'unread_count': Message.objects.filter(
-                receiver=request.user,
-                is_read=False
-            ).count()
+            'unread_count': SimpleLazyObject(lambda: get_unread_count(request.user))
         }
     return {}
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Denormalized follower/following/post counters on ``CustomUser``.
+
+Updated with ``F()`` expressions inside the same transaction as the follow,
+unfollow, post or delete that changes them; :func:`reconcile` repairs drift
+against the follow and post tables.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import CustomUser
+
+Follow = CustomUser.following.through
+
+
+def adjust(user_id, followers=0, following=0, posts=0):
+    """Atomically add the given deltas (may be negative) to a user's counters."""
+    changes = {}
+    for field, delta in (('follower_count', followers), ('following_count', following), ('post_count', posts)):
+        if delta:
+            changes[field] = Greatest(F(field) + delta, 0)
+    if changes:
+        CustomUser.objects.filter(pk=user_id).update(**changes)
+
+
+def follow(follower, followee):
+    adjust(follower.pk, following=1)
+    adjust(followee.pk, followers=1)
+
+
+def unfollow(follower, followee):
+    adjust(follower.pk, following=-1)
+    adjust(followee.pk, followers=-1)
+
+
+def _actual(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .values(field).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def _actuals():
+    from feed.models import Post
+
+    return {
+        'follower_count': _actual(Follow.objects.all(), 'to_customuser'),
+        'following_count': _actual(Follow.objects.all(), 'from_customuser'),
+        'post_count': _actual(Post.objects.all(), 'user'),
+    }
+
+
+def reconcile(queryset=None, dry_run=False):
+    """Reset drifted counters to the true totals; returns the number of users fixed."""
+    queryset = CustomUser.objects.all() if queryset is None else queryset
+    actuals = _actuals()
+    drifted = queryset.alias(**{f'actual_{name}': value for name, value in actuals.items()}).filter(
+        ~Q(follower_count=F('actual_follower_count'))
+        | ~Q(following_count=F('actual_following_count'))
+        | ~Q(post_count=F('actual_post_count'))
+    )
+    if dry_run:
+        return drifted.count()
+    return CustomUser.objects.filter(pk__in=list(drifted.values_list('pk', flat=True))).update(**actuals)
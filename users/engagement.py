@@ -0,0 +1,90 @@
+"""Stored per-user engagement metrics (``EngagementMetrics``).
+
+:func:`recompute` rebuilds every user's row from a handful of grouped
+aggregate queries (one pass over posts plus one per activity table) and
+upserts them in batches, so profile pages only read a single row.
+``recompute_engagement`` runs it on a schedule; metrics are as fresh as the
+last run.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils.timezone import now
+
+from users.models import CustomUser, EngagementMetrics
+
+BATCH_SIZE = 1000
+
+FIELDS = (
+    'post_count', 'likes_received', 'comments_received', 'follower_count',
+    'activity_rate', 'engagement_score', 'computed_at',
+)
+
+
+def score(post_count, likes_received, follower_count):
+    """0-100 engagement score shown on the profile."""
+    return min(100, (post_count * 2 + likes_received * 3 + follower_count * 5) // 2)
+
+
+def _grouped(queryset, user_ids, **aggregates):
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    return {row.pop('user'): row for row in queryset.values('user').annotate(**aggregates).order_by()}
+
+
+def _activity(user_ids, since):
+    from feed.models import Comment, Like, Post
+
+    totals = {}
+    for model in (Post, Like, Comment):
+        for user_id, row in _grouped(model.objects.filter(created_at__gte=since), user_ids, n=Count('id')).items():
+            totals[user_id] = totals.get(user_id, 0) + row['n']
+    return totals
+
+
+def recompute(user_ids=None):
+    """Rewrite metrics for ``user_ids`` (default: everyone); returns rows written."""
+    from feed.models import Post
+
+    window = settings.ENGAGEMENT_WINDOW_DAYS
+    computed_at = now()
+    received = _grouped(
+        Post.objects.all(), user_ids,
+        posts=Count('id'), likes=Sum('like_count'), comments=Sum('comment_count'),
+    )
+    activity = _activity(user_ids, computed_at - datetime.timedelta(days=window))
+
+    users = CustomUser.objects.order_by()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+
+    written = 0
+    batch = []
+    for user_id, follower_count in users.values_list('id', 'follower_count').iterator():
+        totals = received.get(user_id, {})
+        post_count = totals.get('posts', 0)
+        likes = totals.get('likes') or 0
+        batch.append(EngagementMetrics(
+            user_id=user_id,
+            post_count=post_count,
+            likes_received=likes,
+            comments_received=totals.get('comments') or 0,
+            follower_count=follower_count,
+            activity_rate=activity.get(user_id, 0) / window,
+            engagement_score=score(post_count, likes, follower_count),
+            computed_at=computed_at,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            written += _save(batch)
+            batch = []
+    if batch:
+        written += _save(batch)
+    return written
+
+
+def _save(batch):
+    EngagementMetrics.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['user'], update_fields=FIELDS,
+    )
+    return len(batch)
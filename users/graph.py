@@ -0,0 +1,181 @@
+"""In-process adjacency index of the follow graph.
+
+Each process holds the follow table as two CSR arrays indexed directly by
+user id: who each user follows and who follows them, both sorted. Batch
+checks, mutual follows and friends-of-friends are vectorised numpy set
+operations with no queries.
+
+``follow_toggle`` calls :func:`record` after commit, which applies the edit
+locally and appends it to a change log in the cache. Other processes replay
+the log on their next access. A process reloads from the database when it
+has fallen more than ``FOLLOW_GRAPH_MAX_REPLAY`` edits behind, when the log
+is incomplete or when its snapshot is older than ``FOLLOW_GRAPH_MAX_AGE``.
+
+The log is only reliable on Redis (``cache.incr`` isn't atomic elsewhere,
+and ``locmem`` isn't shared), so a snapshot can lag the database by up to
+``FOLLOW_GRAPH_MAX_AGE``. Use it where a few stale edges are harmless
+(mutual counts, suggestions); anything a user acts on, like the Follow
+button, is checked in the database.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+_VERSION_KEY = 'follow_graph:version'
+_EMPTY = np.empty(0, dtype=np.int32)
+
+_graph = None
+_lock = threading.Lock()
+
+
+def _edit_key(n):
+    return f'follow_graph:edit:{n}'
+
+
+def _csr(rows, cols, size):
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def _edit(row, other, added):
+    pos = int(np.searchsorted(row, other))
+    present = pos < len(row) and row[pos] == other
+    if added and not present:
+        return np.insert(row, pos, other)
+    if not added and present:
+        return np.delete(row, pos)
+    return row
+
+
+class FollowGraph:
+    """Snapshot of the follow table plus the edits applied since it was loaded."""
+
+    def __init__(self, edges, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        size = int(edges.max()) + 1 if len(edges) else 0
+        self.out_ptr, self.out_idx = _csr(edges[:, 0], edges[:, 1], size)
+        self.in_ptr, self.in_idx = _csr(edges[:, 1], edges[:, 0], size)
+        # Rows changed since loading replace the CSR slice for that user
+        self.out_edits = {}
+        self.in_edits = {}
+
+    @staticmethod
+    def _row(indptr, indices, edits, user_id):
+        if user_id in edits:
+            return edits[user_id]
+        if user_id >= len(indptr) - 1:
+            return _EMPTY
+        return indices[indptr[user_id]:indptr[user_id + 1]]
+
+    def following(self, user_id):
+        """Sorted ids ``user_id`` follows."""
+        return self._row(self.out_ptr, self.out_idx, self.out_edits, user_id)
+
+    def followers(self, user_id):
+        """Sorted ids following ``user_id``."""
+        return self._row(self.in_ptr, self.in_idx, self.in_edits, user_id)
+
+    def apply(self, follower_id, followee_id, added):
+        self.out_edits[follower_id] = _edit(self.following(follower_id), followee_id, added)
+        self.in_edits[followee_id] = _edit(self.followers(followee_id), follower_id, added)
+
+
+def _current_version():
+    current = cache.get(_VERSION_KEY)
+    if current is None:
+        # No expiry: losing the counter forces every process to reload
+        cache.add(_VERSION_KEY, 0, None)
+        current = cache.get(_VERSION_KEY, 0)
+    return current
+
+
+def _load(version):
+    from users.models import CustomUser
+
+    rows = CustomUser.following.through.objects.values_list('from_customuser_id', 'to_customuser_id')
+    edges = np.fromiter(rows.iterator(chunk_size=10000), dtype=np.dtype((np.int32, 2)))
+    return FollowGraph(edges.reshape(-1, 2), version)
+
+
+def _replay(graph, current):
+    keys = [_edit_key(n) for n in range(graph.version + 1, current + 1)]
+    edits = cache.get_many(keys)
+    if len(edits) != len(keys):
+        return False
+    for key in keys:
+        graph.apply(*edits[key])
+    graph.version = current
+    return True
+
+
+def get_graph():
+    """This process's graph, brought up to date with the shared change log."""
+    global _graph
+    current = _current_version()
+    with _lock:
+        graph = _graph
+        stale = (
+            graph is None
+            or current < graph.version
+            or current - graph.version > settings.FOLLOW_GRAPH_MAX_REPLAY
+            or time.monotonic() - graph.loaded_at > settings.FOLLOW_GRAPH_MAX_AGE
+        )
+        if not stale and current > graph.version:
+            stale = not _replay(graph, current)
+        if stale:
+            graph = _graph = _load(current)
+    return graph
+
+
+def record(follower_id, followee_id, added):
+    """Publish a follow (``added``) or unfollow; call once it has committed."""
+    try:
+        n = cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, 0, None)
+        n = cache.incr(_VERSION_KEY)
+    cache.set(_edit_key(n), (follower_id, followee_id, added), settings.FOLLOW_GRAPH_MAX_AGE)
+    with _lock:
+        if _graph is not None:
+            _graph.apply(follower_id, followee_id, added)
+
+
+def reset():
+    """Drop this process's snapshot; the next access reloads it."""
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def followers_among(user_id, ids):
+    """The subset of ``ids`` that follow ``user_id``."""
+    ids = np.asarray(list(ids), dtype=np.int64)
+    return set(ids[np.isin(ids, get_graph().followers(user_id))].tolist())
+
+
+def mutual_ids(user_id):
+    """Users who follow ``user_id`` and are followed back."""
+    graph = get_graph()
+    return np.intersect1d(graph.following(user_id), graph.followers(user_id), assume_unique=True).tolist()
+
+
+def suggestions(user_id, limit=None):
+    """Friends-of-friends not yet followed, ranked by how many followees follow them."""
+    limit = limit or settings.FOLLOW_GRAPH_SUGGESTIONS
+    graph = get_graph()
+    following = graph.following(user_id)
+    if not len(following):
+        return []
+    reachable = np.concatenate([graph.following(int(uid)) for uid in following])
+    candidates, paths = np.unique(reachable, return_counts=True)
+    keep = ~np.isin(candidates, following) & (candidates != user_id)
+    candidates, paths = candidates[keep], paths[keep]
+    # Most shared followees first, newest accounts breaking ties
+    order = np.lexsort((-candidates, -paths))[:limit]
+    return candidates[order].tolist()
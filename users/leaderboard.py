@@ -0,0 +1,74 @@
+"""Featured-creators leaderboard for the home page.
+
+The ranking (verified users by followers, then posts) is computed at most
+once per ``FEATURED_CREATORS_TTL`` and stored as plain dicts together with
+a pre-rendered HTML snapshot of the carousel, so serving the home page is a
+cache read with no queries or template rendering. Writes that can change
+the ranking call :func:`invalidate`, and ``refresh_leaderboard`` can warm it
+on a schedule.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from creaverse.cache import bump, get_or_compute, make_key
+from uploads.images import variant_url
+
+NAMESPACE = 'featured_creators'
+
+
+def _compute():
+    from users.models import CustomUser
+
+    creators = (
+        CustomUser.objects.filter(is_verified=True)
+        .only(
+            'username', 'bio', 'profile_image', 'profile_image_variants', 'is_verified',
+            'follower_count', 'post_count',
+        )
+        .order_by('-follower_count', '-post_count')[:settings.FEATURED_CREATORS_LIMIT]
+    )
+    return [
+        {
+            'id': creator.id,
+            'username': creator.username,
+            'bio': creator.bio,
+            'profile_image_url': variant_url(creator.profile_image, 'avatar_128'),
+            'is_verified': creator.is_verified,
+            'follower_count': creator.follower_count,
+            'post_count': creator.post_count,
+        }
+        for creator in creators
+    ]
+
+
+def get_featured_creators():
+    return get_or_compute(make_key(NAMESPACE, 'data'), _compute, settings.FEATURED_CREATORS_TTL)
+
+
+def get_featured_html():
+    """Pre-rendered carousel markup; identical for every visitor."""
+    return get_or_compute(
+        make_key(NAMESPACE, 'html'),
+        lambda: render_to_string(
+            'users/partials/featured_creators.html',
+            {'featured_creators': get_featured_creators()},
+        ),
+        settings.FEATURED_CREATORS_TTL,
+    )
+
+
+def refresh():
+    """Drop the current snapshot and rebuild it."""
+    bump(NAMESPACE)
+    get_featured_html()
+    return get_featured_creators()
+
+
+def invalidate():
+    transaction.on_commit(lambda: bump(NAMESPACE))
+
+
+def affects(user):
+    """Whether a change to ``user``'s followers or posts can move the ranking."""
+    return user.is_verified
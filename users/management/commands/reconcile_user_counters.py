@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from users import counters
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalized follower/following/post counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many users have drifted",
+        )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{fixed} user(s) have drifted counters")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired counters on {fixed} user(s)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cached featured-creators leaderboard (run periodically to keep it warm)"
+
+    def handle(self, *args, **options):
+        creators = leaderboard.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Leaderboard refreshed with {len(creators)} creator(s)"))
@@ -0,0 +1,13 @@
+from users import presence
+
+
+class PresenceMiddleware:
+    """Record activity for authenticated users on every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.user.is_authenticated:
+            presence.touch(request.user)
+        return self.get_response(request)
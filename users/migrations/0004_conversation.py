@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Conversation = apps.get_model('users', 'Conversation')
+    Message = apps.get_model('users', 'Message')
+
+    pairs = (
+        Message.objects.filter(conversation__isnull=True)
+        .values_list('sender_id', 'receiver_id').distinct()
+    )
+    for user_a_id, user_b_id in {tuple(sorted(pair)) for pair in pairs}:
+        conversation, _ = Conversation.objects.get_or_create(user_a_id=user_a_id, user_b_id=user_b_id)
+        thread = Message.objects.filter(
+            models.Q(sender_id=user_a_id, receiver_id=user_b_id)
+            | models.Q(sender_id=user_b_id, receiver_id=user_a_id)
+        )
+        thread.update(conversation=conversation)
+        last = thread.order_by('-created_at', '-id').first()
+        conversation.last_message = last
+        conversation.last_message_at = last.created_at
+        conversation.unread_a = thread.filter(receiver_id=user_a_id, is_read=False).count()
+        conversation.unread_b = thread.filter(receiver_id=user_b_id, is_read=False).count()
+        conversation.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.PositiveIntegerField(default=0, help_text='Messages user_a has not read yet')),
+                ('unread_b', models.PositiveIntegerField(default=0, help_text='Messages user_b has not read yet')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.message')),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_a', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_b', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversation',
+                'verbose_name_plural': 'Conversations',
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='users.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at'], name='users_messa_convers_76d32f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_a', '-last_message_at'], name='users_conve_user_a__ca4f21_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_b', '-last_message_at'], name='users_conve_user_b__65b380_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conversation',
+            unique_together={('user_a', 'user_b')},
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+def backfill_last_read(apps, schema_editor):
+    Conversation = apps.get_model('users', 'Conversation')
+    Message = apps.get_model('users', 'Message')
+
+    for conversation in Conversation.objects.all():
+        read = Message.objects.filter(conversation=conversation, is_read=True)
+        conversation.last_read_a = read.filter(
+            receiver_id=conversation.user_a_id
+        ).aggregate(last=models.Max('id'))['last'] or 0
+        conversation.last_read_b = read.filter(
+            receiver_id=conversation.user_b_id
+        ).aggregate(last=models.Max('id'))['last'] or 0
+        conversation.save(update_fields=['last_read_a', 'last_read_b'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_conversation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_read_a',
+            field=models.PositiveIntegerField(default=0, help_text='Id of the newest message user_a has read'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_read_b',
+            field=models.PositiveIntegerField(default=0, help_text='Id of the newest message user_b has read'),
+        ),
+        migrations.RunPython(backfill_last_read, migrations.RunPython.noop),
+    ]
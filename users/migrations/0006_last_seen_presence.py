@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_conversation_last_read'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last time the user was active (flushed from the presence cache)'),
+        ),
+    ]
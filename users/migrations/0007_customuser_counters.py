@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Post = apps.get_model('feed', 'Post')
+    Follow = CustomUser.following.through
+
+    def count(queryset, field):
+        counts = queryset.filter(**{field: OuterRef('pk')}).values(field).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(counts), 0)
+
+    CustomUser.objects.update(
+        follower_count=count(Follow.objects.all(), 'to_customuser'),
+        following_count=count(Follow.objects.all(), 'from_customuser'),
+        post_count=count(Post.objects.all(), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0006_last_seen_presence'),
+        ('feed', '0009_post_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['is_verified', '-follower_count', '-post_count'], name='users_custo_is_veri_357f49_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
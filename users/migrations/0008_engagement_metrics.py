@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementMetrics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='engagement', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('likes_received', models.PositiveIntegerField(default=0)),
+                ('comments_received', models.PositiveIntegerField(default=0)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('activity_rate', models.FloatField(default=0, help_text='Posts, likes and comments made per day over the last ENGAGEMENT_WINDOW_DAYS')),
+                ('engagement_score', models.PositiveSmallIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Engagement Metrics',
+                'verbose_name_plural': 'Engagement Metrics',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_engagement_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,7 +1,7 @@
 import random
 import string
-from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import AbstractUser
 from django.templatetags.static import static
 from django.utils.timezone import now
@@ -10,6 +10,8 @@ from django.db.models import JSONField
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 
+from users import presence, unread
+
 # Function to generate unique invite codes
 def generate_invite_code():
     """Generates an 8-character alphanumeric invite code."""
@@ -41,6 +43,8 @@ class CustomUser(AbstractUser):
         help_text=_("Upload a profile picture (1:1 aspect ratio recommended)"),
         validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])]
     )
+    # Resized copies and placeholder, written by uploads.images
+    profile_image_variants = JSONField(default=dict, blank=True, editable=False)
     
     # Social Features
     following = models.ManyToManyField(
@@ -62,19 +66,28 @@ class CustomUser(AbstractUser):
         help_text=_("Designates whether the user is verified")
     )
     last_seen = models.DateTimeField(
-        auto_now=True,
-        help_text=_("Last time the user was active")
+        default=now,
+        help_text=_("Last time the user was active (flushed from the presence cache)")
     )
     used_invite = models.BooleanField(
         default=False,
         help_text=_("Has this user used an invite code?")
     )
 
+    # Denormalized counters, maintained by users.counters
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('follower_count', 'following_count', 'post_count')
+    # Columns written with queryset updates, never from a full save
+    DERIVED_FIELDS = COUNTER_FIELDS + ('profile_image_variants', 'last_seen')
+
     # Properties
     @property
     def is_online(self):
-        """Check if user is currently online (active within last 15 minutes)."""
-        return self.last_seen > now() - timedelta(minutes=15)
+        """Check if user is currently online (active within PRESENCE_ONLINE_WINDOW)."""
+        return presence.is_online(self)
 
     @property
     def full_profile(self):
@@ -116,6 +129,7 @@ class CustomUser(AbstractUser):
             models.Index(fields=['username']),
             models.Index(fields=['email']),
             models.Index(fields=['last_seen']),
+            models.Index(fields=['is_verified', '-follower_count', '-post_count']),
         ]
         ordering = ['-date_joined']
 
@@ -123,8 +137,18 @@ class CustomUser(AbstractUser):
         return self.username
 
     def save(self, *args, **kwargs):
-        """Ensure clean data before saving."""
+        """Ensure clean data before saving.
+
+        Full saves of existing users skip the counter, variant and
+        ``last_seen`` columns so a stale in-memory instance can't overwrite
+        concurrent updates.
+        """
         self.clean()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
         super().save(*args, **kwargs)
         
 class InviteCode(models.Model):
@@ -177,6 +201,128 @@ class InviteCode(models.Model):
         status = _("Used") if self.used_by else _("Active")
         return f"{self.code} ({status})"
 
+class Conversation(models.Model):
+    """One-to-one conversation; ``user_a`` always holds the lower user id."""
+    user_a = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="conversations_as_a"
+    )
+    user_b = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="conversations_as_b"
+    )
+    last_message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_a = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Messages user_a has not read yet")
+    )
+    unread_b = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Messages user_b has not read yet")
+    )
+    last_read_a = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Id of the newest message user_a has read")
+    )
+    last_read_b = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Id of the newest message user_b has read")
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user_a', 'user_b')
+        verbose_name = _("Conversation")
+        verbose_name_plural = _("Conversations")
+        indexes = [
+            models.Index(fields=['user_a', '-last_message_at']),
+            models.Index(fields=['user_b', '-last_message_at']),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_a_id} ↔ {self.user_b_id}"
+
+    @classmethod
+    def between(cls, first, second):
+        """Get or create the conversation for a pair of users, in either order."""
+        user_a, user_b = sorted([first, second], key=lambda user: user.pk)
+        conversation, _created = cls.objects.get_or_create(user_a=user_a, user_b=user_b)
+        return conversation
+
+    @classmethod
+    def find(cls, first, second):
+        """The existing conversation for a pair of users, or ``None``."""
+        user_a, user_b = sorted([first, second], key=lambda user: user.pk)
+        return cls.objects.filter(user_a=user_a, user_b=user_b).first()
+
+    @classmethod
+    def for_user(cls, user):
+        return cls.objects.filter(models.Q(user_a=user) | models.Q(user_b=user))
+
+    def side(self, user):
+        """'a' or 'b' depending on which participant ``user`` is."""
+        return 'a' if user.pk == self.user_a_id else 'b'
+
+    def other(self, user):
+        return self.user_b if self.side(user) == 'a' else self.user_a
+
+    def unread_for(self, user):
+        return getattr(self, f'unread_{self.side(user)}')
+
+    def last_read_id(self, user):
+        return getattr(self, f'last_read_{self.side(user)}')
+
+    def mark_read(self, user, up_to_id=None):
+        """Mark messages to ``user`` up to ``up_to_id`` (default: all) as read.
+
+        Uses a single UPDATE for the messages and one for the conversation,
+        however many messages are unread. Returns how many were marked.
+        """
+        if self.last_message_id is None:
+            return 0
+        if up_to_id is None or up_to_id > self.last_message_id:
+            up_to_id = self.last_message_id
+        side = self.side(user)
+        unread_field, last_read_field = f'unread_{side}', f'last_read_{side}'
+        with transaction.atomic():
+            marked = self.messages.filter(
+                receiver=user, is_read=False, id__lte=up_to_id
+            ).update(is_read=True)
+            Conversation.objects.filter(pk=self.pk).update(**{
+                unread_field: Greatest(models.F(unread_field) - marked, 0),
+                last_read_field: Greatest(models.F(last_read_field), up_to_id),
+            })
+        if marked:
+            unread.adjust(user.pk, -marked)
+        self.refresh_from_db(fields=[unread_field, last_read_field])
+        return marked
+
+    def record(self, message):
+        """Make ``message`` the latest one and count it as unread for the receiver."""
+        unread_field = f'unread_{self.side(message.receiver)}'
+        changes = {'last_message': message, 'last_message_at': message.created_at}
+        if not message.is_read:
+            changes[unread_field] = models.F(unread_field) + 1
+        Conversation.objects.filter(pk=self.pk).update(**changes)
+
+    def refresh_last_message(self):
+        """Point ``last_message`` at the newest remaining message."""
+        latest = self.messages.order_by('-created_at', '-id').first()
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message=latest,
+            last_message_at=latest.created_at if latest else None,
+        )
+
+
 class Message(models.Model):
     """Private messaging system between users."""
     sender = models.ForeignKey(
@@ -189,15 +335,61 @@ class Message(models.Model):
         on_delete=models.CASCADE,
         related_name="received_messages"
     )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="messages"
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
     def mark_as_read(self):
-        """Mark message as read."""
-        if not self.is_read:
-            self.is_read = True
-            self.save()
+        """Mark message as read; returns whether this call did.
+
+        Decided by the conditional update, not the instance, so racing calls
+        only count the message once.
+        """
+        with transaction.atomic():
+            marked = Message.objects.filter(pk=self.pk, is_read=False).update(is_read=True)
+            if marked:
+                unread.adjust(self.receiver_id, -1)
+                if self.conversation_id:
+                    self._adjust_conversation_unread(-1)
+        self.is_read = True
+        return marked == 1
+
+    def save(self, *args, **kwargs):
+        """Attach new messages to their conversation and count them as unread."""
+        is_new = self._state.adding
+        with transaction.atomic():
+            if is_new and self.conversation_id is None:
+                self.conversation = Conversation.between(self.sender, self.receiver)
+            super().save(*args, **kwargs)
+            if is_new:
+                self.conversation.record(self)
+        if is_new and not self.is_read:
+            unread.adjust(self.receiver_id, 1)
+
+    def delete(self, *args, **kwargs):
+        was_unread = not self.is_read
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self.conversation_id:
+                if was_unread:
+                    self._adjust_conversation_unread(-1)
+                self.conversation.refresh_last_message()
+        if was_unread:
+            unread.adjust(self.receiver_id, -1)
+        return result
+
+    def _adjust_conversation_unread(self, delta):
+        field = 'unread_a' if self.receiver_id == self.conversation.user_a_id else 'unread_b'
+        Conversation.objects.filter(pk=self.conversation_id).update(
+            **{field: Greatest(models.F(field) + delta, 0)}
+        )
 
     class Meta:
         ordering = ["-created_at"]
@@ -205,6 +397,7 @@ class Message(models.Model):
         verbose_name_plural = _("Private Messages")
         indexes = [
             models.Index(fields=['sender', 'receiver']),
+            models.Index(fields=['conversation', 'created_at']),
             models.Index(fields=['created_at']),
             models.Index(fields=['is_read']),
         ]
@@ -295,6 +488,8 @@ class Profile(models.Model):
         help_text=_("Upload a cover image (recommended size: 1500x500px)"),
         validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])]
     )
+    # Resized copies and placeholder, written by uploads.images
+    cover_image_variants = JSONField(default=dict, blank=True, editable=False)
     location = models.CharField(
         max_length=100,
         blank=True,
@@ -320,3 +515,30 @@ class Profile(models.Model):
         if self.cover_image and hasattr(self.cover_image, "url"):
             return self.cover_image.url
         return None  
+
+
+class EngagementMetrics(models.Model):
+    """Per-user engagement aggregates, written by recompute_engagement"""
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="engagement"
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+    comments_received = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    activity_rate = models.FloatField(
+        default=0,
+        help_text=_("Posts, likes and comments made per day over the last ENGAGEMENT_WINDOW_DAYS")
+    )
+    engagement_score = models.PositiveSmallIntegerField(default=0)
+    computed_at = models.DateTimeField(default=now)
+
+    class Meta:
+        verbose_name = _("Engagement Metrics")
+        verbose_name_plural = _("Engagement Metrics")
+
+    def __str__(self):
+        return f"Engagement for user #{self.user_id}"
@@ -0,0 +1,60 @@
+"""Cached user presence with throttled ``last_seen`` writes.
+
+Every authenticated request records activity in the cache, which is what
+online badges read. The ``last_seen`` column is only written when a user's
+flush marker has expired, i.e. at most once per ``PRESENCE_FLUSH_INTERVAL``,
+so activity no longer turns into a users-table UPDATE per request. When the
+cache has nothing for a user, the stored ``last_seen`` is used instead.
+The flush marker is taken with ``cache.add``; off Redis that isn't atomic
+across processes, so an occasional extra write can slip through.
+"""
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.timezone import now
+
+
+def _key(user_id):
+    return f'presence:{user_id}'
+
+
+def _flush_key(user_id):
+    return f'presence_flush:{user_id}'
+
+
+def _online_since():
+    return now() - datetime.timedelta(seconds=settings.PRESENCE_ONLINE_WINDOW)
+
+
+def touch(user):
+    """Record activity for ``user``, persisting it at most once per flush interval."""
+    moment = now()
+    cache.set(_key(user.pk), moment, settings.PRESENCE_ONLINE_WINDOW)
+    # add() only succeeds once the previous marker has expired
+    if cache.add(_flush_key(user.pk), True, settings.PRESENCE_FLUSH_INTERVAL):
+        get_user_model().objects.filter(pk=user.pk).update(last_seen=moment)
+        user.last_seen = moment
+
+
+def last_seen(user):
+    return cache.get(_key(user.pk)) or user.last_seen
+
+
+def is_online(user):
+    seen = last_seen(user)
+    return seen is not None and seen > _online_since()
+
+
+def online_ids(users):
+    """Ids of the online users among ``users``, with one cache round trip."""
+    users = list(users)
+    cached = cache.get_many([_key(user.pk) for user in users])
+    since = _online_since()
+    online = set()
+    for user in users:
+        seen = cached.get(_key(user.pk)) or user.last_seen
+        if seen is not None and seen > since:
+            online.add(user.pk)
+    return online
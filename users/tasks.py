@@ -0,0 +1,16 @@
+"""Background tasks for the users app (see :mod:`jobs.queue`)."""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from jobs.queue import task
+from users import counters
+
+
+@task
+def send_email(subject, message, recipients):
+    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipients, fail_silently=False)
+
+
+@task
+def reconcile_counters():
+    counters.reconcile()
@@ -1,3 +1,630 @@
-from django.test import TestCase
+import datetime
+import importlib
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from feed.models import Comment, Like, Post
+from users import counters, engagement, graph, leaderboard, presence, unread
+from users.models import Conversation, CustomUser, EngagementMetrics, Message
+from users.unread import get_unread_count
+from users.views import verify_user
+
+class MarkReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, sender, receiver, content='hi'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def conversation(self):
+        return Conversation.find(self.alice, self.bob)
+
+    def test_marks_all_unread_messages_to_the_reader(self):
+        received = [self.send(self.bob, self.alice) for _ in range(3)]
+        sent = self.send(self.alice, self.bob)
+        conversation = self.conversation()
+        self.assertEqual(conversation.unread_for(self.alice), 3)
+
+        self.assertEqual(conversation.mark_read(self.alice), 3)
+        self.assertEqual(conversation.unread_for(self.alice), 0)
+        self.assertEqual(conversation.last_read_id(self.alice), sent.id)
+        self.assertFalse(Message.objects.filter(pk__in=[m.pk for m in received], is_read=False).exists())
+        # The other side's unread message is untouched
+        self.assertEqual(conversation.unread_for(self.bob), 1)
+        self.assertFalse(Message.objects.get(pk=sent.pk).is_read)
+
+    def test_marks_up_to_a_message(self):
+        first, second, third = (self.send(self.bob, self.alice) for _ in range(3))
+        conversation = self.conversation()
+
+        self.assertEqual(conversation.mark_read(self.alice, up_to_id=second.id), 2)
+        self.assertEqual(conversation.unread_for(self.alice), 1)
+        self.assertEqual(conversation.last_read_id(self.alice), second.id)
+        self.assertEqual(conversation.mark_read(self.alice), 1)
+        self.assertEqual(conversation.last_read_id(self.alice), third.id)
+
+    def test_up_to_id_is_clamped_and_never_moves_back(self):
+        first = self.send(self.bob, self.alice)
+        last = self.send(self.bob, self.alice)
+        conversation = self.conversation()
+
+        self.assertEqual(conversation.mark_read(self.alice, up_to_id=last.id + 100), 2)
+        self.assertEqual(conversation.last_read_id(self.alice), last.id)
+        self.assertEqual(conversation.mark_read(self.alice, up_to_id=first.id), 0)
+        self.assertEqual(conversation.last_read_id(self.alice), last.id)
+
+    def test_empty_conversation(self):
+        conversation = Conversation.between(self.alice, self.bob)
+        self.assertEqual(conversation.mark_read(self.alice), 0)
+
+    def test_mark_as_read_counts_once_on_stale_instances(self):
+        message = self.send(self.bob, self.alice)
+        stale = Message.objects.get(pk=message.pk)
+        self.assertEqual(get_unread_count(self.alice), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(message.mark_as_read())
+        with self.captureOnCommitCallbacks(execute=True):
+            # Loaded before the first call committed
+            self.assertFalse(stale.mark_as_read())
+        self.assertEqual(get_unread_count(self.alice), 0)
+        self.assertEqual(self.conversation().unread_for(self.alice), 0)
+        self.send(self.bob, self.alice)
+        self.assertEqual(get_unread_count(self.alice), 1)
+        self.assertEqual(self.conversation().unread_for(self.alice), 1)
+
+    def test_cached_unread_count_follows(self):
+        for _ in range(2):
+            self.send(self.bob, self.alice)
+        self.assertEqual(get_unread_count(self.alice), 2)
+        self.send(self.bob, self.alice)
+        self.assertEqual(get_unread_count(self.alice), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation().mark_read(self.alice)
+        self.assertEqual(get_unread_count(self.alice), 0)
+
+
+class ConversationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+        cls.carol = CustomUser.objects.create_user('carol', email='carol@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, sender, receiver, is_read=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=sender, receiver=receiver, content='hi', is_read=is_read)
+
+    def test_record_tracks_the_latest_message_and_unread_side(self):
+        to_bob = self.send(self.alice, self.bob)
+        conversation = Conversation.find(self.bob, self.alice)
+        self.assertEqual((conversation.user_a, conversation.user_b), (self.alice, self.bob))
+        self.assertEqual((conversation.unread_a, conversation.unread_b), (0, 1))
+        self.assertEqual(conversation.last_message, to_bob)
+
+        to_alice = self.send(self.bob, self.alice, is_read=True)
+        conversation.refresh_from_db()
+        self.assertEqual((conversation.unread_a, conversation.unread_b), (0, 1))
+        self.assertEqual((conversation.last_message, conversation.last_message_at), (to_alice, to_alice.created_at))
+
+    def test_backfill_migrations(self):
+        read = self.send(self.bob, self.alice, is_read=True)
+        self.send(self.bob, self.alice)
+        last = self.send(self.alice, self.bob)
+        from_carol = self.send(self.carol, self.alice)
+        # As before conversations existed
+        Message.objects.update(conversation=None)
+        Conversation.objects.all().delete()
+
+        for migration, function in [('0004_conversation', 'backfill_conversations'),
+                                    ('0005_conversation_last_read', 'backfill_last_read')]:
+            getattr(importlib.import_module(f'users.migrations.{migration}'), function)(apps, None)
+
+        conversation = Conversation.find(self.alice, self.bob)
+        self.assertEqual(conversation.messages.count(), 3)
+        self.assertEqual(conversation.last_message, last)
+        self.assertEqual((conversation.unread_for(self.alice), conversation.unread_for(self.bob)), (1, 1))
+        self.assertEqual((conversation.last_read_id(self.alice), conversation.last_read_id(self.bob)), (read.id, 0))
+        conversation = Conversation.find(self.alice, self.carol)
+        self.assertEqual(list(conversation.messages.all()), [from_carol])
+        self.assertEqual(Conversation.objects.count(), 2)
+
+
+@override_settings(MESSAGES_PAGE_SIZE=2, MESSAGES_INBOX_SIZE=2)
+class MessagePagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+        cls.carol = CustomUser.objects.create_user('carol', email='carol@example.com', password='x')
+        cls.dave = CustomUser.objects.create_user('dave', email='dave@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.alice)
+
+    def send(self, sender, receiver):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=sender, receiver=receiver, content='hi')
+
+    def thread(self, before=None):
+        params = {'before': before} if before else {}
+        url = reverse('message_thread', args=[self.bob.id])
+        return self.client.get(url, params, HTTP_HOST='localhost', secure=True)
+
+    def test_before_pages_back_through_the_thread(self):
+        sent = [self.send(self.bob, self.alice) for _ in range(5)]
+        # Same timestamp throughout: the id breaks ties
+        Message.objects.update(created_at=timezone.now())
+
+        pages, before = [], None
+        while True:
+            context = self.thread(before).context
+            pages.append(context['thread_messages'])
+            if not context['has_older']:
+                break
+            before = context['thread_messages'][0].id
+        self.assertEqual(pages, [sent[3:], sent[1:3], sent[:1]])
+
+    def test_older_pages_leave_read_state_alone(self):
+        sent = [self.send(self.bob, self.alice) for _ in range(3)]
+        self.thread(before=sent[-1].id)
+        self.assertEqual(Conversation.find(self.alice, self.bob).unread_for(self.alice), 3)
+        self.thread()
+        self.assertEqual(Conversation.find(self.alice, self.bob).unread_for(self.alice), 0)
+
+    def test_before_must_belong_to_the_thread(self):
+        self.send(self.bob, self.alice)
+        other = self.send(self.carol, self.alice)
+        self.assertEqual(self.thread(before=other.id).status_code, 404)
+
+    def test_inbox_lists_the_most_recent_conversations(self):
+        self.send(self.bob, self.alice)
+        self.send(self.carol, self.alice)
+        self.send(self.dave, self.alice)
+        self.send(self.alice, self.bob)
+        response = self.client.get(reverse('inbox'), HTTP_HOST='localhost', secure=True)
+        conversations = response.context['conversations']
+        self.assertEqual([c.partner for c in conversations], [self.bob, self.dave])
+        self.assertEqual([c.unread for c in conversations], [1, 1])
+
+
+class UnreadCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, is_read=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=self.bob, receiver=self.alice, content='hi', is_read=is_read)
+
+    def cached(self):
+        with self.assertNumQueries(0):
+            return get_unread_count(self.alice)
+
+    def test_miss_is_recomputed_and_cached(self):
+        self.send()
+        self.send(is_read=True)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_unread_count(self.alice), 1)
+        self.assertEqual(self.cached(), 1)
+
+    def test_create_read_and_delete_adjust_in_place(self):
+        first = self.send()
+        self.assertEqual(get_unread_count(self.alice), 1)
+        second = self.send()
+        self.send(is_read=True)
+        self.assertEqual(self.cached(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+        self.assertEqual(self.cached(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.cached(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.cached(), 0)
+
+    def test_uncached_counts_are_left_to_the_next_read(self):
+        self.send()
+        self.assertIsNone(cache.get(unread._key(self.alice.id)))
+        self.assertEqual(get_unread_count(self.alice), 1)
+
+    def test_rolled_back_messages_are_not_counted(self):
+        self.assertEqual(get_unread_count(self.alice), 0)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Message.objects.create(sender=self.bob, receiver=self.alice, content='hi')
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.cached(), 0)
+
+    def test_drift_below_zero_forces_a_recount(self):
+        self.send()
+        self.assertEqual(get_unread_count(self.alice), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            unread.adjust(self.alice.id, -2)
+        self.assertIsNone(cache.get(unread._key(self.alice.id)))
+        self.assertEqual(get_unread_count(self.alice), 1)
+
+    def test_anonymous_users_have_none(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(AnonymousUser()), 0)
+
+
+class FollowCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.alice)
+
+    def toggle(self):
+        url = reverse('follow_toggle', args=[self.bob.username])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, HTTP_HOST='localhost', secure=True).json()
+
+    def counts(self):
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        return self.alice.following_count, self.bob.follower_count
+
+    def test_adjust_never_goes_negative(self):
+        counters.adjust(self.bob.pk, followers=2, posts=1)
+        counters.adjust(self.bob.pk, followers=-3, posts=-1)
+        self.bob.refresh_from_db()
+        self.assertEqual((self.bob.follower_count, self.bob.post_count), (0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        self.alice.following.add(self.bob)
+        CustomUser.objects.filter(pk=self.bob.pk).update(follower_count=5, following_count=3)
+
+        self.assertEqual(counters.reconcile(dry_run=True), 2)
+        self.assertEqual(counters.reconcile(), 2)
+        self.assertEqual(self.counts(), (1, 1))
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.following_count, 0)
+        self.assertEqual(counters.reconcile(), 0)
+
+    def test_toggle_keeps_counters_in_step(self):
+        response = self.toggle()
+        self.assertEqual((response['action'], response['follower_count']), ('followed', 1))
+        self.assertEqual(self.counts(), (1, 1))
+        response = self.toggle()
+        self.assertEqual((response['action'], response['follower_count']), ('unfollowed', 0))
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertEqual(counters.reconcile(dry_run=True), 0)
+
+    def test_follow_that_lost_a_race_is_not_counted_twice(self):
+        self.toggle()
+        exists = QuerySet.exists
+        calls = []
+
+        def stale_exists(queryset):
+            # The first check runs before the other request's follow was visible
+            calls.append(queryset)
+            return False if len(calls) == 1 else exists(queryset)
+
+        with mock.patch.object(QuerySet, 'exists', stale_exists):
+            response = self.toggle()
+        self.assertEqual(response['action'], 'followed')
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertEqual(counters.reconcile(dry_run=True), 0)
+
+
+class FollowStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        graph.reset()
+        self.addCleanup(graph.reset)
+        self.client.force_login(self.alice)
+
+    def test_follow_button_ignores_a_stale_graph(self):
+        graph.get_graph()
+        # Followed through another process whose graph edit never arrived
+        self.alice.following.add(self.bob)
+        self.bob.following.add(self.alice)
+
+        response = self.client.get(reverse('profile', args=['bob']), HTTP_HOST='localhost', secure=True)
+        self.assertTrue(response.context['is_following'])
+        self.assertTrue(response.context['follows_you'])
+
+        response = self.client.get(reverse('following_list', args=['alice']), HTTP_HOST='localhost', secure=True)
+        [person] = response.json()['results']
+        self.assertEqual((person['is_following'], person['follows_you']), (True, True))
+
+
+@override_settings(FOLLOW_LIST_PAGE_SIZE=2)
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.fans = [
+            CustomUser.objects.create_user(name, email=f'{name}@example.com', password='x')
+            for name in ('bob', 'Barbara', 'bert', 'carol', 'dave')
+        ]
+        for fan in cls.fans:
+            fan.following.add(cls.alice)
+        cls.alice.following.add(cls.fans[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.alice)
+
+    def get(self, name='followers_list', **params):
+        htmx = {'HTTP_HX_REQUEST': 'true'} if params.pop('htmx', False) else {}
+        return self.client.get(reverse(name, args=['alice']), params, HTTP_HOST='localhost', secure=True, **htmx)
+
+    def walk(self, **params):
+        names, after = [], None
+        while True:
+            data = self.get(**params, **({'after': after} if after else {})).json()
+            self.assertLessEqual(len(data['results']), 2)
+            names.extend(person['username'] for person in data['results'])
+            after = data['next_cursor']
+            if after is None:
+                return names
+
+    def test_after_pages_newest_first(self):
+        self.assertEqual(self.walk(), ['dave', 'carol', 'bert', 'Barbara', 'bob'])
+
+    def test_q_is_a_case_insensitive_prefix(self):
+        self.assertEqual(self.walk(q='b'), ['bert', 'Barbara', 'bob'])
+        self.assertEqual(self.walk(q='AR'), [])
+        self.assertEqual(self.walk(name='following_list', q='bo'), ['bob'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get(after='x').status_code, 400)
+
+    def test_json_flags(self):
+        [bob] = self.get(name='following_list').json()['results']
+        self.assertEqual(bob['username'], 'bob')
+        self.assertEqual((bob['is_following'], bob['follows_you']), (True, True))
+        self.assertTrue(bob['profile_image'])
+
+    def test_query_count_is_flat(self):
+        self.get()  # Flushes last_seen
+        with self.assertNumQueries(6):
+            self.get()
+        with override_settings(FOLLOW_LIST_PAGE_SIZE=5), self.assertNumQueries(6):
+            self.get()
+
+    def test_htmx_gets_the_partial(self):
+        response = self.get(htmx=True, q='b')
+        self.assertTemplateUsed(response, 'users/partials/follow_list.html')
+        self.assertContains(response, 'class="follow-search"')
+        self.assertContains(response, 'value="b"')
+        cursor = response.context['next_cursor']
+        self.assertContains(response, f'?after={cursor}&q=b')
+
+        response = self.get(htmx=True, q='b', after=cursor)
+        self.assertNotContains(response, 'follow-search')
+        self.assertNotContains(response, '<ul')
+        self.assertEqual([person.username for person in response.context['people']], ['bob'])
+        self.assertIsNone(response.context['next_cursor'])
+
+
+@override_settings(PRESENCE_ONLINE_WINDOW=900, PRESENCE_FLUSH_INTERVAL=60)
+class PresenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+        cls.carol = CustomUser.objects.create_user('carol', email='carol@example.com', password='x')
+        # Nobody has been seen recently
+        CustomUser.objects.update(last_seen=timezone.now() - datetime.timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+
+    def stored_last_seen(self, user):
+        return CustomUser.objects.values_list('last_seen', flat=True).get(pk=user.pk)
+
+    def test_last_seen_is_written_once_per_flush_interval(self):
+        with self.assertNumQueries(1):
+            presence.touch(self.alice)
+        first = self.stored_last_seen(self.alice)
+        self.assertEqual(self.alice.last_seen, first)
+
+        with self.assertNumQueries(0):
+            presence.touch(self.alice)
+        self.assertEqual(self.stored_last_seen(self.alice), first)
+
+        # Flush marker expired
+        cache.delete(presence._flush_key(self.alice.pk))
+        with self.assertNumQueries(1):
+            presence.touch(self.alice)
+        self.assertGreater(self.stored_last_seen(self.alice), first)
+
+    def test_requests_record_activity(self):
+        self.client.force_login(self.alice)
+        self.client.get(reverse('home'), HTTP_HOST='localhost', secure=True)
+        self.assertTrue(presence.is_online(self.alice))
+        self.assertTrue(CustomUser.objects.get(pk=self.alice.pk).is_online)
+
+    def test_full_saves_keep_last_seen(self):
+        stale = CustomUser.objects.get(pk=self.alice.pk)
+        presence.touch(self.alice)
+        stale.bio = 'Potter'
+        stale.save()
+        self.assertEqual(self.stored_last_seen(self.alice), self.alice.last_seen)
+
+    def test_online_ids_read_the_cache_then_the_column(self):
+        presence.touch(self.alice)
+        # Fell out of the cache, but flushed recently
+        CustomUser.objects.filter(pk=self.bob.pk).update(last_seen=timezone.now())
+        users = list(CustomUser.objects.filter(pk__in=[self.alice.pk, self.bob.pk, self.carol.pk]))
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, self.assertNumQueries(0):
+            online = presence.online_ids(users)
+        self.assertEqual(online, {self.alice.pk, self.bob.pk})
+        get_many.assert_called_once()
+
+    def test_online_window(self):
+        presence.touch(self.alice)
+        with override_settings(PRESENCE_ONLINE_WINDOW=0):
+            self.assertEqual(presence.online_ids([self.alice]), set())
+            self.assertFalse(presence.is_online(self.alice))
+
+
+@override_settings(FEATURED_CREATORS_LIMIT=5)
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.star = CustomUser.objects.create_user('star', email='star@example.com', password='x', is_verified=True)
+        cls.newcomer = CustomUser.objects.create_user('newcomer', email='new@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        return {creator['username']: (creator['follower_count'], creator['post_count'])
+                for creator in leaderboard.get_featured_creators()}
+
+    def post(self, user, name, *args):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(name, args=args), {'content': 'hello'}, HTTP_HOST='localhost', secure=True)
+
+    def test_snapshot_is_served_from_the_cache(self):
+        self.assertEqual(self.snapshot(), {'star': (0, 0)})
+        html = leaderboard.get_featured_html()
+        self.assertIn('star', html)
+        with self.assertNumQueries(0):
+            self.snapshot()
+            self.assertEqual(leaderboard.get_featured_html(), html)
+
+    def test_verified_follows_invalidate(self):
+        self.snapshot()
+        self.post(self.alice, 'follow_toggle', 'star')
+        self.assertEqual(self.snapshot(), {'star': (1, 0)})
+        self.post(self.alice, 'follow_toggle', 'star')
+        self.assertEqual(self.snapshot(), {'star': (0, 0)})
+
+    def test_unverified_follows_leave_the_snapshot(self):
+        self.snapshot()
+        with mock.patch.object(leaderboard, 'bump') as bump:
+            self.post(self.alice, 'follow_toggle', 'newcomer')
+        bump.assert_not_called()
+
+    def test_posts_invalidate(self):
+        self.snapshot()
+        self.post(self.star, 'new_post')
+        self.assertEqual(self.snapshot(), {'star': (0, 1)})
+        post = Post.objects.get(user=self.star)
+        self.post(self.star, 'delete_post', post.id)
+        self.assertEqual(self.snapshot(), {'star': (0, 0)})
+
+    def test_verify_user_invalidates(self):
+        self.snapshot()
+        request = RequestFactory().post('/')
+        request.user = CustomUser.objects.create_superuser('admin', email='admin@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            verify_user(request, self.newcomer.id)
+        self.assertEqual(self.snapshot(), {'star': (0, 0), 'newcomer': (0, 0)})
+
+
+@override_settings(ENGAGEMENT_WINDOW_DAYS=10)
+class EngagementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', email='alice@example.com', password='x')
+        cls.bob = CustomUser.objects.create_user('bob', email='bob@example.com', password='x')
+        cls.carol = CustomUser.objects.create_user('carol', email='carol@example.com', password='x')
+
+    def metrics(self, user):
+        return EngagementMetrics.objects.get(user=user)
+
+    def age(self, queryset, days):
+        queryset.update(created_at=timezone.now() - datetime.timedelta(days=days))
+
+    def test_aggregates(self):
+        first = Post.objects.create(user=self.alice, content='one')
+        second = Post.objects.create(user=self.alice, content='two')
+        Post.objects.filter(pk=first.pk).update(like_count=3, comment_count=1)
+        Post.objects.filter(pk=second.pk).update(like_count=2)
+        CustomUser.objects.filter(pk=self.alice.pk).update(follower_count=4)
+
+        self.assertEqual(engagement.recompute(), 3)
+        metrics = self.metrics(self.alice)
+        self.assertEqual(
+            (metrics.post_count, metrics.likes_received, metrics.comments_received, metrics.follower_count),
+            (2, 5, 1, 4),
+        )
+        self.assertEqual(metrics.engagement_score, engagement.score(2, 5, 4))
+        self.assertEqual(self.metrics(self.carol).engagement_score, 0)
+
+    def test_score_is_capped(self):
+        self.assertEqual(engagement.score(10, 10, 10), 50)
+        self.assertEqual(engagement.score(100, 100, 100), 100)
+
+    def test_activity_rate_counts_the_window_only(self):
+        post = Post.objects.create(user=self.bob, content='hello')
+        old = Post.objects.create(user=self.bob, content='old')
+        Like.objects.create(user=self.bob, post=post)
+        Comment.objects.create(user=self.bob, post=post, content='hi')
+        Comment.objects.create(user=self.bob, post=old, content='old')
+        self.age(Post.objects.filter(pk=old.pk), 11)
+        self.age(Comment.objects.filter(post=old), 11)
+        Like.objects.create(user=self.alice, post=post)
+
+        engagement.recompute()
+        self.assertAlmostEqual(self.metrics(self.bob).activity_rate, 3 / 10)
+        self.assertAlmostEqual(self.metrics(self.alice).activity_rate, 1 / 10)
+
+    def test_upserts_in_batches(self):
+        engagement.recompute()
+        Post.objects.create(user=self.carol, content='hello')
+        with mock.patch.object(engagement, 'BATCH_SIZE', 2), \
+                mock.patch.object(engagement, '_save', wraps=engagement._save) as save:
+            self.assertEqual(engagement.recompute(), 3)
+        self.assertEqual([len(call.args[0]) for call in save.call_args_list], [2, 1])
+        self.assertEqual(EngagementMetrics.objects.count(), 3)
+        self.assertEqual(self.metrics(self.carol).post_count, 1)
+
+    def test_some_users_only(self):
+        engagement.recompute()
+        before = self.metrics(self.alice).computed_at
+        Post.objects.create(user=self.bob, content='hello')
+        Post.objects.create(user=self.alice, content='hello')
+
+        out = StringIO()
+        call_command('recompute_engagement', users=[self.bob.id], stdout=out)
+        self.assertIn('Recomputed engagement for 1 user(s)', out.getvalue())
+        self.assertEqual(self.metrics(self.bob).post_count, 1)
+        self.assertEqual((self.metrics(self.alice).post_count, self.metrics(self.alice).computed_at), (0, before))
@@ -0,0 +1,44 @@
+"""Cached per-user unread message counter.
+
+The count lives in the cache and is adjusted in place when messages are
+created, read or deleted, so rendering a page never runs ``COUNT(*)``. A
+missing key is recomputed from the database, and the TTL bounds drift from
+writes that bypass the model (bulk updates, raw SQL), and from concurrent
+``incr`` calls on caches where it isn't atomic (anything but Redis).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(user_id):
+    return f'unread_messages:{user_id}'
+
+
+def get_unread_count(user):
+    """Count unread messages for a user"""
+    if not user.is_authenticated:
+        return 0
+    count = cache.get(_key(user.id))
+    if count is None:
+        from users.models import Message
+        count = Message.objects.filter(receiver=user, is_read=False).count()
+        cache.set(_key(user.id), count, settings.UNREAD_COUNT_TTL)
+    return count
+
+
+def adjust(user_id, delta):
+    """Add ``delta`` to the cached count once the transaction commits."""
+    def apply():
+        try:
+            if cache.incr(_key(user_id), delta) < 0:
+                cache.delete(_key(user_id))
+        except ValueError:
+            # Not cached yet: the next read computes it from the database
+            pass
+
+    transaction.on_commit(apply)
+
+
+def invalidate(user_id):
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
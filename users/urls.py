@@ -8,22 +8,25 @@ urlpatterns = [
     path('logout/', views.CustomLogoutView.as_view(), name='logout'),
     
     # Profiles
-    path('profile/<str:username>/', views.profile_view, name='profile'),
     path('profile/edit/', views.profile_edit, name='profile_edit'),
-    path('profile/update_cover/', views.update_cover, name='update_cover'),  
+    path('profile/update_cover/', views.update_cover, name='update_cover'),
+    path('profile/<str:username>/', views.profile_view, name='profile'),
     
+    # Following (must precede the catch-all tab route below)
+    path('profile/<str:username>/follow/', views.follow_toggle, name='follow_toggle'),
+    path('profile/<str:username>/followers/', views.follow_list, {'direction': 'followers'}, name='followers_list'),
+    path('profile/<str:username>/following/', views.follow_list, {'direction': 'following'}, name='following_list'),
+
     # HTMX Profile Endpoints
     path('profile/<str:username>/stats/', views.user_stats_view, name='user_stats'),
     path('profile/<str:username>/<str:tab_name>/', views.profile_tab_content, name='profile_tab'),
     
-    # Following
-    path('profile/<str:username>/follow/', views.follow_toggle, name='follow_toggle'),
-    
     # Messaging
     path('inbox/', views.inbox_view, name='inbox'),
     path('messages/', views.message_list, name='message_list'),
     path('messages/send/<int:user_id>/', views.send_message, name='send_message'),
     path('messages/thread/<int:receiver_id>/', views.message_thread, name='message_thread'),
+    path('messages/thread/<int:receiver_id>/read/', views.mark_thread_read, name='mark_thread_read'),
     path('messages/delete/<int:message_id>/', views.delete_message, name='delete_message'),
     
     # Invites
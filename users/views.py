@@ -7,20 +7,26 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponseRedirect
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 from django.views.decorators.csrf import csrf_protect
-from django.core.mail import send_mail
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.conf import settings
 from django.db.models import Q, Count, F, Prefetch
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView
 from django.db import transaction
 
 # Forms & Models
-from .forms import CustomUserCreationForm, MessageForm, ProfileEditForm
-from .models import CustomUser as User, InviteCode, Message, UserInteraction
+from .forms import CustomUserCreationForm, MessageForm, ProfileCoverForm, ProfileEditForm
+from .models import CustomUser as User, Conversation, InviteCode, Message, Profile, UserInteraction
+from . import counters as user_counters, graph, leaderboard, presence, tasks as user_tasks
+from .unread import get_unread_count
 from feed.models import Post, Like, Comment
+from feed import tasks as feed_tasks, timeline
+from uploads.handlers import rejection as upload_rejection, upload_limit
+from uploads.images import avatar_url
+from creaverse import events
 
 # Utilities
 import logging
@@ -29,12 +35,32 @@ from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 
+logger = logging.getLogger(__name__)
+
 # Helper Functions 
-def get_unread_count(user):
-    """Count unread messages for a user"""
-    if not user.is_authenticated:
-        return 0
-    return Message.objects.filter(receiver=user, is_read=False).count()
+def publish_message(message):
+    """Push a new message to both participants' event streams"""
+    payload = {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'receiver_id': message.receiver_id,
+        'sender_name': message.sender.username,
+        'sender_avatar': avatar_url(message.sender),
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+        'is_read': message.is_read,
+    }
+    for user_id in (message.sender_id, message.receiver_id):
+        events.publish(events.user_channel(user_id), 'new_message', payload)
+
+
+def publish_read_receipt(conversation, reader):
+    """Tell the other participant how far ``reader`` has read"""
+    partner_id = conversation.user_b_id if conversation.side(reader) == 'a' else conversation.user_a_id
+    events.publish(events.user_channel(partner_id), 'messages_read', {
+        'reader_id': reader.id,
+        'last_read_id': conversation.last_read_id(reader),
+    })
 
 #  HTMX Views 
 @login_required
@@ -43,18 +69,22 @@ def user_stats_view(request, username):
     """HTMX endpoint for live user stats"""
     user = get_object_or_404(User, username=username)
     return JsonResponse({
-        'post_count': Post.objects.filter(user=user).count(),
-        'follower_count': user.followers.count(),
-        'following_count': user.following.count()
+        'post_count': user.post_count,
+        'follower_count': user.follower_count,
+        'following_count': user.following_count
     })
 
 
 # Authentication Views 
+@upload_limit(max_size=settings.AVATAR_UPLOAD_SIZE)
 def register(request):
     """Invite-only registration with optimized queries"""
     form = CustomUserCreationForm()  # Initialize the form here
 
-    if request.method == "POST":
+    rejection = upload_rejection(request) if request.method == "POST" else None
+    if rejection:
+        messages.error(request, rejection.message)
+    elif request.method == "POST":
         form = CustomUserCreationForm(request.POST, request.FILES)
         invite_code = request.POST.get("invite_code")
 
@@ -89,55 +119,58 @@ class CustomLogoutView(LogoutView):
 @login_required
 def profile_view(request, username):
     """View user profile with optimized queries and accurate counting"""
-    profile_user = get_object_or_404(
-        User.objects.select_related('profile')
-                   .prefetch_related(
-                       Prefetch('followers', queryset=User.objects.only('id')),
-                       Prefetch('following', queryset=User.objects.only('id'))
-                   ),
-        username=username
-    )
-    
-    # Get counts in single queries
-    followers_count = profile_user.followers.count()
-    following_count = profile_user.following.count()
-    
-    # Optimised post queries
-    base_posts = Post.objects.filter(user=profile_user).select_related('user')
-    user_posts = base_posts.order_by('-created_at')[:20]
-    
+    profile_user = get_object_or_404(User.objects.select_related('profile', 'engagement'), username=username)
+
+    user_posts = Post.objects.filter(user=profile_user).select_related('user').order_by('-created_at')[:20]
+
     # Single query for interactions
     interactions = UserInteraction.objects.filter(
         user=profile_user
     ).select_related('post', 'target_user')[:5]
-    
-    # Efficient engagement score calculation
-    like_count = Like.objects.filter(post__user=profile_user).count()
-    engagement_score = min(100, (
-        (base_posts.count() * 2) + 
-        (like_count * 3) +
-        (followers_count * 5)
-    ) // 2)
-    
+
+    # Counts are stored on the user; engagement is precomputed by recompute_engagement
+    engagement = getattr(profile_user, 'engagement', None)
+
     context = {
         'profile_user': profile_user,
         'user_posts': user_posts,
         'interactions': interactions,
-        'followers_count': followers_count,
-        'following_count': following_count,
-        'is_following': request.user.following.filter(id=profile_user.id).exists(),
-        'is_online': profile_user.last_seen > timezone.now() - timezone.timedelta(minutes=15),
-        'engagement_score': engagement_score,
+        'followers_count': profile_user.follower_count,
+        'following_count': profile_user.following_count,
+        # Follow state drives the Follow button, so it comes from the database
+        'is_following': request.user.following.filter(pk=profile_user.pk).exists(),
+        'follows_you': profile_user.following.filter(pk=request.user.pk).exists(),
+        'is_online': presence.is_online(profile_user),
+        'engagement': engagement,
+        'engagement_score': engagement.engagement_score if engagement else 0,
         'has_cover_image': profile_user.profile.cover_image if hasattr(profile_user, 'profile') else False,
     }
+    if profile_user == request.user:
+        suggested = graph.suggestions(request.user.id)
+        by_id = User.objects.only(
+            'username', 'profile_image', 'profile_image_variants', 'is_verified'
+        ).in_bulk(suggested)
+        context['suggested_users'] = [by_id[uid] for uid in suggested if uid in by_id]
+    else:
+        # Approximate (the graph may be a few edits behind), which is fine for a count
+        context['mutual_count'] = len(
+            graph.followers_among(profile_user.id, graph.get_graph().following(request.user.id))
+        )
     return render(request, 'users/profile.html', context)
 
 @login_required
+@upload_limit(max_files=2)  # profile_image and cover_image
 def profile_edit(request):
     """Edit profile with form handling for both user and profile data"""
     user = request.user
     profile = user.profile  
-    
+
+    # Rejected while streaming; the rest of the form never arrived
+    rejection = upload_rejection(request) if request.method == "POST" else None
+    if rejection:
+        messages.error(request, rejection.message)
+        return redirect('profile_edit')
+
     if request.method == "POST":
         user_form = ProfileEditForm(request.POST, request.FILES, instance=user)
         profile_form = ProfileCoverForm(request.POST, request.FILES, instance=profile)
@@ -172,25 +205,14 @@ def profile_edit(request):
 @login_required
 def update_cover(request):
     """Handle AJAX cover photo uploads with validation"""
+    # Size and file type are checked while the upload streams in
+    rejection = upload_rejection(request)
+    if rejection:
+        return JsonResponse({'success': False, 'error': rejection.message}, status=rejection.status)
     if not request.FILES.get('cover_image'):
         return JsonResponse({'success': False, 'error': 'No image provided'}, status=400)
     
     try:
-        # Validate file size (max 5MB)
-        if request.FILES['cover_image'].size > 5 * 1024 * 1024:
-            return JsonResponse({
-                'success': False,
-                'error': 'Image size must be less than 5MB'
-            }, status=400)
-            
-        # Validate file type
-        valid_types = ['image/jpeg', 'image/png', 'image/webp']
-        if request.FILES['cover_image'].content_type not in valid_types:
-            return JsonResponse({
-                'success': False,
-                'error': 'Only JPEG, PNG, or WebP images are allowed'
-            }, status=400)
-        
         # Ensure profile exists
         profile, created = Profile.objects.get_or_create(user=request.user)
         
@@ -215,12 +237,8 @@ def update_cover(request):
 @login_required
 def profile_tab_content(request, username, tab_name):
     """HTMX endpoint for tabbed content with optimized queries"""
-    profile_user = get_object_or_404(
-        User.objects.prefetch_related('following', 'followers'),
-        username=username
-    )
-    
- 
+    profile_user = get_object_or_404(User, username=username)
+
     posts = Post.objects.select_related('user').filter(user=profile_user)
     
     if tab_name == 'likes':
@@ -248,6 +266,80 @@ def profile_tab_content(request, username, tab_name):
         'is_owner': profile_user == request.user,
     })
 
+@login_required
+@require_GET
+def follow_list(request, username, direction):
+    """Keyset-paginated followers/following of a user, newest first
+
+    ``?after=<cursor>`` continues a listing and ``?q=`` filters by username
+    prefix. Returns a partial for htmx requests and JSON otherwise.
+    """
+    profile_user = get_object_or_404(User, username=username)
+    Follow = User.following.through
+    if direction == 'followers':
+        rows = Follow.objects.filter(to_customuser=profile_user)
+        other = 'from_customuser'
+    else:
+        rows = Follow.objects.filter(from_customuser=profile_user)
+        other = 'to_customuser'
+
+    query = request.GET.get('q', '').strip()
+    if query:
+        rows = rows.filter(**{f'{other}__username__istartswith': query})
+    after = request.GET.get('after')
+    if after:
+        try:
+            rows = rows.filter(id__lt=int(after))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    page_size = settings.FOLLOW_LIST_PAGE_SIZE
+    page = list(
+        rows.select_related(other)
+        .only(
+            'id', f'{other}__username', f'{other}__profile_image', f'{other}__profile_image_variants',
+            f'{other}__is_verified',
+        )
+        .order_by('-id')[:page_size + 1]
+    )
+    next_cursor = page[page_size - 1].id if len(page) > page_size else None
+    people = [getattr(row, other) for row in page[:page_size]]
+    ids = [person.id for person in people]
+    followed = set(
+        Follow.objects.filter(from_customuser=request.user, to_customuser__in=ids)
+        .values_list('to_customuser', flat=True)
+    )
+    follows_you = set(
+        Follow.objects.filter(to_customuser=request.user, from_customuser__in=ids)
+        .values_list('from_customuser', flat=True)
+    )
+    for person in people:
+        person.is_followed = person.id in followed
+        person.follows_you = person.id in follows_you
+
+    if request.htmx:
+        return render(request, 'users/partials/follow_list.html', {
+            'profile_user': profile_user,
+            'direction': direction,
+            'people': people,
+            'query': query,
+            'next_cursor': next_cursor,
+        })
+    return JsonResponse({
+        'results': [
+            {
+                'id': person.id,
+                'username': person.username,
+                'profile_image': avatar_url(person),
+                'is_verified': person.is_verified,
+                'is_following': person.is_followed,
+                'follows_you': person.follows_you,
+            }
+            for person in people
+        ],
+        'next_cursor': next_cursor,
+    })
+
 #  Social Interaction Views 
 @login_required
 @require_POST
@@ -258,31 +350,49 @@ def follow_toggle(request, username):
     if request.user == target_user:
         return JsonResponse({'error': 'Cannot follow yourself'}, status=400)
     
-    # Toggle follow state
-    if request.user.following.filter(id=target_user.id).exists():
-        request.user.following.remove(target_user)
-        action = 'unfollowed'
-        
-        UserInteraction.objects.filter(
-            user=request.user,
-            target_user=target_user,
-            interaction_type='FOLLOW'
-        ).delete()
-    else:
-        request.user.following.add(target_user)
-        action = 'followed'
-        
-        UserInteraction.objects.create(
-            user=request.user,
-            target_user=target_user,
-            interaction_type='FOLLOW'
-        )
-    
+    # Toggle follow state. Side effects only run for a row that actually changed,
+    # so concurrent toggles can't count the same follow twice
+    Follow = User.following.through
+    follow = {'from_customuser': request.user, 'to_customuser': target_user}
+    with transaction.atomic():
+        if Follow.objects.filter(**follow).exists():
+            action = 'unfollowed'
+            changed = Follow.objects.filter(**follow).delete()[0] > 0
+            if changed:
+                user_counters.unfollow(request.user, target_user)
+                if timeline.is_enabled():
+                    feed_tasks.unfollow.delay(request.user.id, target_user.id)
+                UserInteraction.objects.filter(
+                    user=request.user,
+                    target_user=target_user,
+                    interaction_type='FOLLOW'
+                ).delete()
+        else:
+            action = 'followed'
+            _, changed = Follow.objects.get_or_create(**follow)
+            if changed:
+                user_counters.follow(request.user, target_user)
+                if timeline.is_enabled():
+                    feed_tasks.follow.delay(request.user.id, target_user.id)
+                UserInteraction.objects.create(
+                    user=request.user,
+                    target_user=target_user,
+                    interaction_type='FOLLOW'
+                )
+        if changed:
+            follower_id, followee_id, added = request.user.id, target_user.id, action == 'followed'
+            transaction.on_commit(lambda: graph.record(follower_id, followee_id, added))
+
+    target_user.refresh_from_db(fields=['follower_count'])
+    request.user.refresh_from_db(fields=['following_count'])
+    if leaderboard.affects(target_user):
+        leaderboard.invalidate()
+
     return JsonResponse({
         'action': action,
         'is_following': action == 'followed',
-        'follower_count': target_user.followers.count(),
-        'following_count': request.user.following.count()
+        'follower_count': target_user.follower_count,
+        'following_count': request.user.following_count
     })
 
 @login_required
@@ -318,17 +428,13 @@ def send_invite_email(request):
         code = request.POST.get('code')
 
         if email and code:
-            try:
-                send_mail(
-                    "You're Invited!",
-                    f"Use code: {code}\nSign up: {settings.SITE_URL}/register/",
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=False,
-                )
-                return JsonResponse({'success': True})
-            except Exception as e:
-                return JsonResponse({'success': False, 'error': str(e)})
+            # Delivered by the job worker, retried if the SMTP server is unavailable
+            user_tasks.send_email.delay(
+                "You're Invited!",
+                f"Use code: {code}\nSign up: {settings.SITE_URL}/register/",
+                [email],
+            )
+            return JsonResponse({'success': True})
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
 @login_required
@@ -349,18 +455,8 @@ def generate_invite(request):
 # Messaging Views 
 @login_required
 def message_list(request):
-    """List all messages"""
-    messages = Message.objects.filter(
-        Q(receiver=request.user) | Q(sender=request.user)
-    ).select_related('sender', 'receiver').order_by('-created_at')
-    
-    paginator = Paginator(messages, 10)
-    page = request.GET.get('page')
-    messages = paginator.get_page(page)
-    
-    return render(request, "users/message_list.html", {
-        "messages": messages
-    })
+    """List all conversations (same view as the inbox)"""
+    return inbox_view(request)
 
 
 @login_required
@@ -381,6 +477,7 @@ def send_message(request, user_id):
                 message.sender = request.user
                 message.receiver = recipient
                 message.save()
+                publish_message(message)
                 
                 # Create interaction record
                 UserInteraction.objects.create(
@@ -406,12 +503,8 @@ def send_message(request, user_id):
 
 @login_required
 def message_thread(request, receiver_id):
-    """View message conversation thread"""
+    """View message conversation thread, newest page first, older pages by cursor"""
     receiver = get_object_or_404(User, id=receiver_id)
-    messages = Message.objects.filter(
-        Q(sender=request.user, receiver=receiver) |
-        Q(sender=receiver, receiver=request.user)
-    ).order_by("created_at")
 
     if request.method == "POST":
         form = MessageForm(request.POST)
@@ -420,16 +513,66 @@ def message_thread(request, receiver_id):
             message.sender = request.user
             message.receiver = receiver
             message.save()
+            publish_message(message)
             return JsonResponse({'success': True})
     else:
         form = MessageForm()
 
+    conversation = Conversation.find(request.user, receiver)
+    thread = conversation.messages.all() if conversation else Message.objects.none()
+
+    # Keyset pagination backwards from the ?before=<message id> cursor
+    before = request.GET.get('before')
+    if before and conversation:
+        pivot = get_object_or_404(Message, id=before, conversation=conversation)
+        thread = thread.filter(
+            Q(created_at__lt=pivot.created_at) |
+            Q(created_at=pivot.created_at, id__lt=pivot.id)
+        )
+    page_size = settings.MESSAGES_PAGE_SIZE
+    page = list(thread.select_related('sender').order_by('-created_at', '-id')[:page_size + 1])
+    has_older = len(page) > page_size
+    thread_messages = page[:page_size][::-1]
+
+    # Opening the latest page reads everything in it with one UPDATE
+    if conversation and thread_messages and not before:
+        if conversation.mark_read(request.user, up_to_id=thread_messages[-1].id):
+            publish_read_receipt(conversation, request.user)
+
     return render(request, "users/message_thread.html", {
         "receiver": receiver,
-        "messages": messages,
+        "conversation": conversation,
+        "partner_last_read_id": conversation.last_read_id(receiver) if conversation else 0,
+        "thread_messages": thread_messages,
+        "has_older": has_older,
         "form": form
     })
 
+@login_required
+@require_POST
+def mark_thread_read(request, receiver_id):
+    """Mark messages from ``receiver_id`` up to ``?up_to=<message id>`` as read"""
+    receiver = get_object_or_404(User, id=receiver_id)
+    conversation = Conversation.find(request.user, receiver)
+    if conversation is None:
+        return JsonResponse({'success': False, 'error': "No conversation"}, status=404)
+
+    up_to = request.POST.get('up_to')
+    try:
+        up_to = int(up_to) if up_to else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "Invalid message id"}, status=400)
+
+    marked = conversation.mark_read(request.user, up_to_id=up_to)
+    if marked:
+        publish_read_receipt(conversation, request.user)
+    return JsonResponse({
+        'success': True,
+        'marked': marked,
+        'last_read_id': conversation.last_read_id(request.user),
+        'unread': conversation.unread_for(request.user),
+    })
+
 @login_required
 def delete_message(request, message_id):
     """Delete a message"""
@@ -446,15 +589,23 @@ def delete_message(request, message_id):
 
 @login_required
 def inbox_view(request):
-    """Display the user's message inbox"""
-    messages = Message.objects.filter(
-        receiver=request.user
-    ).order_by('-created_at')
-    unread_count = messages.filter(is_read=False).count()
-    
+    """Display the user's conversations, most recently active first"""
+    conversations = list(
+        Conversation.for_user(request.user)
+        .filter(last_message__isnull=False)
+        .select_related('user_a', 'user_b', 'last_message')
+        .order_by('-last_message_at')[:settings.MESSAGES_INBOX_SIZE]
+    )
+    for conversation in conversations:
+        conversation.partner = conversation.other(request.user)
+        conversation.unread = conversation.unread_for(request.user)
+    online = presence.online_ids(c.partner for c in conversations)
+    for conversation in conversations:
+        conversation.partner_online = conversation.partner.id in online
+
     context = {
-        'messages': messages,
-        'unread_count': unread_count
+        'conversations': conversations,
+        'unread_count': get_unread_count(request.user)
     }
     return render(request, 'messages/inbox.html', context)
 
@@ -466,26 +617,15 @@ def verify_user(request, user_id):
     user = get_object_or_404(User, id=user_id)
     user.is_verified = True
     user.save()
+    leaderboard.invalidate()
     return JsonResponse({'success': True, 'is_verified': True})
 
 # Home View 
 def home_view(request):
-    """Home page view with featured creators"""
-    featured_creators = (
-        User.objects.filter(is_verified=True)
-        .annotate(
-            follower_count=Count('followers', distinct=True),
-            post_count=Count('posts', distinct=True)
-        )
-        .only('username', 'bio', 'profile_image', 'is_verified')  # Optimize query
-        .order_by('-follower_count', '-post_count')[:5]
-    )
-
-    unread_count = get_unread_count(request.user) if request.user.is_authenticated else 0
-
+    """Home page view with the cached featured-creators leaderboard"""
+    # unread_count comes lazily from the unread_messages context processor
     return render(request, "home.html", {
-        "featured_creators": featured_creators,
-        "unread_count": unread_count,
+        "featured_creators_html": mark_safe(leaderboard.get_featured_html()),
         "now": timezone.now()
     })
 